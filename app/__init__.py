@@ -2,7 +2,9 @@ import os
 import subprocess
 import datetime
 
+import click
 from flask import Flask
+from flask.helpers import get_debug_flag
 from flask_login import LoginManager
 from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
@@ -10,15 +12,28 @@ from werkzeug.security import generate_password_hash
 from dotenv import load_dotenv
 
 from config import config as app_config
-from app.models import db, User, Role
+from app.models import db, User, Role, Course
 from app.routes.admin import create_admin_blueprint
 from app.utils.rbac_permissions import initialize_rbac, assign_role_to_user
+from app.utils.nir_scheduler import start_observation_scheduler, transition_overdue_observations
+from app.utils.nir_stats import rebuild_nir_daily_stats
+from app.utils.supplier_scores import rebuild_supplier_scores
+from app.utils.supplier_dedupe import dedupe_supplier_evaluations, find_duplicate_evaluations
+from app.utils.supplier_attachments import migrate_legacy_attachments
+from app.utils.rollups import run_backfills
+from app.utils.blob_storage import collect_garbage
+from app.utils.chunked_upload import expire_upload_sessions
+from app.utils.image_derivatives import image_srcset
+from app.utils.media_pipeline import process_pending_videos, queue_course_video, start_media_worker
+from app.utils.progress_buffer import start_progress_flusher
+from app.utils.training_compliance import rebuild_training_compliance
 from app.routes.auth import auth_bp
 from app.routes.main import main_bp
 from app.routes.util import util_bp, format_date_filter
 from app.routes.user import user_bp
 from app.routes.shift_handover import shift_handover_bp
 from app.routes.repository import repository_bp
+from app.routes.uploads import uploads_bp
 from app.routes.training import training_bp
 from app.routes.nir import nir_bp
 from app.routes.feedback.suppliers import suppliers_bp
@@ -27,7 +42,7 @@ from app.routes.collaborative_validation import collaborative_bp
 
 load_dotenv()
 
-def create_app():
+def create_app(start_workers=True):
     app = Flask(__name__, static_folder="static", template_folder="templates")
 
     config_name = os.getenv('FLASK_CONFIG', 'default')
@@ -60,8 +75,28 @@ def create_app():
     registry_routes(app)
     registry_filters(app)
     initdb(app)
+    if start_workers and should_start_workers():
+        start_observation_scheduler(app)
+        start_media_worker(app)
+        start_progress_flusher(app)
     return app
 
+def should_start_workers():
+    """Threads de fundo só no processo que atende requisições.
+
+    Comandos `flask <comando>` (exceto `flask run`) apenas carregam a aplicação; o processo pai do
+    reloader de `flask run --debug` só observa os arquivos (o filho recebe WERKZEUG_RUN_MAIN).
+    """
+    if os.environ.get('FLASK_RUN_FROM_CLI') != 'true':
+        return True
+    ctx = click.get_current_context(silent=True)
+    if ctx is None or ctx.info_name != 'run':
+        return False
+    reload = ctx.params.get('reload')
+    if reload is None:
+        reload = get_debug_flag()
+    return not reload or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+
 def registry_routes(app):
     admin_bp = create_admin_blueprint()
     app.register_blueprint(admin_bp)
@@ -71,6 +106,7 @@ def registry_routes(app):
     app.register_blueprint(user_bp)
     app.register_blueprint(shift_handover_bp)
     app.register_blueprint(repository_bp)
+    app.register_blueprint(uploads_bp)
     app.register_blueprint(training_bp)
     app.register_blueprint(nir_bp)
     app.register_blueprint(suppliers_bp)
@@ -93,6 +129,7 @@ def registry_filters(app):
     app.jinja_env.filters['format_date_short'] = lambda val: format_date_filter(val, format_str='%d/%m/%Y')
     app.jinja_env.filters['format_date_time'] = lambda val: format_date_filter(val, format_str='%d/%m/%Y %H:%M')
     app.jinja_env.filters['format_time'] = lambda val: format_date_filter(val, format_str='%H:%M')
+    app.jinja_env.globals['image_srcset'] = image_srcset
 
 def initdb(app):
     @app.cli.command("init-db")
@@ -169,9 +206,101 @@ def initdb(app):
                 print("Usuários atualizados:")
                 preview = ', '.join(affected_usernames[:50])
                 print(preview + (" ..." if len(affected_usernames) > 50 else ""))
+    @app.cli.command("nir-transition-observations")
+    def nir_transition_observations():
+        """Move observações NIR com mais de 24h para AGUARDANDO_DECISAO (uso via cron)."""
+        with app.app_context():
+            updated = transition_overdue_observations()
+        print(f"Observações movidas para AGUARDANDO_DECISAO: {updated}")
+
+    @app.cli.command("nir-rebuild-stats")
+    def nir_rebuild_stats():
+        """Recalcula toda a tabela nir_daily_stats (carga inicial ou job noturno)."""
+        with app.app_context():
+            rows = rebuild_nir_daily_stats()
+        print(f"Consolidado diário do NIR recalculado: {rows} linha(s).")
+
+    @app.cli.command("supplier-rebuild-scores")
+    def supplier_rebuild_scores():
+        """Recalcula os consolidados de pontuação dos fornecedores."""
+        with app.app_context():
+            rows = rebuild_supplier_scores()
+        print(f"Consolidado de fornecedores recalculado: {rows} par(es) fornecedor/mês.")
+
+    @app.cli.command("supplier-dedupe-evaluations")
+    @click.option("--apply", "apply_changes", is_flag=True, help="Remove as duplicatas (sem a opção apenas lista).")
+    def supplier_dedupe_evaluations(apply_changes):
+        """Lista ou resolve avaliações duplicadas (fornecedor, mês, avaliador) antes da restrição única."""
+        with app.app_context():
+            duplicates = dedupe_supplier_evaluations() if apply_changes else find_duplicate_evaluations()
+        for supplier_id, month_reference, evaluator_id, kept_id, removed_ids in duplicates:
+            print(f"Fornecedor {supplier_id} / {month_reference} / avaliador {evaluator_id}: "
+                  f"mantida {kept_id}, {'removidas' if apply_changes else 'a remover'} {removed_ids}")
+        print(f"{len(duplicates)} grupo(s) duplicado(s){' resolvido(s)' if apply_changes else ''}.")
+
+    @app.cli.command("supplier-migrate-attachments")
+    def supplier_migrate_attachments():
+        """Importa os attachments.json dos fornecedores para a tabela supplier_attachments (execução única)."""
+        with app.app_context():
+            imported, processed = migrate_legacy_attachments()
+        print(f"{imported} anexo(s) importado(s) de {processed} arquivo(s) attachments.json.")
+
+    @app.cli.command("blob-gc")
+    @click.option("--grace", type=int, default=None, help="Idade mínima (s) dos blobs sem referência a remover.")
+    def blob_gc(grace):
+        """Recalcula as referências e remove os arquivos armazenados que nenhum registro usa."""
+        with app.app_context():
+            expired = expire_upload_sessions()
+            removed, freed = collect_garbage(grace_seconds=grace)
+        print(f"{expired} sessão(ões) de upload expirada(s) removida(s).")
+        print(f"{removed} blob(s) removido(s), {freed / (1024 * 1024):.1f} MB liberados.")
+
+    @app.cli.command("media-process")
+    @click.option("--course-id", type=int, default=None, help="Recoloca o vídeo deste curso na fila.")
+    @click.option("--backfill", is_flag=True, help="Coloca na fila os vídeos de cursos ainda não preparados.")
+    @click.option("--limit", type=int, default=None, help="Máximo de vídeos processados nesta execução.")
+    def media_process(course_id, backfill, limit):
+        """Prepara os vídeos de cursos pendentes (faststart e versões de menor bitrate)."""
+        with app.app_context():
+            if course_id or backfill:
+                query = Course.query.filter(Course.video_filename.isnot(None))
+                query = query.filter_by(id=course_id) if course_id else query.filter(Course.media_status.is_(None))
+                queued = 0
+                for course in query.all():
+                    if course.is_video:
+                        queue_course_video(course)
+                        queued += 1
+                db.session.commit()
+                print(f"{queued} vídeo(s) colocado(s) na fila.")
+            prepared, failed = process_pending_videos(limit=limit)
+        print(f"{prepared} vídeo(s) preparado(s), {failed} falha(s).")
+
+    @app.cli.command("training-compliance-rebuild")
+    def training_compliance_rebuild():
+        """Refaz a matriz de conformidade dos treinamentos (carga inicial / correção manual)."""
+        with app.app_context():
+            rows = rebuild_training_compliance()
+        print(f"Matriz de conformidade recalculada: {rows} par(es) usuário/curso.")
+
     @app.cli.command("migrate-upgrade")
     def migrate_upgrade():
+        # A restrição uq_supplier_evaluation_month falha se houver avaliações duplicadas
+        with app.app_context():
+            duplicates = find_duplicate_evaluations()
+        if duplicates:
+            raise click.ClickException(
+                f"{len(duplicates)} grupo(s) de avaliações de fornecedores duplicadas. "
+                "Confira com `flask supplier-dedupe-evaluations` e resolva com `--apply` antes de migrar."
+            )
         msg = f"Auto migration - {datetime.datetime.now().strftime('%d-%m-%Y_%H-%M-%S')}"
         subprocess.run(["flask", "db", "migrate", "-m", msg], check=True)
         subprocess.run(["flask", "db", "upgrade"], check=True)
         print("Migração e upgrade aplicados com sucesso.")
+
+        # Consolidados criados vazios pelo upgrade (o do NIR é carregado com `flask nir-rebuild-stats`)
+        with app.app_context():
+            for name, rows in run_backfills():
+                if rows is None:
+                    print(f"Falha na carga inicial {name}; veja o log e rode o rebuild correspondente.")
+                elif rows:
+                    print(f"Carga inicial {name}: {rows} linha(s).")
@@ -589,6 +589,28 @@ class NirProcedure(db.Model):
 Nir.procedures = db.relationship(
     'NirProcedure', backref='nir', cascade='all, delete-orphan', order_by='NirProcedure.sequence.asc()'
 )
+
+class NirDailyStats(db.Model):
+    """Consolidado diário do NIR por tipo de entrada, tipo de internação e recurso"""
+    __tablename__ = 'nir_daily_stats'
+    id = db.Column(db.Integer, primary_key=True)
+    stat_date = db.Column(db.Date, nullable=False, index=True)
+    entry_type = db.Column(db.String(50), nullable=False, default='')
+    admission_type = db.Column(db.String(50), nullable=False, default='')
+    recurso = db.Column(db.String(50), nullable=False, default='')
+
+    admissions = db.Column(db.Integer, nullable=False, default=0)
+    discharges = db.Column(db.Integer, nullable=False, default=0)
+    cancellations = db.Column(db.Integer, nullable=False, default=0)
+    total_days_sum = db.Column(db.Integer, nullable=False, default=0)
+    total_days_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('stat_date', 'entry_type', 'admission_type', 'recurso', name='uq_nir_daily_stats_key'),
+    )
+
+    def __repr__(self):
+        return f'<NirDailyStats {self.stat_date} {self.entry_type}/{self.admission_type}/{self.recurso}>'
         
 class Form(db.Model):
     __tablename__ = 'forms'
@@ -609,6 +631,39 @@ class Form(db.Model):
     def __repr__(self):
         return f'<Form id={self.id}>'
 
+class StoredBlob(db.Model):
+    """Arquivo enviado armazenado uma única vez pelo SHA-256 do conteúdo"""
+    __tablename__ = 'stored_blobs'
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<StoredBlob {self.sha256[:12]} refs={self.ref_count}>'
+
+
+class UploadSession(db.Model):
+    """Upload em partes (init/append/complete) ainda não vinculado a um registro"""
+    __tablename__ = 'upload_sessions'
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    purpose = db.Column(db.String(30), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    received_size = db.Column(db.BigInteger, nullable=False, default=0)
+    sha256 = db.Column(db.String(64), nullable=True)  # preenchido ao concluir
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    @property
+    def is_complete(self):
+        return self.sha256 is not None
+
+    def __repr__(self):
+        return f'<UploadSession {self.id} {self.received_size}/{self.total_size}>'
+
+
 class Notice(db.Model):
     __tablename__ = 'notices'
     id = db.Column(db.Integer, primary_key=True)
@@ -647,6 +702,7 @@ class File(db.Model):
     
     parent_id = db.Column(db.Integer, db.ForeignKey('files.id'), nullable=True)
     repository_id = db.Column(db.Integer, db.ForeignKey('repositories.id'), nullable=False)
+    blob_sha256 = db.Column(db.String(64), nullable=True, index=True)
 
     repository = db.relationship('Repository', back_populates='files')
     owner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -660,12 +716,19 @@ class Course(db.Model):
     description = db.Column(db.Text, nullable=True)
     video_filename = db.Column(db.String(200), nullable=False) 
     image_filename = db.Column(db.String(200), nullable=True)
+    video_sha256 = db.Column(db.String(64), nullable=True, index=True)
+    image_sha256 = db.Column(db.String(64), nullable=True, index=True)
     duration_seconds = db.Column(db.Integer, nullable=False, default=0)
     date_registry = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     created_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     sources = db.Column(db.Text, nullable=True)
     scope = db.Column(db.String(100), nullable=True)
+    # Preparação do vídeo (utils/media_pipeline): pending, processing, ready, failed; None = não processado
+    media_status = db.Column(db.String(20), nullable=True, index=True)
+    media_claimed_at = db.Column(db.DateTime, nullable=True)  # início do processing (detecta worker interrompido)
+    video_bitrate = db.Column(db.Integer, nullable=True)
+    video_height = db.Column(db.Integer, nullable=True)
 
     @property
     def content_type(self):
@@ -689,6 +752,27 @@ class Course(db.Model):
     enrollment_terms = db.relationship('CourseEnrollmentTerm', back_populates='course', cascade="all, delete-orphan", lazy='dynamic')
     created_by = db.relationship('User', foreign_keys=[created_by_id], backref='created_courses')
 
+class CourseVideoRendition(db.Model):
+    """Versão preparada do vídeo de um curso: 'original' (MP4 com faststart) ou de menor bitrate"""
+    __tablename__ = 'course_video_renditions'
+    id = db.Column(db.Integer, primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id', ondelete='CASCADE'), nullable=False, index=True)
+    label = db.Column(db.String(20), nullable=False)
+    height = db.Column(db.Integer, nullable=True)
+    bitrate = db.Column(db.Integer, nullable=True)
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    course = db.relationship('Course', backref=db.backref('video_renditions', cascade='all, delete-orphan', order_by='CourseVideoRendition.bitrate.desc()'))
+
+    __table_args__ = (
+        db.UniqueConstraint('course_id', 'label', name='uq_course_video_rendition_label'),
+    )
+
+    def __repr__(self):
+        return f'<CourseVideoRendition {self.course_id} {self.label}>'
+
 class UserCourseProgress(db.Model):
     __tablename__ = 'user_course_progress'
     id = db.Column(db.Integer, primary_key=True)
@@ -702,7 +786,11 @@ class UserCourseProgress(db.Model):
     
     course = db.relationship('Course', back_populates='progress_records')
 
-    __table_args__ = (db.UniqueConstraint('user_id', 'course_id', name='_user_course_uc'),)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'course_id', name='_user_course_uc'),
+        # Relatórios, resets e concluintes de um curso (a restrição única começa por user_id)
+        db.Index('ix_user_course_progress_course_completed', 'course_id', 'completed_at'),
+    )
 
 class CourseEnrollmentTerm(db.Model):
     __tablename__ = 'course_enrollment_terms'
@@ -721,7 +809,11 @@ class CourseEnrollmentTerm(db.Model):
     user = db.relationship('User', back_populates='course_enrollments')
     course = db.relationship('Course', back_populates='enrollment_terms')
 
-    __table_args__ = (db.UniqueConstraint('user_id', 'course_id', name='_user_course_enrollment_uc'),)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'course_id', name='_user_course_enrollment_uc'),
+        # Inscrições de um curso (matriz de conformidade, listas de presença)
+        db.Index('ix_course_enrollment_terms_course', 'course_id'),
+    )
 
 class Quiz(db.Model):
     __tablename__ = 'quizzes'
@@ -747,6 +839,7 @@ class QuizAttachment(db.Model):
     filename = db.Column(db.String(255), nullable=False) 
     filepath = db.Column(db.String(255), nullable=False, unique=True)
     quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id'), nullable=False)
+    blob_sha256 = db.Column(db.String(64), nullable=True, index=True)
 
     def __repr__(self):
         return f'<QuizAttachment {self.filename}>'
@@ -806,6 +899,69 @@ class UserQuizAttempt(db.Model):
     user = db.relationship('User', backref='quiz_attempts')
     quiz = db.relationship('Quiz', backref=db.backref('attempts', cascade="all, delete-orphan"))
 
+    __table_args__ = (
+        # Melhor tentativa do usuário no quiz e melhores notas por curso no catálogo
+        db.Index('ix_user_quiz_attempts_user_quiz', 'user_id', 'quiz_id', 'score'),
+        # Relatórios do curso: melhor nota por usuário, média e distribuição das notas
+        db.Index('ix_user_quiz_attempts_quiz_score', 'quiz_id', 'score'),
+    )
+
+
+class CourseCertificate(db.Model):
+    """Certificado renderizado (HTML no armazenamento por hash) válido para uma data de conclusão"""
+    __tablename__ = 'course_certificates'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id', ondelete='CASCADE'), nullable=False, index=True)
+    completed_at = db.Column(db.DateTime, nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'course_id', name='uq_course_certificate_user_course'),)
+
+    def __repr__(self):
+        return f'<CourseCertificate {self.user_id} - {self.course_id}>'
+
+
+class CertificateBatch(db.Model):
+    """Geração em segundo plano dos certificados de todos os concluintes de um curso"""
+    __tablename__ = 'certificate_batches'
+    id = db.Column(db.String(32), primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id', ondelete='CASCADE'), nullable=False)
+    requested_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, done, failed
+    total = db.Column(db.Integer, nullable=False, default=0)
+    generated = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<CertificateBatch {self.id} {self.status}>'
+
+
+class TrainingComplianceEntry(db.Model):
+    """Situação consolidada de um usuário em um curso (matriz de conformidade dos treinamentos)"""
+    __tablename__ = 'training_compliance'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id', ondelete='CASCADE'), primary_key=True)
+    # enrolled, in_progress, completed (sem linha = não iniciado)
+    status = db.Column(db.String(20), nullable=False)
+    enrolled_at = db.Column(db.DateTime, nullable=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    best_score = db.Column(db.Float, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # Consultas da matriz filtram por curso e situação
+    __table_args__ = (
+        db.Index('ix_training_compliance_course_status', 'course_id', 'status'),
+    )
+
+    def __repr__(self):
+        return f'<TrainingComplianceEntry {self.user_id} - {self.course_id}: {self.status}>'
+
 
 # ============================================
 # MÓDULO DE AVALIAÇÃO DE FORNECEDORES/PRESTADORES
@@ -841,22 +997,20 @@ class Supplier(db.Model):
                                          secondaryjoin='User.id==supplier_evaluators.c.user_id',
                                          backref=db.backref('assigned_suppliers', lazy='dynamic'))
     
+    score_summary = db.relationship('SupplierScoreSummary', uselist=False, viewonly=True)
+    
     def get_display_name(self):
         """Retorna o nome fantasia se disponível, senão a razão social"""
         return self.trade_name if self.trade_name else self.company_name
     
     def get_average_score(self):
-        evals = [e for e in self.evaluations.all() if e.had_service_last_month]
-        if not evals:
-            return 0
-        return round(sum(e.total_score for e in evals) / len(evals), 2)
+        return self.score_summary.average_score if self.score_summary else 0
     
     def get_last_evaluation_date(self):
-        last_eval = self.evaluations.order_by(SupplierEvaluation.evaluation_date.desc()).first()
-        return last_eval.evaluation_date if last_eval else None
+        return self.score_summary.last_evaluation_date if self.score_summary else None
     
     def get_evaluations_count(self):
-        return self.evaluations.count()
+        return self.score_summary.evaluations_count if self.score_summary else 0
     
     def __repr__(self):
         return f'<Supplier {self.company_name}>'
@@ -910,6 +1064,14 @@ class SupplierEvaluation(db.Model):
     evaluator = db.relationship('User', foreign_keys=[evaluator_id])
     follow_up_entries = db.relationship('SupplierIssueTracking', back_populates='evaluation', lazy='dynamic')
 
+    __table_args__ = (
+        # Um avaliador avalia cada fornecedor uma única vez por mês; o prefixo
+        # (supplier_id, month_reference) atende também às consultas por fornecedor e mês
+        db.UniqueConstraint('supplier_id', 'month_reference', 'evaluator_id', name='uq_supplier_evaluation_month'),
+        db.Index('ix_supplier_evaluations_evaluator_month', 'evaluator_id', 'month_reference'),
+        db.Index('ix_supplier_evaluations_month', 'month_reference'),
+    )
+
     FOLLOW_UP_STATUS_MAP = {
         'not_required': ('Sem acompanhamento', 'secondary'),
         'open': ('Pendente', 'danger'),
@@ -973,6 +1135,87 @@ class SupplierEvaluation(db.Model):
         return f'<SupplierEvaluation {self.supplier.company_name} - {self.month_reference}>'
 
 
+class SupplierScoreColumnsMixin:
+    """Colunas comuns aos consolidados de pontuação de fornecedores"""
+    evaluations_count = db.Column(db.Integer, nullable=False, default=0)
+    scored_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    compliant_count = db.Column(db.Integer, nullable=False, default=0)
+    non_compliant_count = db.Column(db.Integer, nullable=False, default=0)
+    last_evaluation_date = db.Column(db.DateTime, nullable=True)
+    last_scored_date = db.Column(db.DateTime, nullable=True)
+
+    @property
+    def average_score(self):
+        """Média do total_score considerando apenas avaliações com serviço prestado"""
+        if not self.scored_count:
+            return 0
+        return round(self.score_sum / self.scored_count, 2)
+
+    @property
+    def average_rating(self):
+        """Média da nota geral (overall_rating) de todas as avaliações"""
+        if not self.evaluations_count:
+            return 0
+        return round(self.rating_sum / self.evaluations_count, 2)
+
+
+class SupplierMonthlyScore(SupplierScoreColumnsMixin, db.Model):
+    """Consolidado de avaliações por fornecedor e mês de referência"""
+    __tablename__ = 'supplier_monthly_scores'
+
+    id = db.Column(db.Integer, primary_key=True)
+    supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.id', ondelete='CASCADE'), nullable=False)
+    month_reference = db.Column(db.String(7), nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('supplier_id', 'month_reference', name='uq_supplier_monthly_score'),
+        db.Index('ix_supplier_monthly_scores_month', 'month_reference'),
+    )
+
+    def __repr__(self):
+        return f'<SupplierMonthlyScore {self.supplier_id} - {self.month_reference}>'
+
+
+class SupplierScoreSummary(SupplierScoreColumnsMixin, db.Model):
+    """Consolidado geral de avaliações por fornecedor"""
+    __tablename__ = 'supplier_score_summaries'
+
+    supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.id', ondelete='CASCADE'), primary_key=True)
+
+    def __repr__(self):
+        return f'<SupplierScoreSummary {self.supplier_id}>'
+
+
+class SupplierAttachment(db.Model):
+    """Documentos (PDF/contratos) anexados ao cadastro de um fornecedor"""
+    __tablename__ = 'supplier_attachments'
+
+    id = db.Column(db.Integer, primary_key=True)
+    supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.id', ondelete='CASCADE'), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    stored_filename = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    sha256 = db.Column(db.String(64), nullable=True, index=True)
+    uploaded_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    uploaded_by_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
+
+    supplier = db.relationship('Supplier', backref=db.backref('attachments', lazy='dynamic', cascade='all, delete-orphan', order_by='SupplierAttachment.uploaded_at'))
+    uploaded_by = db.relationship('User', foreign_keys=[uploaded_by_id])
+
+    __table_args__ = (
+        db.UniqueConstraint('supplier_id', 'stored_filename', name='uq_supplier_attachment_stored'),
+    )
+
+    @property
+    def url(self):
+        return url_for('suppliers.download_supplier_document', supplier_id=self.supplier_id, filename=self.stored_filename)
+
+    def __repr__(self):
+        return f'<SupplierAttachment {self.supplier_id} - {self.filename}>'
+
+
 class SupplierIssueTracking(db.Model):
     """Modelo para rastrear histórico de ações sobre problemas de fornecedores"""
     __tablename__ = 'supplier_issue_tracking'
@@ -996,6 +1239,11 @@ class SupplierIssueTracking(db.Model):
     supplier = db.relationship('Supplier', backref=db.backref('issue_history', lazy='dynamic', cascade='all, delete-orphan', order_by='SupplierIssueTracking.created_at.desc()'))
     evaluation = db.relationship('SupplierEvaluation', back_populates='follow_up_entries')
     user = db.relationship('User', foreign_keys=[user_id])
+
+    __table_args__ = (
+        # Paginação do histórico por fornecedor: created_at DESC, id DESC
+        db.Index('ix_supplier_issue_tracking_supplier_created', 'supplier_id', 'created_at', 'id'),
+    )
     
     def get_action_icon(self):
         """Retorna ícone apropriado para o tipo de ação"""
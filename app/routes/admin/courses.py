@@ -1,10 +1,26 @@
-﻿from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, send_from_directory
+﻿from flask import Blueprint, Response, jsonify, render_template, request, redirect, url_for, flash, current_app, stream_with_context
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
-from app.models import db, Course, UserCourseProgress, Quiz, UserQuizAttempt, CourseEnrollmentTerm
+from app.models import db, CertificateBatch, Course, UserCourseProgress, Quiz, UserQuizAttempt, CourseEnrollmentTerm, User
 from app.utils.rbac_permissions import require_permission
+from app.utils.blob_storage import blob_path, resolve_path, store_blob
+from app.utils.certificates import (
+    discard_certificates, get_certificate, iter_certificates_zip, start_certificate_batch
+)
+from app.utils.chunked_upload import claim_uploads
+from app.utils.course_reports import STATUS_IN_PROGRESS, attendance_entries, attendance_query, course_summary
+from app.utils.course_status import invalidate_course_status
+from app.utils.image_derivatives import prepare_derivatives
+from app.utils.media import send_media
+from app.utils.media_pipeline import queue_course_video
+from app.utils.progress_buffer import discard_progress
+from app.utils.training_compliance import (
+    STATUS_LABELS, compliance_filter_options, compliance_matrix, iter_compliance_csv,
+    refresh_course_compliance, refresh_training_compliance
+)
 from .utils import handle_database_error
 import os
+import json
 import logging
 import shutil
 from datetime import datetime
@@ -18,12 +34,12 @@ ALLOWED_CONTENT_TYPES = {
 }
 
 
-def _validate_course_file(file_storage, expected_type):
+def _validate_course_file(filename, expected_type):
     """Validate uploaded course file according to expected type."""
-    if not file_storage or file_storage.filename == '':
+    if not filename:
         return False, "O arquivo do curso é obrigatório."
 
-    extension = os.path.splitext(file_storage.filename)[1].lower()
+    extension = os.path.splitext(filename)[1].lower()
     allowed_extensions = ALLOWED_CONTENT_TYPES.get(expected_type, set())
     if extension not in allowed_extensions:
         if expected_type == 'video':
@@ -34,63 +50,37 @@ def _validate_course_file(file_storage, expected_type):
 
     return True, ""
 
+
+def _course_file(field, purpose):
+    """Arquivo do campo: sessão concluída do upload em partes (<campo>_upload_id) ou envio direto.
+
+    Retorna (nome, sessão de upload, arquivo do formulário); (None, None, None) se nada foi enviado.
+    """
+    claimed = claim_uploads([request.form.get(f'{field}_upload_id')], purpose, current_user.id)
+    if claimed:
+        return claimed[0].filename, claimed[0], None
+    file_storage = request.files.get(field)
+    if file_storage and file_storage.filename:
+        return secure_filename(file_storage.filename), None, file_storage
+    return None, None, None
+
+
+def _store_course_file(upload, file_storage):
+    if upload is not None:
+        return upload.sha256
+    sha256, _ = store_blob(file_storage.stream)
+    return sha256
+
 @courses_bp.route('/<int:course_id>/all-attendance')
 @login_required
 @require_permission('admin-total')
 @handle_database_error("visualizar lista de todos os alunos do curso")
 def view_course_all_attendance(course_id):
-    from app.models import User
     from sqlalchemy.orm import joinedload
     course = Course.query.options(joinedload(Course.created_by)).get_or_404(course_id)
 
-    all_users = User.query.filter_by(is_active=True).all()
-    progress_map = {p.user_id: p for p in UserCourseProgress.query.filter_by(course_id=course_id).all()}
-    enrollment_map = {e.user_id: e for e in CourseEnrollmentTerm.query.filter_by(course_id=course_id).all()}
-
-    completed = []
-    in_progress = []
-    not_started = []
-    for user in all_users:
-        progress = progress_map.get(user.id)
-        enrollment = enrollment_map.get(user.id)
-        if progress and progress.completed_at:
-            best_score = None
-            if course.quiz:
-                attempt = UserQuizAttempt.query.filter_by(quiz_id=course.quiz.id, user_id=user.id).order_by(UserQuizAttempt.score.desc().nullslast()).first()
-                if attempt and attempt.score is not None:
-                    best_score = attempt.score
-            completed.append({
-                'user': user,
-                'full_name': enrollment.full_name if enrollment else user.name,
-                'email': enrollment.email if enrollment else user.email,
-                'accepted_at': enrollment.accepted_at if enrollment else None,
-                'score': best_score,
-                'progress': progress
-            })
-        elif progress and progress.last_watched_timestamp > 0:
-            in_progress.append({
-                'user': user,
-                'full_name': enrollment.full_name if enrollment else user.name,
-                'email': enrollment.email if enrollment else user.email,
-                'accepted_at': enrollment.accepted_at if enrollment else None,
-                'score': None,
-                'progress': progress
-            })
-        else:
-            not_started.append({
-                'user': user,
-                'full_name': enrollment.full_name if enrollment else user.name,
-                'email': enrollment.email if enrollment else user.email,
-                'accepted_at': enrollment.accepted_at if enrollment else None,
-                'score': None,
-                'progress': None
-            })
-
-    completed.sort(key=lambda e: (e['full_name'] or '').lower())
-    in_progress.sort(key=lambda e: (e['full_name'] or '').lower())
-    not_started.sort(key=lambda e: (e['full_name'] or '').lower())
-
-    enrollments = completed + in_progress + not_started
+    rows = attendance_query(course_id, course.quiz.id if course.quiz else None).all()
+    enrollments = attendance_entries(rows)
 
     start_date = request.args.get('start_date', '________________')
     start_time = request.args.get('start_time', '________')
@@ -117,31 +107,11 @@ def view_course_all_attendance(course_id):
 @require_permission('admin-total')
 @handle_database_error("visualizar lista de alunos não iniciaram do curso")
 def view_course_not_started(course_id):
-    from app.models import User
     from sqlalchemy.orm import joinedload
     course = Course.query.options(joinedload(Course.created_by)).get_or_404(course_id)
 
-    all_users = User.query.filter_by(is_active=True).all()
-    progressed_users = set(
-        p.user_id for p in UserCourseProgress.query.filter_by(course_id=course_id).all()
-    )
-    not_started_users = [u for u in all_users if u.id not in progressed_users]
-
-    enrollments = []
-    for user in not_started_users:
-        enrollment_term = CourseEnrollmentTerm.query.filter_by(course_id=course_id, user_id=user.id).first()
-        enrollments.append(
-            {
-                'user': user,
-                'full_name': enrollment_term.full_name if enrollment_term else user.name,
-                'email': enrollment_term.email if enrollment_term else user.email,
-                'accepted_at': enrollment_term.accepted_at if enrollment_term else None,
-                'score': None,
-                'progress': None
-            }
-        )
-
-    enrollments.sort(key=lambda e: (e['full_name'] or '').lower())
+    rows = attendance_query(course_id).filter(UserCourseProgress.id.is_(None)).all()
+    enrollments = attendance_entries(rows)
 
     start_date = request.args.get('start_date', '________________')
     start_time = request.args.get('start_time', '________')
@@ -172,35 +142,10 @@ def view_course_in_progress(course_id):
     from sqlalchemy.orm import joinedload
     course = Course.query.options(joinedload(Course.created_by)).get_or_404(course_id)
 
-    in_progress = UserCourseProgress.query.filter(
-        UserCourseProgress.course_id == course_id,
-        UserCourseProgress.completed_at == None,
-        UserCourseProgress.last_watched_timestamp > 0
+    rows = attendance_query(
+        course_id, course.quiz.id if course.quiz else None, statuses=[STATUS_IN_PROGRESS], active_only=False
     ).all()
-
-    enrollments = []
-    for prog in in_progress:
-        user = prog.user
-        enrollment_term = CourseEnrollmentTerm.query.filter_by(course_id=course_id, user_id=prog.user_id).first()
-
-        best_score = None
-        if course.quiz:
-            attempt = UserQuizAttempt.query.filter_by(quiz_id=course.quiz.id, user_id=prog.user_id).order_by(UserQuizAttempt.score.desc().nullslast()).first()
-            if attempt and attempt.score is not None:
-                best_score = attempt.score
-
-        enrollments.append(
-            {
-                'user': user,
-                'full_name': enrollment_term.full_name if enrollment_term else (user.name if user else ''),
-                'email': enrollment_term.email if enrollment_term else (user.email if user else '---'),
-                'accepted_at': enrollment_term.accepted_at if enrollment_term else None,
-                'score': best_score,
-                'progress': prog
-            }
-        )
-
-    enrollments.sort(key=lambda e: (e['full_name'] or '').lower())
+    enrollments = attendance_entries(rows)
 
     start_date = request.args.get('start_date', '________________')
     start_time = request.args.get('start_time', '________')
@@ -277,8 +222,8 @@ def create_course():
         flash("Título do curso é obrigatório.", "danger")
         return redirect(url_for("admin.courses.manage_courses"))
 
-    course_file = request.files.get('video')
-    is_valid, error_message = _validate_course_file(course_file, content_type)
+    course_filename, course_upload, course_file = _course_file('video', 'course_content')
+    is_valid, error_message = _validate_course_file(course_filename, content_type)
     if not is_valid:
         flash(error_message, "danger")
         return redirect(url_for("admin.courses.manage_courses"))
@@ -288,33 +233,33 @@ def create_course():
     sources = request.form.get('sources', '').strip()
     scope = request.form.get('scope', '').strip()
 
-    course_folder_name = secure_filename(title)
-    course_upload_path = os.path.join('/app/uploads/courses', course_folder_name)
-    os.makedirs(course_upload_path, exist_ok=True)
-
-    course_filename = secure_filename(course_file.filename)
-    course_file.save(os.path.join(course_upload_path, course_filename))
+    video_sha256 = _store_course_file(course_upload, course_file)
 
-    image_filename = None
-    image_field = request.files.get('image')
-    if image_field and image_field.filename:
-        image_filename = secure_filename(image_field.filename)
-        image_field.save(os.path.join(course_upload_path, image_filename))
+    image_sha256 = None
+    image_filename, image_upload, image_field = _course_file('image', 'course_image')
+    if image_filename:
+        image_sha256 = _store_course_file(image_upload, image_field)
 
     new_course = Course(
         title=title,
         description=description,
         video_filename=course_filename,
+        video_sha256=video_sha256,
         image_filename=image_filename,
+        image_sha256=image_sha256,
         duration_seconds=duration_seconds,
         date_registry=datetime.utcnow(),
         created_by_id=current_user.id,
         sources=sources if sources else None,
         scope=scope if scope else None
     )
+    queue_course_video(new_course)
 
     db.session.add(new_course)
     db.session.commit()
+    invalidate_course_status()
+    if image_sha256:
+        prepare_derivatives(blob_path(image_sha256), etag=image_sha256)
 
     logger.info(f"Curso criado por {current_user.username}: {title}")
     flash("Novo curso criado com sucesso!", "success")
@@ -329,6 +274,7 @@ def edit_course(course_id):
     course = Course.query.get_or_404(course_id)
     
     old_title = course.title
+    old_duration = course.duration_seconds
     new_title = request.form.get('title', '').strip()
     
     if not new_title:
@@ -357,15 +303,15 @@ def edit_course(course_id):
     
     os.makedirs(new_course_path, exist_ok=True)
 
-    new_file = request.files.get('video')
-    if new_file and new_file.filename:
+    new_filename, new_upload, new_file = _course_file('video', 'course_content')
+    if new_filename:
         requested_type = request.form.get('content_type', course.content_type or 'video')
-        is_valid, error_message = _validate_course_file(new_file, requested_type)
+        is_valid, error_message = _validate_course_file(new_filename, requested_type)
         if not is_valid:
             flash(error_message, "danger")
             return redirect(url_for("admin.courses.manage_courses"))
 
-        if course.video_filename:
+        if course.video_filename and not course.video_sha256:
             old_file_path = os.path.join(new_course_path, course.video_filename)
             if os.path.exists(old_file_path):
                 try:
@@ -373,26 +319,31 @@ def edit_course(course_id):
                 except Exception as e:
                     logger.warning(f"Não foi possível remover arquivo antigo do curso: {str(e)}")
 
-        new_filename = secure_filename(new_file.filename)
-        new_file.save(os.path.join(new_course_path, new_filename))
+        # O blob anterior perde a referência e é removido pela coleta de lixo
+        course.video_sha256 = _store_course_file(new_upload, new_file)
         course.video_filename = new_filename
+        queue_course_video(course)
 
-    if 'image' in request.files and request.files['image'].filename != '':
-        image_file = request.files['image']
-        if image_file:
-            if course.image_filename:
-                old_image_path = os.path.join(new_course_path, course.image_filename)
-                if os.path.exists(old_image_path):
-                    try:
-                        os.remove(old_image_path)
-                    except Exception as e:
-                        logger.warning(f"Não foi possível remover imagem antiga: {str(e)}")
-
-            image_filename = secure_filename(image_file.filename)
-            image_file.save(os.path.join(new_course_path, image_filename))
-            course.image_filename = image_filename
+    image_filename, image_upload, image_file = _course_file('image', 'course_image')
+    if image_filename:
+        if course.image_filename and not course.image_sha256:
+            old_image_path = os.path.join(new_course_path, course.image_filename)
+            if os.path.exists(old_image_path):
+                try:
+                    os.remove(old_image_path)
+                except Exception as e:
+                    logger.warning(f"Não foi possível remover imagem antiga: {str(e)}")
+
+        course.image_sha256 = _store_course_file(image_upload, image_file)
+        course.image_filename = image_filename
 
     db.session.commit()
+    invalidate_course_status()
+    if image_filename:
+        prepare_derivatives(blob_path(course.image_sha256), etag=course.image_sha256)
+    # Título e carga horária são impressos no certificado
+    if course.title != old_title or course.duration_seconds != old_duration:
+        discard_certificates(course.id)
 
     logger.info(f"Curso editado por {current_user.username}: {course.title}")
     flash(f'Curso "{course.title}" atualizado com sucesso!', 'success')
@@ -408,6 +359,7 @@ def toggle_course_status(course_id):
     course.is_active = not course.is_active
 
     db.session.commit()
+    invalidate_course_status()
 
     status_text = "ativado" if course.is_active else "desativado"
     logger.info(f"Curso {status_text} por {current_user.username}: {course.title}")
@@ -431,6 +383,7 @@ def delete_course(course_id):
 
     db.session.delete(course_to_delete)
     db.session.commit()
+    invalidate_course_status()
 
     logger.info(f"Curso deletado por {current_user.username}: {course_title}")
     flash(f'Curso "{course_title}" foi excluído com sucesso.', "success")
@@ -440,109 +393,90 @@ def delete_course(course_id):
 @login_required
 @require_permission('admin-total')
 def view_course_progress(course_id):
-    from app.models import User
     course = Course.query.get_or_404(course_id)
+    quiz_id = course.quiz.id if course.quiz else None
+    search = request.args.get('search', '').strip()
+    page = request.args.get('page', 1, type=int)
+    per_page = 50
 
-    all_users = User.query.filter_by(is_active=True).all()
-    
-    progress_map = {}
-    progress_records = UserCourseProgress.query.filter_by(course_id=course_id).all()
-    for progress in progress_records:
-        progress_map[progress.user_id] = progress
-
-    enrollment_map = {}
-    enrollment_records = CourseEnrollmentTerm.query.filter_by(course_id=course_id).all()
-    for enrollment in enrollment_records:
-        enrollment_map[enrollment.user_id] = enrollment
-
-    all_progress_data = []
-    for user in all_users:
-        if user.id in progress_map:
-            all_progress_data.append({
-                'user': user,
-                'progress': progress_map[user.id],
-                'has_progress': True,
-                'enrollment_term': enrollment_map.get(user.id)
-            })
-        else:
-            all_progress_data.append({
-                'user': user,
-                'progress': None,
-                'has_progress': False,
-                'enrollment_term': enrollment_map.get(user.id)
-            })
-
-    all_progress_data.sort(key=lambda x: (not x['has_progress'], x['user'].name.lower()))
-
-    total_users = len(all_users)
-    users_completed = len([x for x in all_progress_data if x['progress'] and x['progress'].completed_at])
-    users_with_progress = len([x for x in all_progress_data if x['has_progress']])
-    users_not_started = total_users - users_with_progress
-    users_not_completed = len([x for x in all_progress_data if x['progress'] and not x['progress'].completed_at])
+    summary = course_summary(course_id, quiz_id)
+    pagination = attendance_query(course_id, quiz_id, search=search).paginate(
+        page=page,
+        per_page=per_page,
+        error_out=False
+    )
 
-    total_score = 0
-    quiz_attempts = 0
+    progress_data = []
     attempts_map = {}
-
-    if course.quiz:
-        from app.models import UserQuizAttempt
-        attempts = UserQuizAttempt.query.filter_by(quiz_id=course.quiz.id).all()
-        for attempt in attempts:
-            if attempt.score is not None:
-                total_score += attempt.score
-                quiz_attempts += 1
-            
-            user_id = attempt.user_id
-            if user_id not in attempts_map or (attempt.score and attempt.score > attempts_map[user_id].get('score', 0)):
-                attempts_map[user_id] = {
-                    'score': attempt.score,
-                    'submitted_at': attempt.submitted_at,
-                    'answers': attempt.answers
-                }
-
-    average_score = (total_score / quiz_attempts) if quiz_attempts > 0 else 0
-
-    chart_data = {'labels': [], 'data': []}
-    if course.quiz and quiz_attempts > 0:
-        score_ranges = {
-            '0-20%': 0,
-            '21-40%': 0,
-            '41-60%': 0,
-            '61-80%': 0,
-            '81-100%': 0
-        }
-        for user_id, attempt_data in attempts_map.items():
-            score = attempt_data.get('score', 0)
-            if score <= 20:
-                score_ranges['0-20%'] += 1
-            elif score <= 40:
-                score_ranges['21-40%'] += 1
-            elif score <= 60:
-                score_ranges['41-60%'] += 1
-            elif score <= 80:
-                score_ranges['61-80%'] += 1
-            else:
-                score_ranges['81-100%'] += 1
-        
-        chart_data = {
-            'labels': list(score_ranges.keys()),
-            'data': list(score_ranges.values())
-        }
-
-    import json
-    chart_data_json = json.dumps(chart_data)
+    for user, progress, enrollment, best_score, _ in pagination.items:
+        progress_data.append({
+            'user': user,
+            'progress': progress,
+            'has_progress': progress is not None,
+            'enrollment_term': enrollment
+        })
+        if best_score is not None:
+            attempts_map[user.id] = {'score': best_score}
 
     return render_template(
         'training/course_progress.html',
         course=course,
-        progress_data=all_progress_data,
-        average_score=average_score,
+        progress_data=progress_data,
+        pagination=pagination,
+        search=search,
+        average_score=summary['average_score'],
         attempts_map=attempts_map,
-        chart_data_json=chart_data_json,
-        total_users=total_users,
-        users_completed=users_completed,
-        users_not_started=users_not_started,
-        users_not_completed=users_not_completed
+        chart_data_json=json.dumps(summary['chart_data']),
+        total_users=summary['total_users'],
+        users_completed=summary['users_completed'],
+        users_not_started=summary['users_not_started'],
+        users_not_completed=summary['users_not_completed']
+    )
+
+
+def _compliance_filters():
+    return {
+        'sector': request.args.get('sector', '').strip() or None,
+        'job_position_id': request.args.get('job_position_id', type=int),
+        'scope': request.args.get('scope', '').strip() or None,
+        'search': request.args.get('search', '').strip() or None
+    }
+
+@courses_bp.route('/compliance')
+@login_required
+@require_permission('admin-total')
+@handle_database_error("visualizar matriz de conformidade")
+def view_compliance_matrix():
+    """Matriz usuários × cursos ativos, filtrável por setor, cargo e abrangência"""
+    filters = _compliance_filters()
+    page = request.args.get('page', 1, type=int)
+    matrix = compliance_matrix(page=page, **filters)
+    sectors, positions = compliance_filter_options()
+    scopes = [scope for (scope,) in db.session.query(Course.scope).filter(
+        Course.is_active.is_(True), Course.scope.isnot(None)
+    ).distinct().order_by(Course.scope)]
+
+    return render_template(
+        'training/compliance_matrix.html',
+        filters=filters,
+        extra_params={key: value for key, value in filters.items() if value},
+        sectors=sectors,
+        positions=positions,
+        scopes=scopes,
+        status_labels=STATUS_LABELS,
+        **matrix
+    )
+
+@courses_bp.route('/compliance/export')
+@login_required
+@require_permission('admin-total')
+def export_compliance_matrix():
+    """CSV da matriz (uma linha por usuário e curso) gerado em streaming"""
+    filename = f"conformidade_treinamentos_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
+    return Response(
+        stream_with_context(iter_compliance_csv(**_compliance_filters())),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
     )
 
 
@@ -636,7 +570,10 @@ def reset_course_progress(course_id):
     course = Course.query.get_or_404(course_id)
 
     UserCourseProgress.query.filter_by(course_id=course_id).delete()
+    refresh_course_compliance(db.session.connection(), {course_id})
     db.session.commit()
+    invalidate_course_status()
+    discard_progress(course_id)
 
     logger.info(f"Progresso resetado por {current_user.username} no curso: {course.title}")
     flash(f'Progresso de todos os usuários no curso "{course.title}" foi resetado.', 'success')
@@ -656,7 +593,10 @@ def reset_user_course_progress(course_id, user_id):
     if course.quiz:
         UserQuizAttempt.query.filter_by(quiz_id=course.quiz.id, user_id=user_id).delete()
     
+    refresh_training_compliance(db.session.connection(), {(user_id, course_id)})
     db.session.commit()
+    invalidate_course_status()
+    discard_progress(course_id, user_id)
 
     logger.info(f"Progresso resetado por {current_user.username} para usuário {user.username} no curso: {course.title}")
     flash(f'Progresso do usuário "{user.username}" no curso "{course.title}" foi resetado.', 'success')
@@ -678,13 +618,13 @@ def serve_course_video(course_id):
 
         course_folder_name = secure_filename(course.title)
         content_path = os.path.join('/app/uploads/courses', course_folder_name)
-        file_path = os.path.join(content_path, course.video_filename)
+        file_path = resolve_path(course.video_sha256, os.path.join(content_path, course.video_filename))
 
-        if not os.path.exists(file_path):
+        if not os.path.isfile(file_path):
             flash("Arquivo do curso não encontrado no servidor.", "warning")
             return redirect(url_for('admin.courses.manage_courses'))
 
-        return send_from_directory(content_path, course.video_filename)
+        return send_media(file_path, download_name=course.video_filename, etag=course.video_sha256)
     except Exception as e:
         logger.error(f"Erro ao servir arquivo do curso: {str(e)}")
         return redirect(url_for('admin.courses.manage_courses'))
@@ -694,44 +634,65 @@ def serve_course_video(course_id):
 @require_permission('view_courses')
 def view_user_certificate(course_id, user_id):
     """Rota para o gestor visualizar o certificado de um usuário específico"""
-    from app.models import User
-    from sqlalchemy.orm import joinedload
-    
-    course = Course.query.options(joinedload(Course.created_by)).get_or_404(course_id)
+    course = Course.query.get_or_404(course_id)
     user = User.query.get_or_404(user_id)
-    
-    # Buscar progresso do usuário
-    progress = UserCourseProgress.query.filter_by(
-        user_id=user_id,
-        course_id=course_id
-    ).first()
-    
-    # Verificar se o curso foi concluído
-    if not progress or not progress.completed_at:
+
+    html = get_certificate(course, user)
+    if html is None:
         flash(f"O usuário {user.name} ainda não concluiu este treinamento.", "warning")
         return redirect(url_for('admin.courses.view_course_progress', course_id=course_id))
-    
-    # Buscar termo de inscrição
-    enrollment = CourseEnrollmentTerm.query.filter_by(
-        user_id=user_id,
-        course_id=course_id
-    ).first()
-    
-    # Buscar melhor tentativa do quiz (se houver)
-    attempt = None
-    if course.quiz:
-        attempt = UserQuizAttempt.query.filter_by(
-            user_id=user_id,
-            quiz_id=course.quiz.id
-        ).order_by(UserQuizAttempt.score.desc()).first()
-    
-    return render_template(
-        'training/course_certificate.html',
-        course=course,
-        user=user,
-        progress=progress,
-        enrollment=enrollment,
-        attempt=attempt
+
+    return Response(html, mimetype='text/html')
+
+@courses_bp.route('/<int:course_id>/certificates/batch', methods=['POST'])
+@login_required
+@require_permission('view_courses')
+def start_certificates_batch(course_id):
+    """Inicia a geração em segundo plano dos certificados de todos os concluintes"""
+    course = Course.query.get_or_404(course_id)
+    try:
+        batch = start_certificate_batch(course, current_user.id)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Erro ao iniciar geração de certificados do curso {course_id}: {str(e)}")
+        return jsonify({'success': False, 'message': 'Erro ao iniciar a geração dos certificados.'}), 500
+
+    return jsonify({
+        'success': True,
+        'batch_id': batch.id,
+        'status_url': url_for('admin.courses.certificates_batch_status', batch_id=batch.id)
+    })
+
+@courses_bp.route('/certificates/batch/<batch_id>')
+@login_required
+@require_permission('view_courses')
+def certificates_batch_status(batch_id):
+    """Andamento de uma geração de certificados em lote"""
+    batch = db.session.get(CertificateBatch, batch_id)
+    if batch is None:
+        return jsonify({'success': False, 'message': 'Lote não encontrado.'}), 404
+
+    return jsonify({
+        'success': True,
+        'status': batch.status,
+        'total': batch.total,
+        'generated': batch.generated,
+        'message': batch.error,
+        'download_url': url_for('admin.courses.download_certificates', course_id=batch.course_id)
+    })
+
+@courses_bp.route('/<int:course_id>/certificates.zip')
+@login_required
+@require_permission('view_courses')
+def download_certificates(course_id):
+    """ZIP com os certificados já gerados dos concluintes do curso"""
+    course = Course.query.get_or_404(course_id)
+    filename = f"certificados_{secure_filename(course.title) or course.id}.zip"
+
+    return Response(
+        stream_with_context(iter_certificates_zip(course.id)),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
     )
 
 @courses_bp.route('/<int:course_id>/image')
@@ -745,8 +706,9 @@ def serve_course_image(course_id):
 
         course_folder_name = secure_filename(course.title)
         image_path = os.path.join('/app/uploads/courses', course_folder_name)
+        file_path = resolve_path(course.image_sha256, os.path.join(image_path, course.image_filename))
 
-        return send_from_directory(image_path, course.image_filename)
+        return send_media(file_path, download_name=course.image_filename, etag=course.image_sha256)
     except Exception as e:
         logger.error(f"Erro ao servir imagem do curso: {str(e)}")
         return redirect(url_for('static', filename='images/default_course.png'))
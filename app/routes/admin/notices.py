@@ -3,8 +3,10 @@ import os
 import uuid
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, send_from_directory
 from flask_login import current_user, login_required
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
 from app.models import db, Notice
+from app.utils.image_derivatives import discard_derivatives, prepare_derivatives, send_image
 from .utils import admin_required, handle_database_error, create_secure_folder, validate_file_extension, logger
 
 notices_bp = Blueprint('notices', __name__, url_prefix='/notices')
@@ -81,7 +83,9 @@ def create_image_notice():
         return redirect(url_for("admin.notices.manage_notices"))
     
     unique_filename = f"{uuid.uuid4().hex}_{filename}"
-    image_file.save(os.path.join(upload_path, unique_filename))
+    image_path = os.path.join(upload_path, unique_filename)
+    image_file.save(image_path)
+    prepare_derivatives(image_path)
     
     new_notice = Notice(
         image_filename=unique_filename, 
@@ -126,6 +130,7 @@ def delete_notice(notice_id):
                 notice_to_delete.image_filename
             )
             if os.path.exists(image_path):
+                discard_derivatives(image_path)
                 os.remove(image_path)
         except Exception as e:
             logger.warning(f"Erro ao remover arquivo de imagem: {str(e)}")
@@ -144,11 +149,15 @@ def delete_notice(notice_id):
 def serve_notice_image(filename):
     try:
         notice_upload_path = '/app/uploads/notices'
-        file_path = os.path.join(notice_upload_path, filename)
-        if not os.path.exists(file_path) or not os.path.isfile(file_path):
+        file_path = safe_join(notice_upload_path, filename)
+        if not file_path or not os.path.isfile(file_path):
             flash("Arquivo não encontrado.", "warning")
             return redirect(url_for('admin.notices.manage_notices'))
         
+        if request.args.get('w', type=int):
+            # Miniatura do mural (WebP/JPEG); o nome do arquivo é único, então a URL não muda de conteúdo
+            return send_image(file_path, download_name=filename)
+
         return send_from_directory(notice_upload_path, filename)
     except Exception as e:
         logger.error(f"Erro ao servir imagem: {str(e)}")
@@ -2,8 +2,12 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 from app.models import db, Course, Quiz, Question, QuestionType, AnswerOption, QuizAttachment, UserQuizAttempt
+from app.utils.blob_storage import store_blob
+from app.utils.course_status import invalidate_course_status
+from app.utils.training_compliance import refresh_course_compliance
 from .utils import admin_required, handle_database_error
 import os
+import uuid
 import logging
 import json
 
@@ -210,17 +214,15 @@ def upload_quiz_attachment(quiz_id):
     
     try:
         filename = secure_filename(file.filename)
-        filepath = os.path.join('quiz_attachments', filename)
-        
-        upload_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'quiz_attachments')
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        file.save(os.path.join(upload_folder, filename))
+        blob_sha256, _ = store_blob(file.stream)
+        # filepath passa a ser apenas um identificador único; o conteúdo fica no armazenamento por hash
+        filepath = os.path.join('quiz_attachments', f"{uuid.uuid4().hex[:8]}_{filename}")
         
         attachment = QuizAttachment(
             filename=filename,
             filepath=filepath,
-            quiz_id=quiz.id
+            quiz_id=quiz.id,
+            blob_sha256=blob_sha256
         )
         db.session.add(attachment)
         db.session.commit()
@@ -247,7 +249,7 @@ def delete_quiz_attachment(attachment_id):
     
     try:
         file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], attachment.filepath)
-        if os.path.exists(file_path):
+        if not attachment.blob_sha256 and os.path.exists(file_path):
             os.remove(file_path)
         
         db.session.delete(attachment)
@@ -279,7 +281,9 @@ def reset_quiz_attempts(quiz_id):
     quiz = Quiz.query.get_or_404(quiz_id)
     
     UserQuizAttempt.query.filter_by(quiz_id=quiz_id).delete()
+    refresh_course_compliance(db.session.connection(), {quiz.course_id})
     db.session.commit()
+    invalidate_course_status()
     
     logger.info(f"Tentativas do quiz resetadas por {current_user.username}: {quiz.title}")
     flash('Todas as tentativas do quiz foram resetadas.', 'success')
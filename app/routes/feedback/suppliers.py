@@ -1,14 +1,23 @@
 """
 Rotas para gerenciamento de Fornecedores/Prestadores e suas Avaliações
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file, make_response
 from flask_login import login_required, current_user
-from app.models import db, Supplier, SupplierEvaluation, User, SupplierIssueTracking
+from app.models import db, Supplier, SupplierEvaluation, User, SupplierIssueTracking, SupplierMonthlyScore, SupplierScoreSummary, SupplierAttachment
 from datetime import datetime, date
 from calendar import monthrange
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
 from app.utils.rbac_permissions import require_permission
+from app.utils.user_search import search_active_users
+from app.utils.supplier_attachments import save_supplier_documents, remove_legacy_file, attachment_path
+from app.utils.blob_storage import resolve_path, store_blob
+from app.utils.chunked_upload import claim_uploads
+from app.utils.supplier_evaluators import set_supplier_evaluators, assign_evaluator_to_suppliers
+import base64
 import mimetypes
+import os
 
 suppliers_bp = Blueprint('suppliers', __name__, url_prefix='/feedback/suppliers')
 
@@ -98,6 +107,73 @@ def _update_follow_up_status(evaluation: SupplierEvaluation, action_type: str):
 # DASHBOARD E RELATÓRIOS
 # ============================================
 
+def _dashboard_aggregates_query(month=None):
+    """Consulta do consolidado por fornecedor ativo (do mês informado ou geral)."""
+    if month:
+        query = SupplierMonthlyScore.query.filter(SupplierMonthlyScore.month_reference == month)
+        model = SupplierMonthlyScore
+    else:
+        query = SupplierScoreSummary.query
+        model = SupplierScoreSummary
+    return query.join(Supplier, Supplier.id == model.supplier_id).filter(Supplier.is_active.is_(True))
+
+
+def _dashboard_aggregates(month=None):
+    """Lê do consolidado, por fornecedor ativo, score médio, contagem e data da última avaliação.
+
+    Sem filtro de mês a contagem considera todas as avaliações (como `get_evaluations_count`);
+    com filtro, apenas as avaliações com serviço prestado no mês.
+    """
+    return {row.supplier_id: row for row in _dashboard_aggregates_query(month).all()}
+
+
+def _dashboard_reference_query(month=None):
+    """Consulta das avaliações de referência: `last_rank` 1 é a última, `failing_rank` 1 a reprovada."""
+    is_failing = SupplierEvaluation.total_score < 60
+    last_order = [desc(SupplierEvaluation.evaluation_date), desc(SupplierEvaluation.id)]
+    failing_order = last_order
+    if month:
+        # No mês filtrado, avaliações com serviço têm precedência sobre "sem serviço"
+        # e a reprovada de referência é a primeira registrada no mês
+        last_order = [desc(SupplierEvaluation.had_service_last_month)] + last_order
+        failing_order = [SupplierEvaluation.id]
+
+    ranked = db.session.query(
+        SupplierEvaluation.id,
+        SupplierEvaluation.supplier_id,
+        SupplierEvaluation.had_service_last_month,
+        is_failing.label('is_failing'),
+        func.row_number().over(
+            partition_by=SupplierEvaluation.supplier_id,
+            order_by=last_order
+        ).label('last_rank'),
+        func.row_number().over(
+            partition_by=(SupplierEvaluation.supplier_id, is_failing),
+            order_by=failing_order
+        ).label('failing_rank')
+    ).join(Supplier).filter(Supplier.is_active.is_(True))
+    if month:
+        ranked = ranked.filter(SupplierEvaluation.month_reference == month)
+    ranked = ranked.subquery()
+
+    return db.session.query(ranked).filter(
+        or_(ranked.c.last_rank == 1, and_(ranked.c.is_failing.is_(True), ranked.c.failing_rank == 1))
+    )
+
+
+def _dashboard_reference_evaluations(month=None):
+    """Retorna, por fornecedor, a última avaliação e a avaliação reprovada (< 60) de referência."""
+    rows = _dashboard_reference_query(month).all()
+
+    last_evals, failing_evals = {}, {}
+    for row in rows:
+        if row.last_rank == 1:
+            last_evals[row.supplier_id] = row
+        if row.is_failing and row.failing_rank == 1:
+            failing_evals[row.supplier_id] = row
+    return last_evals, failing_evals
+
+
 @suppliers_bp.route('/dashboard')
 @login_required
 def dashboard():
@@ -113,60 +189,33 @@ def dashboard():
     # Buscar todos os fornecedores ativos
     suppliers = Supplier.query.filter_by(is_active=True).all()
     
-    # Calcular scores médios e ordenar
+    # Agregados por fornecedor em consultas agrupadas (sem consultas por fornecedor)
+    aggregates = _dashboard_aggregates(month)
+    last_evals, failing_evals = _dashboard_reference_evaluations(month)
+    
     suppliers_data = []
     for supplier in suppliers:
-        # Se há filtro de mês, calcular score apenas para esse mês
+        agg = aggregates.get(supplier.id)
+        last_eval = last_evals.get(supplier.id)
+        scored_count = agg.scored_count if agg else 0
+        avg_score = agg.average_score if agg else 0
+        
         if month:
-            month_evals = [e for e in supplier.evaluations.all() 
-                         if e.month_reference == month and e.had_service_last_month]
-            if month_evals:
-                avg_score = round(sum(e.total_score for e in month_evals) / len(month_evals), 2)
-                eval_count = len(month_evals)
-                last_eval = max(month_evals, key=lambda e: e.evaluation_date)
-                last_eval_date = last_eval.evaluation_date
-            else:
-                # Verificar se há avaliação sem serviço nesse mês
-                no_service_evals = [e for e in supplier.evaluations.all() 
-                                   if e.month_reference == month and not e.had_service_last_month]
-                if no_service_evals:
-                    avg_score = 0
-                    eval_count = 0  # Não conta como avaliação com score
-                    last_eval = no_service_evals[0]
-                    last_eval_date = last_eval.evaluation_date
-                else:
-                    avg_score = 0
-                    eval_count = 0
-                    last_eval = None
-                    last_eval_date = None
+            # Avaliações "sem serviço" não contam como avaliação com score
+            eval_count = scored_count
+            last_eval_date = (agg.last_scored_date or agg.last_evaluation_date) if agg else None
         else:
-            avg_score = supplier.get_average_score()
-            eval_count = supplier.get_evaluations_count()
-            last_eval_date = supplier.get_last_evaluation_date()
-            last_eval = supplier.evaluations.order_by(
-                desc(SupplierEvaluation.evaluation_date)
-            ).first() if eval_count > 0 else None
+            eval_count = agg.evaluations_count if agg else 0
+            last_eval_date = agg.last_evaluation_date if agg else None
         
         # Determinar se precisa de atenção (apenas para score baixo, não para "sem serviço")
-        needs_attention = False
         has_low_score = avg_score < 60 and eval_count > 0
+        needs_attention = has_low_score
         no_service_last_month = last_eval and not last_eval.had_service_last_month
         
-        if has_low_score:
-            needs_attention = True
-
         failing_eval = None
-        if needs_attention and eval_count > 0:
-            if month:
-                failing_evals = [e for e in supplier.evaluations.all() 
-                                if e.month_reference == month and e.total_score < 60]
-                failing_eval = failing_evals[0] if failing_evals else last_eval
-            else:
-                failing_eval = supplier.evaluations.filter(
-                    SupplierEvaluation.total_score < 60
-                ).order_by(desc(SupplierEvaluation.evaluation_date)).first()
-                if not failing_eval:
-                    failing_eval = last_eval
+        if needs_attention:
+            failing_eval = failing_evals.get(supplier.id) or last_eval
         
         # Calcular prioridade para ordenação
         if has_low_score and not supplier.issue_verified:
@@ -240,7 +289,12 @@ def dashboard():
 @require_permission('visualizar-fornecedores')
 def supplier_list():
     """Lista todos os fornecedores cadastrados"""
-    suppliers = Supplier.query.order_by(Supplier.company_name).all()
+    # Consolidado e responsáveis carregados em lote (sem consultas por linha);
+    # o seletor de responsáveis usa a busca paginada em api_search_users
+    suppliers = Supplier.query.options(
+        joinedload(Supplier.score_summary),
+        selectinload(Supplier.assigned_evaluators)
+    ).order_by(Supplier.company_name).all()
     
     suppliers_info = []
     for supplier in suppliers:
@@ -251,12 +305,8 @@ def supplier_list():
             'last_eval': supplier.get_last_evaluation_date()
         })
     
-    # Buscar todos os usuários ativos para atribuição
-    all_users = User.query.filter_by(is_active=True).order_by(User.name).all()
-    
     return render_template('feedback/suppliers/supplier_list.html',
-                         suppliers_info=suppliers_info,
-                         all_users=all_users)
+                         suppliers_info=suppliers_info)
 
 
 @suppliers_bp.route('/register', methods=['GET', 'POST'])
@@ -303,58 +353,10 @@ def register_supplier():
             db.session.flush()  # get id before commit to save files
 
             # Processar uploads de documentos (campo 'documents')
-            uploaded_files = request.files.getlist('documents')
-            attachments = []
-            if uploaded_files:
-                import os
-                from werkzeug.utils import secure_filename
-                from flask import current_app
-
-                # Diretório: uploads/fornecedores/{supplier_id}
-                upload_folder = os.path.join('/app/uploads/fornecedores', str(new_supplier.id))
-                os.makedirs(upload_folder, exist_ok=True)
-
-                for file in uploaded_files:
-                    if file and file.filename:
-                        # Validar tipo e tamanho (<= 500MB)
-                        file.seek(0, os.SEEK_END)
-                        file_size = file.tell()
-                        file.seek(0)
-
-                        # Aceitar apenas PDF
-                        allowed = (file.mimetype == 'application/pdf') or file.filename.lower().endswith('.pdf')
-                        if not allowed:
-                            # Ignorar arquivo não-PDF
-                            continue
-
-                        if file_size > 500 * 1024 * 1024:
-                            # Ignorar arquivos muito grandes
-                            continue
-
-                        filename = secure_filename(file.filename)
-                        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-                        unique_filename = f"{timestamp}_{filename}"
-                        file_path = os.path.join(upload_folder, unique_filename)
-                        file.save(file_path)
-
-                        attachments.append({
-                            'filename': filename,
-                            'stored_filename': unique_filename,
-                            'path': file_path,
-                            'size': file_size,
-                            'uploaded_at': datetime.utcnow().isoformat()
-                        })
-
-                # Salvar metadados em arquivo JSON no diretório do fornecedor
-                if attachments:
-                    import json
-                    meta_path = os.path.join(upload_folder, 'attachments.json')
-                    try:
-                        with open(meta_path, 'w', encoding='utf-8') as mf:
-                            json.dump(attachments, mf, ensure_ascii=False, indent=2)
-                    except Exception:
-                        # Não impedir cadastro se não conseguir gravar metadados
-                        pass
+            save_supplier_documents(
+                new_supplier, request.files.getlist('documents'), current_user.id,
+                uploads=claim_uploads(request.form.getlist('documents_upload_id'), 'supplier_document', current_user.id)
+            )
 
             db.session.commit()
             display_name = trade_name if trade_name else company_name
@@ -388,16 +390,7 @@ def edit_supplier(supplier_id):
         
         # Atualizar avaliadores se o usuário tiver permissão
         if current_user.has_permission('assign-supplier-evaluators') or current_user.has_permission('admin-total'):
-            evaluator_ids = request.form.getlist('evaluator_ids')
-            
-            # Limpar avaliadores atuais
-            supplier.assigned_evaluators.clear()
-            
-            # Adicionar novos avaliadores
-            for user_id in evaluator_ids:
-                user = User.query.get(int(user_id))
-                if user:
-                    supplier.assigned_evaluators.append(user)
+            set_supplier_evaluators(supplier, request.form.getlist('evaluator_ids'), current_user.id)
         
         try:
             db.session.commit()
@@ -431,6 +424,15 @@ def delete_supplier(supplier_id):
 # AVALIAÇÕES DE FORNECEDORES
 # ============================================
 
+def _existing_evaluation_query(supplier_id, evaluator_id, month_reference):
+    """Avaliação do avaliador para o fornecedor no mês (no máximo uma, pela restrição única)."""
+    return SupplierEvaluation.query.filter_by(
+        supplier_id=supplier_id,
+        evaluator_id=evaluator_id,
+        month_reference=month_reference
+    )
+
+
 @suppliers_bp.route('/evaluate', methods=['GET', 'POST'])
 @login_required
 @require_permission('avaliar-fornecedor')
@@ -450,11 +452,7 @@ def evaluate_supplier():
                 return redirect(url_for('suppliers.evaluate_supplier'))
         
         # Verificar se já existe avaliação para este mês
-        existing = SupplierEvaluation.query.filter_by(
-            supplier_id=supplier_id,
-            evaluator_id=current_user.id,
-            month_reference=month_reference
-        ).first()
+        existing = _existing_evaluation_query(supplier_id, current_user.id, month_reference).first()
         
         if existing:
             flash('Você já avaliou este fornecedor neste mês!', 'warning')
@@ -521,6 +519,13 @@ def evaluate_supplier():
             db.session.commit()
             flash(f'Avaliação registrada com sucesso! Score: {evaluation.total_score}%', 'success')
             return redirect(url_for('suppliers.dashboard'))
+        except IntegrityError as e:
+            db.session.rollback()
+            # Envio simultâneo do mesmo formulário: a restrição única já barrou a duplicata
+            if _existing_evaluation_query(supplier_id, current_user.id, month_reference).first() is not None:
+                flash('Você já avaliou este fornecedor neste mês!', 'warning')
+                return redirect(url_for('suppliers.evaluate_supplier'))
+            flash(f'Erro ao registrar avaliação: {str(e.orig)}', 'danger')
         except Exception as e:
             db.session.rollback()
             flash(f'Erro ao registrar avaliação: {str(e)}', 'danger')
@@ -585,22 +590,7 @@ def supplier_evaluations(supplier_id):
     else:
         avg_rating = 0
     
-    # Carregar anexos salvos em disco (uploads/fornecedores/{supplier_id}/attachments.json)
-    attachments = []
-    try:
-        import os, json
-        from flask import current_app, url_for
-
-        upload_folder = os.path.join('/app/uploads/fornecedores', str(supplier.id))
-        meta_path = os.path.join(upload_folder, 'attachments.json')
-        if os.path.exists(meta_path):
-            with open(meta_path, 'r', encoding='utf-8') as mf:
-                attachments = json.load(mf)
-            # Gerar URL de visualização para cada anexo
-            for att in attachments:
-                att['url'] = url_for('suppliers.download_supplier_document', supplier_id=supplier.id, filename=att.get('stored_filename'))
-    except Exception:
-        attachments = []
+    attachments = supplier.attachments.all()
 
     return render_template('feedback/suppliers/supplier_evaluations.html',
                          supplier=supplier,
@@ -625,40 +615,25 @@ def evaluation_details(evaluation_id):
 @require_permission('visualizar-fornecedores')
 def download_supplier_document(supplier_id, filename):
     """Serve um documento (PDF/contrato) cadastrado para um fornecedor."""
-    import os, json
-    from flask import current_app, flash, redirect, url_for
-
-    supplier = Supplier.query.get_or_404(supplier_id)
-
-    upload_folder = os.path.join('/app/uploads/fornecedores', str(supplier.id))
-    meta_path = os.path.join(upload_folder, 'attachments.json')
-
-    attachment = None
-    if os.path.exists(meta_path):
-        try:
-            with open(meta_path, 'r', encoding='utf-8') as mf:
-                attachments = json.load(mf)
-                attachment = next((att for att in attachments if att.get('stored_filename') == filename), None)
-        except Exception:
-            attachment = None
-
+    attachment = SupplierAttachment.query.filter_by(supplier_id=supplier_id, stored_filename=filename).first()
     if not attachment:
+        Supplier.query.get_or_404(supplier_id)
         flash('Anexo não encontrado', 'danger')
         return redirect(url_for('suppliers.supplier_evaluations', supplier_id=supplier_id))
 
-    file_path = os.path.join(upload_folder, attachment.get('stored_filename'))
+    file_path = attachment_path(attachment)
     if not os.path.exists(file_path):
         flash('Arquivo não encontrado no servidor', 'danger')
         return redirect(url_for('suppliers.supplier_evaluations', supplier_id=supplier_id))
 
-    mimetype = mimetypes.guess_type(attachment.get('filename'))[0] or 'application/octet-stream'
+    mimetype = mimetypes.guess_type(attachment.filename)[0] or 'application/octet-stream'
 
     # Enviar para visualização no navegador (não forçar download)
     return send_file(
         file_path,
         mimetype=mimetype,
         as_attachment=False,
-        download_name=attachment.get('filename')
+        download_name=attachment.filename
     )
 
 
@@ -670,66 +645,21 @@ def upload_supplier_document(supplier_id):
     Form expects `documents` file input (multiple allowed).
     """
     supplier = Supplier.query.get_or_404(supplier_id)
-    uploaded_files = request.files.getlist('documents')
-    if not uploaded_files:
+    uploaded_files = [file for file in request.files.getlist('documents') if file.filename]
+    chunked_uploads = claim_uploads(request.form.getlist('documents_upload_id'), 'supplier_document', current_user.id)
+    if not uploaded_files and not chunked_uploads:
         flash('Nenhum arquivo selecionado para upload.', 'warning')
         return redirect(url_for('suppliers.supplier_evaluations', supplier_id=supplier_id))
 
-    import os, json
-    from werkzeug.utils import secure_filename
-    from flask import current_app
-
-    upload_folder = os.path.join('/app/uploads/fornecedores', str(supplier.id))
-    os.makedirs(upload_folder, exist_ok=True)
-
-    attachments = []
-    meta_path = os.path.join(upload_folder, 'attachments.json')
-    if os.path.exists(meta_path):
-        try:
-            with open(meta_path, 'r', encoding='utf-8') as mf:
-                attachments = json.load(mf)
-        except Exception:
-            attachments = []
-
-    saved = 0
-    for file in uploaded_files:
-        if file and file.filename:
-            # Validate PDF and size
-            file.seek(0, os.SEEK_END)
-            file_size = file.tell()
-            file.seek(0)
-
-            allowed = (file.mimetype == 'application/pdf') or file.filename.lower().endswith('.pdf')
-            if not allowed:
-                continue
-            if file_size > 500 * 1024 * 1024:
-                continue
-
-            filename = secure_filename(file.filename)
-            timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-            unique_filename = f"{timestamp}_{filename}"
-            file_path = os.path.join(upload_folder, unique_filename)
-            try:
-                file.save(file_path)
-            except Exception:
-                continue
-
-            attachments.append({
-                'filename': filename,
-                'stored_filename': unique_filename,
-                'path': file_path,
-                'size': file_size,
-                'uploaded_at': datetime.utcnow().isoformat()
-            })
-            saved += 1
-
-    # Save metadata
+    saved_documents = save_supplier_documents(supplier, uploaded_files, current_user.id, uploads=chunked_uploads)
     try:
-        with open(meta_path, 'w', encoding='utf-8') as mf:
-            json.dump(attachments, mf, ensure_ascii=False, indent=2)
-    except Exception:
-        pass
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro ao registrar documentos: {str(e)}', 'danger')
+        return redirect(url_for('suppliers.supplier_evaluations', supplier_id=supplier_id))
 
+    saved = len(saved_documents)
     if saved > 0:
         flash(f'{saved} arquivo(s) enviados com sucesso.', 'success')
     else:
@@ -742,7 +672,7 @@ def upload_supplier_document(supplier_id):
 @login_required
 @require_permission('editar-fornecedor')
 def delete_supplier_document(supplier_id):
-    """Remove um documento do fornecedor (apaga arquivo e atualiza attachments.json).
+    """Remove um documento do fornecedor (apaga o registro e o arquivo).
     Espera um campo form `stored_filename` com o nome armazenado.
     """
     supplier = Supplier.query.get_or_404(supplier_id)
@@ -751,47 +681,22 @@ def delete_supplier_document(supplier_id):
         flash('Arquivo inválido para remoção.', 'danger')
         return redirect(url_for('suppliers.supplier_evaluations', supplier_id=supplier_id))
 
-    import os, json
-    from flask import current_app
-
-    upload_folder = os.path.join('/app/uploads/fornecedores', str(supplier.id))
-    meta_path = os.path.join(upload_folder, 'attachments.json')
-
-    attachments = []
-    if os.path.exists(meta_path):
-        try:
-            with open(meta_path, 'r', encoding='utf-8') as mf:
-                attachments = json.load(mf)
-        except Exception:
-            attachments = []
-
-    removed = False
-    new_attachments = []
-    for att in attachments:
-        if att.get('stored_filename') == stored:
-            # remove file from disk
-            try:
-                fp = os.path.join(upload_folder, att.get('stored_filename'))
-                if os.path.exists(fp):
-                    os.remove(fp)
-                removed = True
-            except Exception:
-                # ignore file deletion errors
-                pass
-        else:
-            new_attachments.append(att)
+    attachment = supplier.attachments.filter_by(stored_filename=stored).first()
+    if not attachment:
+        flash('Arquivo não encontrado.', 'warning')
+        return redirect(url_for('suppliers.supplier_evaluations', supplier_id=supplier_id))
 
-    # write updated metadata
     try:
-        with open(meta_path, 'w', encoding='utf-8') as mf:
-            json.dump(new_attachments, mf, ensure_ascii=False, indent=2)
-    except Exception:
-        pass
+        db.session.delete(attachment)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro ao remover arquivo: {str(e)}', 'danger')
+        return redirect(url_for('suppliers.supplier_evaluations', supplier_id=supplier_id))
 
-    if removed:
-        flash('Arquivo removido com sucesso.', 'success')
-    else:
-        flash('Arquivo não encontrado.', 'warning')
+    # O arquivo antigo só é apagado depois que o registro foi removido com sucesso
+    remove_legacy_file(attachment)
+    flash('Arquivo removido com sucesso.', 'success')
 
     return redirect(url_for('suppliers.supplier_evaluations', supplier_id=supplier_id))
 
@@ -814,19 +719,42 @@ def api_suppliers_list():
     } for s in suppliers])
 
 
+def _valid_month(value):
+    try:
+        datetime.strptime(value, '%Y-%m')
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
 @suppliers_bp.route('/api/supplier/<int:supplier_id>/stats')
 @login_required
 def api_supplier_stats(supplier_id):
-    """Retorna estatísticas de um fornecedor em JSON"""
-    supplier = Supplier.query.get_or_404(supplier_id)
-    
-    evaluations = supplier.evaluations.all()
-    
-    # Calcular médias
-    scores = [e.total_score for e in evaluations]
-    ratings = [e.overall_rating for e in evaluations]
-    
-    return jsonify({
+    """Retorna estatísticas de um fornecedor em JSON
+
+    Totais vêm de supplier_score_summaries e a série mensal de supplier_monthly_scores, ambos
+    mantidos na gravação das avaliações. `start`/`end` (AAAA-MM) limitam a série; ela é
+    devolvida em listas paralelas, uma posição por mês.
+    """
+    supplier = Supplier.query.options(joinedload(Supplier.score_summary)).get_or_404(supplier_id)
+
+    start = request.args.get('start')
+    end = request.args.get('end')
+    for value in (start, end):
+        if value is not None and not _valid_month(value):
+            return jsonify({'success': False, 'message': 'Use o formato AAAA-MM para start e end.'}), 400
+
+    monthly_query = SupplierMonthlyScore.query.filter_by(supplier_id=supplier_id)
+    if start:
+        monthly_query = monthly_query.filter(SupplierMonthlyScore.month_reference >= start)
+    if end:
+        monthly_query = monthly_query.filter(SupplierMonthlyScore.month_reference <= end)
+    monthly = monthly_query.order_by(SupplierMonthlyScore.month_reference).all()
+
+    summary = supplier.score_summary
+    last_evaluation = summary.last_evaluation_date if summary else None
+
+    response = jsonify({
         'id': supplier.id,
         'company_name': supplier.company_name,
         'trade_name': supplier.trade_name,
@@ -837,12 +765,22 @@ def api_supplier_stats(supplier_id):
         'service_type': supplier.service_type,
         'notes': supplier.notes,
         'is_active': supplier.is_active,
-        'total_evaluations': len(evaluations),
-        'avg_score': supplier.get_average_score(),
-        'avg_rating': round(sum(ratings) / len(ratings), 2) if ratings else 0,
-        'last_evaluation': supplier.get_last_evaluation_date().strftime('%d/%m/%Y') if supplier.get_last_evaluation_date() else None,
-        'monthly_scores': [{'month': e.month_reference, 'score': e.total_score} for e in evaluations]
+        'total_evaluations': summary.evaluations_count if summary else 0,
+        'avg_score': summary.average_score if summary else 0,
+        'avg_rating': summary.average_rating if summary else 0,
+        'last_evaluation': last_evaluation.strftime('%d/%m/%Y') if last_evaluation else None,
+        'series': {
+            'months': [row.month_reference for row in monthly],
+            'avg_score': [row.average_score for row in monthly],
+            'avg_rating': [row.average_rating for row in monthly],
+            'evaluations': [row.evaluations_count for row in monthly],
+            'compliant': [row.compliant_count for row in monthly]
+        }
     })
+    # Revalidação barata: sem mudanças o navegador reaproveita a resposta (304)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.add_etag()
+    return response.make_conditional(request)
 
 
 @suppliers_bp.route('/verify-issue/<int:supplier_id>', methods=['POST'])
@@ -897,17 +835,7 @@ def assign_evaluators(supplier_id):
     """Atribui gestores responsáveis por avaliar um fornecedor"""
     supplier = Supplier.query.get_or_404(supplier_id)
     
-    # Pegar IDs dos usuários selecionados
-    user_ids = request.form.getlist('evaluator_ids')
-    
-    # Limpar avaliadores atuais
-    supplier.assigned_evaluators.clear()
-    
-    # Adicionar novos avaliadores
-    for user_id in user_ids:
-        user = User.query.get(int(user_id))
-        if user:
-            supplier.assigned_evaluators.append(user)
+    set_supplier_evaluators(supplier, request.form.getlist('evaluator_ids'), current_user.id)
     
     try:
         db.session.commit()
@@ -935,6 +863,65 @@ def get_supplier_evaluators(supplier_id):
     return jsonify(evaluators)
 
 
+@suppliers_bp.route('/api/supplier/<int:supplier_id>/evaluators', methods=['PUT'])
+@login_required
+@require_permission('assign-supplier-evaluators')
+def api_set_supplier_evaluators(supplier_id):
+    """Define os avaliadores de um fornecedor. JSON: {"user_ids": [...]}"""
+    supplier = Supplier.query.get_or_404(supplier_id)
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data.get('user_ids'), list):
+        return jsonify({'success': False, 'message': 'Informe user_ids como lista.'}), 400
+
+    added, removed = set_supplier_evaluators(supplier, data['user_ids'], current_user.id)
+    try:
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Erro ao atribuir avaliadores: {str(e)}'}), 500
+
+    return jsonify({'success': True, 'added': sorted(added), 'removed': sorted(removed)})
+
+
+@suppliers_bp.route('/api/evaluators/<int:user_id>/suppliers', methods=['POST'])
+@login_required
+@require_permission('assign-supplier-evaluators')
+def api_assign_evaluator_suppliers(user_id):
+    """Atribui um avaliador a vários fornecedores em uma requisição.
+
+    JSON: {"supplier_ids": [...], "replace": false}. Com replace=true, o avaliador deixa de
+    responder pelos fornecedores que não estão na lista.
+    """
+    user = User.query.get_or_404(user_id)
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data.get('supplier_ids'), list):
+        return jsonify({'success': False, 'message': 'Informe supplier_ids como lista.'}), 400
+
+    added, removed = assign_evaluator_to_suppliers(
+        user, data['supplier_ids'], current_user.id, replace=bool(data.get('replace'))
+    )
+    try:
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Erro ao atribuir fornecedores: {str(e)}'}), 500
+
+    return jsonify({'success': True, 'added': sorted(added), 'removed': sorted(removed)})
+
+
+@suppliers_bp.route('/api/users/search')
+@login_required
+@require_permission('assign-supplier-evaluators')
+def api_search_users():
+    """Busca paginada de usuários ativos para o seletor de responsáveis"""
+    result = search_active_users(
+        request.args.get('q', ''),
+        page=request.args.get('page', 1, type=int),
+        per_page=request.args.get('per_page', 20, type=int)
+    )
+    return jsonify(result)
+
+
 # ============================================
 # GERENCIAMENTO DE HISTÓRICO DE PROBLEMAS
 # ============================================
@@ -991,39 +978,26 @@ def add_issue_action(supplier_id):
     uploaded_files = request.files.getlist('attachments')
     
     if uploaded_files:
-        import os
         from werkzeug.utils import secure_filename
-        from flask import current_app
-        
-        # Criar diretório para anexos de fornecedores (caminho absoluto)
-        upload_folder = os.path.join('/app/uploads', 'supplier_tracking')
-        os.makedirs(upload_folder, exist_ok=True)
         
         for file in uploaded_files:
             if file and file.filename:
-                # Validar tamanho (10MB max)
-                file.seek(0, os.SEEK_END)
-                file_size = file.tell()
-                file.seek(0)
-                
-                if file_size > 10 * 1024 * 1024:  # 10MB
+                # Conteúdo gravado no armazenamento por hash, limitado a 10MB
+                sha256, file_size = store_blob(file.stream, max_size=10 * 1024 * 1024)
+                if sha256 is None:
                     return jsonify({
                         'success': False,
                         'message': f'Arquivo {file.filename} excede o tamanho máximo de 10MB!'
                     }), 400
                 
-                # Salvar arquivo
                 filename = secure_filename(file.filename)
                 timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-                unique_filename = f"{timestamp}_{filename}"
-                file_path = os.path.join(upload_folder, unique_filename)
-                file.save(file_path)
                 
                 # Guardar informações do anexo
                 attachments_data.append({
                     'filename': filename,
-                    'stored_filename': unique_filename,
-                    'path': file_path,
+                    'stored_filename': f"{timestamp}_{sha256[:8]}_{filename}",
+                    'sha256': sha256,
                     'size': file_size,
                     'uploaded_at': datetime.utcnow().isoformat()
                 })
@@ -1065,12 +1039,70 @@ def add_issue_action(supplier_id):
         }), 400
 
 
+ISSUE_HISTORY_PAGE_SIZE = 20
+ISSUE_HISTORY_MAX_PAGE_SIZE = 100
+
+
+def _encode_history_cursor(entry):
+    raw = f'{entry.created_at.isoformat()}|{entry.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_history_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, entry_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(entry_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
 @suppliers_bp.route('/api/issue-history/<int:supplier_id>')
 @login_required
 def api_issue_history(supplier_id):
-    """Retorna o histórico de problemas em JSON"""
-    supplier = Supplier.query.get_or_404(supplier_id)
-    
+    """Retorna o histórico de problemas em JSON, paginado por cursor (mais recentes primeiro).
+
+    Parâmetros: `cursor` (valor de `next_cursor` da página anterior) e `limit`. O ETag identifica
+    a página pedida e muda apenas quando uma nova ação é registrada para o fornecedor.
+    """
+    Supplier.query.get_or_404(supplier_id)
+
+    limit = min(max(request.args.get('limit', ISSUE_HISTORY_PAGE_SIZE, type=int), 1), ISSUE_HISTORY_MAX_PAGE_SIZE)
+    cursor = request.args.get('cursor') or ''
+    position = None
+    if cursor:
+        position = _decode_history_cursor(cursor)
+        if position is None:
+            return jsonify({'success': False, 'message': 'Cursor inválido.'}), 400
+
+    # O histórico só recebe inserções: o último id identifica a versão do conteúdo
+    latest_id = db.session.query(func.max(SupplierIssueTracking.id)).filter(
+        SupplierIssueTracking.supplier_id == supplier_id
+    ).scalar() or 0
+    etag = f'issue-history-{supplier_id}-{latest_id}-{limit}-{cursor}'
+    if etag in request.if_none_match:
+        response = make_response('', 304)
+        response.set_etag(etag)
+        return response
+
+    query = SupplierIssueTracking.query.filter(
+        SupplierIssueTracking.supplier_id == supplier_id
+    ).options(
+        joinedload(SupplierIssueTracking.user).load_only(User.name, User.job_title)
+    )
+    if position is not None:
+        created_at, entry_id = position
+        query = query.filter(or_(
+            SupplierIssueTracking.created_at < created_at,
+            and_(SupplierIssueTracking.created_at == created_at, SupplierIssueTracking.id < entry_id)
+        ))
+
+    entries = query.order_by(
+        SupplierIssueTracking.created_at.desc(), SupplierIssueTracking.id.desc()
+    ).limit(limit + 1).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
     history = [{
         'id': h.id,
         'action_type': h.action_type,
@@ -1090,10 +1122,18 @@ def api_issue_history(supplier_id):
         ] if h.attachments else [],
         'created_at': h.created_at.isoformat(),
         'user_name': h.user.name,
-        'user_job': h.user.job_title if hasattr(h.user, 'job_title') else ''
-    } for h in supplier.issue_history.order_by(SupplierIssueTracking.created_at.desc()).all()]
-    
-    return jsonify({'success': True, 'history': history})
+        'user_job': h.user.job_title or ''
+    } for h in entries]
+
+    response = jsonify({
+        'success': True,
+        'history': history,
+        'has_more': has_more,
+        'next_cursor': _encode_history_cursor(entries[-1]) if has_more else None
+    })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 
 @suppliers_bp.route('/download-attachment/<int:supplier_id>/<int:tracking_id>/<filename>')
@@ -1118,8 +1158,8 @@ def download_attachment(supplier_id, tracking_id, filename):
         flash('Anexo não encontrado', 'danger')
         return redirect(url_for('suppliers.dashboard'))
     
-    file_path = attachment['path']
-    if not os.path.exists(file_path):
+    file_path = resolve_path(attachment.get('sha256'), attachment.get('path'))
+    if not file_path or not os.path.exists(file_path):
         flash('Arquivo não encontrado no servidor', 'danger')
         return redirect(url_for('suppliers.dashboard'))
     
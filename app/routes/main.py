@@ -1,6 +1,8 @@
-from flask import Blueprint, render_template, redirect, session, url_for, flash
+from flask import Blueprint, render_template, redirect, session, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from app.models import db, Notice
+from app.utils.cache import all_cache_stats
+from app.utils.rbac_permissions import require_permission
 
 main_bp = Blueprint('main', __name__, template_folder='../templates')
 
@@ -41,4 +43,11 @@ def gestao_hub():
         flash('Você não tem permissão para acessar esta página.', 'danger')
         return redirect(url_for('main.panel'))
     
-    return render_template("gestao_hub.html")
\ No newline at end of file
+    return render_template("gestao_hub.html")
+
+@main_bp.route("/gestao/cache")
+@login_required
+@require_permission('admin-total')
+def cache_stats():
+    """Contadores de acerto/erro dos caches em memória (monitoramento)"""
+    return jsonify({'caches': all_cache_stats()})
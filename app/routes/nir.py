@@ -4,7 +4,10 @@ from app.models import db, Nir, User, NirProcedure, NirSectionStatus
 from app.procedures_models import Procedure
 from app.utils.rbac_permissions import require_permission, require_sector
 from app.routes.util import format_date_filter
+from app.utils.nir_cache import get_observation_alert_counts, get_filter_facets
+from app.utils.nir_stats import query_nir_stats, STATS_DIMENSIONS
 from datetime import datetime
+from sqlalchemy.orm import defer, load_only, selectinload
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from openpyxl.utils import get_column_letter
@@ -28,6 +31,37 @@ def parse_datetime_local(value):
         except ValueError:
             return None
 
+#<!--- Projeções para Listagens --->
+NIR_LIST_DEFERRED_COLUMNS = ('surgical_description', 'observation', 'cancellation_reason')
+
+NIR_TABLE_COLUMNS = (
+    'id', 'patient_name', 'susfacil', 'admission_date', 'total_days_admitted',
+    'admitted_from_origin', 'recurso', 'entry_type', 'admission_type', 'status',
+    'cancelled', 'fa_datetime', 'creation_date'
+)
+
+def nir_list_query(keep_columns=()):
+    """Query base das listagens: adia as colunas Text grandes e carrega os status de seção em lote"""
+    deferred = [defer(getattr(Nir, name)) for name in NIR_LIST_DEFERRED_COLUMNS if name not in keep_columns]
+    return Nir.query.options(*deferred, selectinload(Nir.section_statuses))
+
+def nir_table_query():
+    """Query da tabela geral de registros: carrega apenas as colunas exibidas e usadas no status"""
+    columns = [getattr(Nir, name) for name in NIR_TABLE_COLUMNS]
+    return Nir.query.options(load_only(*columns), selectinload(Nir.section_statuses))
+
+class NirListRow:
+    """Linha compacta da tabela de registros NIR (somente o que o template renderiza)"""
+    __slots__ = (
+        'id', 'patient_name', 'susfacil', 'admission_date', 'total_days_admitted',
+        'admitted_from_origin', 'recurso', 'entry_type', 'admission_type', 'status',
+        '_global_status', '_global_status_hint'
+    )
+
+    def __init__(self, record):
+        for name in self.__slots__:
+            setattr(self, name, getattr(record, name, None))
+
 def create_iter_pages_function(pages, current_page):
     def _iter_pages(left_edge=1, right_edge=1, left_current=2, right_current=2):
         last = 0
@@ -229,7 +263,7 @@ def list_records():
     sector = request.args.get('sector', '').strip()
     sector_progress = request.args.get('sector_progress', '').strip()
 
-    query = Nir.query.order_by(Nir.creation_date.desc())
+    query = nir_table_query().order_by(Nir.creation_date.desc())
 
     if search:
         query = query.filter(
@@ -332,7 +366,7 @@ def list_records():
     total_display = len(display_records)
     start_idx = (page - 1) * per_page
     end_idx = start_idx + per_page
-    page_items = display_records[start_idx:end_idx]
+    page_items = [NirListRow(rec) for rec in display_records[start_idx:end_idx]]
 
     from types import SimpleNamespace
     pages = ceil(total_display / per_page) if total_display else 1
@@ -368,13 +402,11 @@ def list_records():
         elif status == 'CANCELADO':
             stats_counts['cancelados'] += 1
 
-    entry_types = list(set(r.entry_type for r in all_basic_records if r.entry_type))
-    admission_types = list(set(r.admission_type for r in all_basic_records if r.admission_type))
-    discharge_types = list(set(r.discharge_type for r in all_basic_records if r.discharge_type))
-    
-    entry_types.sort()
-    admission_types.sort()
-    discharge_types.sort()
+    facets = get_filter_facets()
+    facet_counts = {field: dict(values) for field, values in facets.items()}
+    entry_types = [value for value, _ in facets['entry_type']]
+    admission_types = [value for value, _ in facets['admission_type']]
+    discharge_types = [value for value, _ in facets['discharge_type']]
 
     filters = {
         'search': search,
@@ -398,6 +430,7 @@ def list_records():
                              entry_types=entry_types,
                              admission_types=admission_types,
                              discharge_types=discharge_types,
+                             facet_counts=facet_counts,
                              filters=filters,
                              stats_counts=stats_counts)
 
@@ -406,6 +439,7 @@ def list_records():
                          entry_types=entry_types,
                          admission_types=admission_types,
                          discharge_types=discharge_types,
+                         facet_counts=facet_counts,
                          filters=filters,
                          stats_counts=stats_counts)
 
@@ -580,16 +614,10 @@ def search_procedures():
 def check_pending_notifications():
     """Verifica solicitações que precisam de atenção"""
     try:
-        from datetime import datetime, timedelta
-        
         notifications = []
         
-        time_24h_ago = datetime.now() - timedelta(hours=24)
-        
-        pending_decision = Nir.query.filter(
-            Nir.status == 'AGUARDANDO_DECISAO',
-            Nir.fa_datetime <= time_24h_ago
-        ).count()
+        alert_counts = get_observation_alert_counts()
+        pending_decision = alert_counts['pending_decision']
         
         if pending_decision > 0:
             notifications.append({
@@ -602,13 +630,7 @@ def check_pending_notifications():
                 'icon': 'bi-clock-history'
             })
         
-        time_22h_ago = datetime.now() - timedelta(hours=22)
-        
-        observation_critical = Nir.query.filter(
-            Nir.status == 'EM_OBSERVACAO',
-            Nir.fa_datetime <= time_22h_ago,
-            Nir.fa_datetime > time_24h_ago
-        ).count()
+        observation_critical = alert_counts['observation_critical']
         
         if observation_critical > 0:
             notifications.append({
@@ -1280,7 +1302,7 @@ def sector_nir_list():
     valid_waiting = {'faturamento': 'FATURAMENTO', 'cirurgia': 'CENTRO CIRÚRGICO'}
     target_waiting = valid_waiting.get(waiting_for_param)
     
-    query = Nir.query.order_by(Nir.creation_date.desc())
+    query = nir_list_query().order_by(Nir.creation_date.desc())
     
     patient_name = request.args.get('patient_name', '').strip()
     if patient_name:
@@ -1294,14 +1316,6 @@ def sector_nir_list():
             continue
         
         if record.status in ('EM_OBSERVACAO', 'AGUARDANDO_DECISAO'):
-            if record.status == 'EM_OBSERVACAO' and record.should_transition_to_decision():
-                try:
-                    record.status = 'AGUARDANDO_DECISAO'
-                    db.session.commit()
-                except Exception as e:
-                    db.session.rollback()
-                    print(f"Erro ao atualizar status de observação: {e}")
-            
             setattr(record, '_created_by_current', record.operator_id == current_user.id)
             setattr(record, '_nir_phase', 'OBSERVACAO')
             setattr(record, '_nir_locked', False)
@@ -1504,7 +1518,7 @@ def sector_surgery_list():
     if per_page > 100:
         per_page = 100
 
-    query = Nir.query.order_by(Nir.creation_date.desc())
+    query = nir_list_query().order_by(Nir.creation_date.desc())
     
     patient_name = request.args.get('patient_name', '').strip()
     if patient_name:
@@ -1612,7 +1626,7 @@ def sector_billing_list():
     if per_page > 100:
         per_page = 100
 
-    query = Nir.query.order_by(Nir.creation_date.desc())
+    query = nir_list_query(keep_columns=('observation', 'cancellation_reason')).order_by(Nir.creation_date.desc())
     
     patient_name = request.args.get('patient_name', '').strip()
     if patient_name:
@@ -1841,6 +1855,39 @@ def get_procedure_cids(procedure_code):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+#<!--- Estatísticas Consolidadas do NIR (JSON) --->
+@nir_bp.route("/nir/estatisticas")
+@login_required
+def nir_statistics():
+    """Admissões, altas, cancelamentos e média de permanência a partir do consolidado diário"""
+    from datetime import timedelta
+
+    group_by = request.args.get('group_by', 'day').strip().lower()
+    if group_by not in ('day', 'month'):
+        return jsonify({'error': "Parâmetro 'group_by' deve ser 'day' ou 'month'."}), 400
+
+    dimension = request.args.get('dimension', '').strip() or None
+    if dimension and dimension not in STATS_DIMENSIONS:
+        return jsonify({'error': f"Parâmetro 'dimension' deve ser um de: {', '.join(STATS_DIMENSIONS)}."}), 400
+
+    try:
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else datetime.now().date()
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') else end - timedelta(days=29)
+    except ValueError:
+        return jsonify({'error': 'Datas devem estar no formato AAAA-MM-DD.'}), 400
+
+    if start > end:
+        return jsonify({'error': 'A data inicial deve ser anterior à data final.'}), 400
+
+    stats = query_nir_stats(start, end, group_by=group_by, dimension=dimension)
+    return jsonify({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'group_by': group_by,
+        'dimension': dimension,
+        **stats
+    })
+
 #<!--- Exportar Registros NIR para Excel --->
 @nir_bp.route("/nir/exportar-excel")
 @login_required
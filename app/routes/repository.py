@@ -2,12 +2,15 @@ import os
 import shutil
 from flask import (
     Blueprint, current_app, redirect, render_template, 
-    request, send_from_directory, abort, url_for, flash, jsonify
+    request, abort, url_for, flash, jsonify
 )
 from flask_login import current_user, login_required
 from sqlalchemy import or_
 from werkzeug.utils import secure_filename
 from app.models import db, File, Repository
+from app.utils.blob_storage import resolve_path, store_blob
+from app.utils.chunked_upload import claim_uploads
+from app.utils.media import send_media
 
 repository_bp = Blueprint('repository', __name__, template_folder='../templates')
 
@@ -66,7 +69,8 @@ def get_item_physical_path(item):
 
     subfolder_path = os.path.join(*path_parts) if path_parts else ''
     if not item.is_folder:
-        return os.path.join(repo_root_path, subfolder_path, item.filename)
+        # Arquivos novos ficam no armazenamento por hash; a árvore física só guarda os antigos
+        return resolve_path(item.blob_sha256, os.path.join(repo_root_path, subfolder_path, item.filename))
     else:
         return os.path.join(repo_root_path, subfolder_path, item.name)
     
@@ -79,11 +83,12 @@ def recursively_delete_item(item):
         if os.path.exists(folder_physical_path):
             shutil.rmtree(folder_physical_path)
 
-    else:
+    elif not item.blob_sha256:
         file_physical_path = get_item_physical_path(item)
         if os.path.exists(file_physical_path):
             os.remove(file_physical_path)
 
+    # Blobs compartilhados não são apagados aqui: a exclusão do registro libera a referência
     db.session.delete(item)
     
 def get_item_directory_path(file_obj):
@@ -155,6 +160,10 @@ def repository_detail_page(repo_id, folder_id=None):
             full_path = os.path.join(current_physical_path, caminho_da_subpasta, file_obj.filename)
             size_in_bytes = os.path.getsize(full_path) if os.path.exists(full_path) else 0
         
+        blob_file_path = resolve_path(file_obj.blob_sha256)
+        if blob_file_path:
+            size_in_bytes = os.path.getsize(blob_file_path)
+        
         files_with_details.append({
             'id': file_obj.id, 'name': file_obj.name, 'filename': file_obj.filename,
             'description': file_obj.description, 'date_uploaded': file_obj.date_uploaded,
@@ -180,39 +189,38 @@ def upload_file(repo_id):
     if not has_repo_access(repo, current_user):
         abort(403)
 
-    uploaded_files = request.files.getlist('file')
+    uploaded_files = [file_get for file_get in request.files.getlist('file') if file_get.filename]
     parent_id_str = request.form.get('parent_id')
     parent_id = int(parent_id_str) if parent_id_str else None
 
-    if not uploaded_files or uploaded_files[0].filename == '':
+    # Arquivos grandes chegam antes, em partes, pela API de upload; o formulário traz só os ids
+    stored_files = [
+        (upload.filename, upload.sha256)
+        for upload in claim_uploads(request.form.getlist('file_upload_id'), 'repository', current_user.id)
+    ]
+    for file_get in uploaded_files:
+        blob_sha256, _ = store_blob(file_get.stream)
+        stored_files.append((secure_filename(file_get.filename), blob_sha256))
+
+    if not stored_files:
         flash("Nenhum arquivo selecionado.", "danger")
         return redirect(request.referrer)
 
-    destination_path = get_repo_folder_path(repo)
-    if parent_id:
-        parent_folder = File.query.get(parent_id)
-        if parent_folder:
-            destination_path = get_folder_physical_path(parent_folder)
-
-    os.makedirs(destination_path, exist_ok=True)
-    
-    for file_get in uploaded_files:
-        filename_secure = secure_filename(file_get.filename)
+    for filename_secure, blob_sha256 in stored_files:
         name_only, _ = os.path.splitext(filename_secure)
-        
-        file_get.save(os.path.join(destination_path, filename_secure))
 
         new_file = File(
             name=name_only,
             filename=filename_secure,
             repository_id=repo.id,
             owner_id=current_user.id,
-            parent_id=parent_id
+            parent_id=parent_id,
+            blob_sha256=blob_sha256
         )
         db.session.add(new_file)
 
     db.session.commit()
-    flash(f"{len(uploaded_files)} arquivo(s) enviados com sucesso!", "success")
+    flash(f"{len(stored_files)} arquivo(s) enviados com sucesso!", "success")
     
     if parent_id:
         return redirect(url_for('repository.repository_detail_page', repo_id=repo.id, folder_id=parent_id))
@@ -276,21 +284,25 @@ def create_folder(repo_id):
         print(f"Erro ao criar pasta: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def send_repository_file(file_obj, as_attachment=False):
+    file_path = get_item_physical_path(file_obj)
+    if file_obj.is_folder or not os.path.isfile(file_path):
+        abort(404)
+    return send_media(file_path, download_name=file_obj.filename, as_attachment=as_attachment, etag=file_obj.blob_sha256)
+
 #<!--- VISUALIZAR ARQUIVO --->
 @repository_bp.route('/file/view/<int:file_id>')
 @login_required
 def view_file(file_id):
     file_obj = get_file_and_validate_access(file_id)
-    directory_path = get_item_directory_path(file_obj)
-    return send_from_directory(directory_path, file_obj.filename)
+    return send_repository_file(file_obj)
 
 #<!--- BAIXAR ARQUIVO --->
 @repository_bp.route('/file/download/<int:file_id>')
 @login_required
 def download_file(file_id):
     file_obj = get_file_and_validate_access(file_id)
-    directory_path = get_item_directory_path(file_obj)
-    return send_from_directory(directory_path, file_obj.filename, as_attachment=True)
+    return send_repository_file(file_obj, as_attachment=True)
 
 #<!--- RENOMEAR ARQUIVOS/PASTAS --->
 @repository_bp.route('/file/rename/<int:file_id>', methods=['POST'])
@@ -323,11 +335,19 @@ def rename_file(file_id):
     old_path = os.path.join(current_dir_path, file_obj.filename)
     new_path = os.path.join(current_dir_path, new_filename_secure)
 
-    if os.path.exists(new_path) and old_path.lower() != new_path.lower():
+    sibling_exists = File.query.filter(
+        File.repository_id == file_obj.repository_id,
+        File.parent_id == file_obj.parent_id,
+        File.filename == new_filename_secure,
+        File.id != file_obj.id
+    ).first() is not None
+    if (os.path.exists(new_path) or sibling_exists) and old_path.lower() != new_path.lower():
         return jsonify({'success': False, 'error': 'Um item com este nome já existe neste local.'}), 409
     
+    # Arquivos no armazenamento por hash só mudam de nome no banco
+    stored_on_tree = file_obj.is_folder or not file_obj.blob_sha256
     try:
-        if os.path.exists(old_path):
+        if stored_on_tree and os.path.exists(old_path):
             os.rename(old_path, new_path)
         
         file_obj.name = new_name_base
@@ -337,7 +357,7 @@ def rename_file(file_id):
         return jsonify({'success': True, 'new_name': new_name_base})
     except Exception as e:
         db.session.rollback()
-        if os.path.exists(new_path):
+        if stored_on_tree and os.path.exists(new_path):
             os.rename(new_path, old_path)
         return jsonify({'success': False, 'error': f"Erro de sistema: {str(e)}"}), 500
 
@@ -382,8 +402,12 @@ def move_file():
         repo_root_path = get_repo_folder_path(item_to_move.repository)
         new_path = os.path.join(repo_root_path, item_to_move.filename)
     
+    # Arquivos no armazenamento por hash só mudam de pasta no banco
+    stored_on_tree = item_to_move.is_folder or not item_to_move.blob_sha256
     try:
-        if os.path.exists(old_path):
+        if not stored_on_tree:
+            pass
+        elif os.path.exists(old_path):
             os.makedirs(os.path.dirname(new_path), exist_ok=True) 
             shutil.move(old_path, new_path)
         else:
@@ -396,7 +420,7 @@ def move_file():
         return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
-        if os.path.exists(new_path):
+        if stored_on_tree and os.path.exists(new_path):
             shutil.move(new_path, old_path)
         return jsonify({'success': False, 'error': str(e)}), 500
 
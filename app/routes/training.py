@@ -1,12 +1,18 @@
 import os
-from flask import Blueprint, current_app, json, jsonify, redirect, render_template, request, send_from_directory, flash, url_for
+from flask import Blueprint, Response, abort, current_app, json, jsonify, redirect, render_template, request, send_file, flash, url_for
 from flask_login import login_required, current_user
-from sqlalchemy import func
-from sqlalchemy.orm import joinedload
-from app.models import AnswerOption, QuestionType, Quiz, QuizAttachment, UserQuizAttempt, db, Course, UserCourseProgress, CourseEnrollmentTerm, User
+from app.models import Quiz, QuizAttachment, UserQuizAttempt, db, Course, UserCourseProgress, CourseEnrollmentTerm, User
 from datetime import datetime
 from werkzeug.utils import secure_filename
 from app.utils.rbac_permissions import require_permission
+from app.utils.blob_storage import blob_path, resolve_path
+from app.utils.certificates import discard_certificates, get_certificate, issue_certificate
+from app.utils.course_status import get_course_status, invalidate_course_status
+from app.utils.image_derivatives import send_image
+from app.utils.media import send_media
+from app.utils.media_pipeline import select_rendition
+from app.utils.progress_buffer import mark_completed, record_heartbeat
+from app.utils.quiz_grading import grade_quiz
 
 training_bp = Blueprint('training', __name__, template_folder='../templates')
 
@@ -17,74 +23,38 @@ def save_progress(course_id):
     current_time = float(data.get('timestamp', 0))
     finished = data.get('finished', False)
 
-    progress = UserCourseProgress.query.filter_by(
-        user_id=current_user.id,
-        course_id=course_id
-    ).first_or_404()
+    # Posição validada e acumulada em memória; gravada em lote pelo buffer (utils/progress_buffer)
+    entry, error = record_heartbeat(current_user.id, course_id, current_time)
+    if entry is None:
+        abort(404)
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
 
-    if current_time > (progress.last_watched_timestamp + 15) and progress.last_watched_timestamp > 0:
-        return jsonify({'success': False, 'error': 'Avanco de vídeo detectado.'}), 400
-    
-    progress.last_watched_timestamp = max(progress.last_watched_timestamp, current_time)
-    course = Course.query.get_or_404(course_id)
     just_completed = False
+    if finished and not entry.completed:
+        course = Course.query.get_or_404(course_id)
+        is_quizless = not course.quiz or not course.quiz.questions
 
-    is_quizless = not course.quiz or not course.quiz.questions
+        if is_quizless and mark_completed(current_user.id, course_id, datetime.utcnow()):
+            just_completed = True
+            flash(f'Parabéns! Você concluiu o treinamento "{course.title}"!', 'success')
+            issue_certificate(current_user.id, course_id)
 
-    if finished and is_quizless and progress.completed_at is None:
-        progress.completed_at = datetime.utcnow()
-        just_completed = True
-        flash(f'Parabéns! Você concluiu o treinamento "{course.title}"!', 'success')
-
-    db.session.commit()
-    
     return jsonify({
         'success': True, 
-        'last_timestamp': progress.last_watched_timestamp,
+        'last_timestamp': entry.timestamp,
         'completed': just_completed 
     })
 
 @training_bp.route('/courses')
 @login_required
 def course_list_page():
-    all_active_courses = Course.query.filter_by(is_active=True).order_by(Course.title).all()
-    
-    user_progress_map = {p.course_id: p for p in UserCourseProgress.query.filter_by(user_id=current_user.id).all()}
-    
-    user_attempts_map = {}
-    if db.session.query(UserQuizAttempt.id).count() > 0:
-        subquery = db.session.query(
-            UserQuizAttempt.quiz_id,
-            func.max(UserQuizAttempt.score).label('max_score')
-        ).filter_by(user_id=current_user.id).group_by(UserQuizAttempt.quiz_id).subquery()
-        
-        best_attempts = db.session.query(UserQuizAttempt).join(
-            subquery,
-            db.and_(
-                UserQuizAttempt.quiz_id == subquery.c.quiz_id,
-                UserQuizAttempt.score == subquery.c.max_score
-            )
-        ).all()
-        user_attempts_map = {attempt.quiz.course_id: attempt for attempt in best_attempts if attempt.quiz}
-
-    courses_completed = []
-    courses_in_progress = []
-    courses_available = []
-
-    for course in all_active_courses:
-        progress = user_progress_map.get(course.id)
-        attempt = user_attempts_map.get(course.id)
-
-        if progress and progress.completed_at:
-            courses_completed.append((course, attempt))
-        elif progress:
-            percent_complete = 0
-            if course.duration_seconds > 0:
-                percent_complete = round((progress.last_watched_timestamp / course.duration_seconds) * 100)
-            courses_in_progress.append((course, min(percent_complete, 99)))
-        else:
-            courses_available.append(course)
-            
+    statuses = get_course_status(current_user.id)
+
+    courses_completed = [(course, course) for course in statuses if course['status'] == 'completed']
+    courses_in_progress = [(course, course['percent_complete']) for course in statuses if course['status'] == 'in_progress']
+    courses_available = [course for course in statuses if course['status'] == 'available']
+
     return render_template(
         'training/course_list.html',
         completed=courses_completed,
@@ -169,6 +139,7 @@ def enroll_course(course_id):
         db.session.add(progress)
 
     db.session.commit()
+    invalidate_course_status(current_user.id)
 
     return jsonify({
         'success': True,
@@ -206,6 +177,7 @@ def course_player_page(course_id):
             )
         db.session.add(progress)
         db.session.commit()
+        invalidate_course_status(current_user.id)
 
     is_completed = progress.completed_at is not None
     user_attempt = None
@@ -234,44 +206,7 @@ def course_player_page(course_id):
 @login_required
 def submit_quiz(quiz_id):
     quiz = Quiz.query.get_or_404(quiz_id)
-    questions = quiz.questions
-
-    user_answers_data = {}
-    correct_answers_count = 0
-    total_questions = len(questions)
-
-    for question in questions:
-        user_submitted_value = request.form.get(f'question_{question.id}')
-        is_correct = False
-
-        if not user_submitted_value:
-            user_answers_data[str(question.id)] = {'answer': None, 'is_correct': False}
-            continue
-
-        if question.question_type == QuestionType.MULTIPLE_CHOICE:
-            try:
-                user_answer_id = int(user_submitted_value)
-                correct_option = AnswerOption.query.filter_by(question_id=question.id, is_correct=True).first()
-                
-                if correct_option and correct_option.id == user_answer_id:
-                    correct_answers_count += 1
-                    is_correct = True
-                
-                user_answers_data[str(question.id)] = {'answer': user_answer_id, 'is_correct': is_correct}
-            except (ValueError, TypeError):
-                user_answers_data[str(question.id)] = {'answer': user_submitted_value, 'is_correct': False}
-
-        elif question.question_type == QuestionType.TEXT_INPUT:
-            # Get the first option from the list (not a query, so use list indexing)
-            correct_answer = question.options[0] if question.options else None
-            
-            if correct_answer and user_submitted_value.strip().lower() == correct_answer.text.strip().lower():
-                correct_answers_count += 1
-                is_correct = True
-            
-            user_answers_data[str(question.id)] = {'answer': user_submitted_value, 'is_correct': is_correct}
-
-    score = (correct_answers_count / total_questions) * 100 if total_questions > 0 else 0
+    score, user_answers_data = grade_quiz(quiz.id, request.form)
 
     new_attempt = UserQuizAttempt(
         user_id=current_user.id,
@@ -286,11 +221,18 @@ def submit_quiz(quiz_id):
         course_id=quiz.course_id
     ).first()
     
-    if progress and progress.completed_at is None:
+    just_completed = progress is not None and progress.completed_at is None
+    if just_completed:
         progress.completed_at = datetime.utcnow()
         flash(f'Parabéns! Você concluiu o treinamento "{quiz.course.title}"!', 'info')
 
     db.session.commit()
+    invalidate_course_status(current_user.id)
+    if progress and progress.completed_at:
+        # A melhor nota aparece no certificado: refaz o já emitido
+        if not just_completed:
+            discard_certificates(quiz.course_id, current_user.id)
+        issue_certificate(current_user.id, quiz.course_id)
     
     flash(f"Avaliação enviada! Sua pontuação foi: {score:.2f}%", "success")
     return redirect(url_for('training.course_list_page'))
@@ -306,15 +248,26 @@ def serve_video(course_id):
 
     course_folder_name = secure_filename(course.title)
     content_folder_path = os.path.join('/app/uploads/courses', course_folder_name)
-    os.makedirs(content_folder_path, exist_ok=True)
-
-    content_file_path = os.path.join(content_folder_path, course.video_filename)
+    content_file_path = resolve_path(course.video_sha256, os.path.join(content_folder_path, course.video_filename))
+
+    # Versão preparada (faststart/menor bitrate) quando o worker de mídia já processou o vídeo
+    save_data = request.headers.get('Save-Data', '').lower() == 'on'
+    rendition = select_rendition(course, request.args.get('quality'), save_data) if course.is_video else None
+    if rendition is not None:
+        rendition_path = blob_path(rendition.sha256)
+        if os.path.isfile(rendition_path):
+            # As versões são sempre MP4, mesmo quando o envio original tem outra extensão
+            response = send_media(
+                rendition_path, download_name=course.video_filename, etag=rendition.sha256, mimetype='video/mp4'
+            )
+            response.vary.add('Save-Data')
+            return response
 
-    if not os.path.exists(content_folder_path) or not os.path.exists(content_file_path):
+    if not os.path.isfile(content_file_path):
         flash("Arquivo do curso não encontrado no servidor.", "error")
         return redirect(request.referrer or url_for('main.panel'))
 
-    return send_from_directory(content_folder_path, course.video_filename)
+    return send_media(content_file_path, download_name=course.video_filename, etag=course.video_sha256)
 
 @training_bp.route('/course/<int:course_id>/image')
 @login_required
@@ -326,14 +279,13 @@ def serve_course_image(course_id):
     course_folder_name = secure_filename(course.title)
 
     course_folder_path = os.path.join('/app/uploads/courses', course_folder_name)
-    os.makedirs(course_folder_path, exist_ok=True)
+    image_file_path = resolve_path(course.image_sha256, os.path.join(course_folder_path, course.image_filename))
     
-    image_file_path = os.path.join(course_folder_path, course.image_filename)
-    
-    if not os.path.exists(course_folder_path) or not os.path.exists(image_file_path):
+    if not os.path.isfile(image_file_path):
         return redirect(url_for('static', filename='course_images/default_course.png'))
     
-    return send_from_directory(course_folder_path, course.image_filename)
+    # ?w= entrega a miniatura (WebP/JPEG) em vez da foto original
+    return send_image(image_file_path, download_name=course.image_filename, etag=course.image_sha256)
     
 @training_bp.route('/quiz/attachments/<int:attachment_id>')
 @login_required
@@ -341,18 +293,14 @@ def download_attachment(attachment_id):
     attachment = QuizAttachment.query.get_or_404(attachment_id)
     
     upload_folder = '/app/uploads'
-    full_path = os.path.join(upload_folder, attachment.filepath)
+    full_path = resolve_path(attachment.blob_sha256, os.path.join(upload_folder, attachment.filepath))
     
     if not os.path.exists(full_path):
         flash("Arquivo não encontrado.", "error")
         return redirect(request.referrer or url_for('main.panel'))
     
-    directory = os.path.dirname(full_path)
-    filename = os.path.basename(full_path)
-    
-    return send_from_directory(
-        directory,
-        filename,
+    return send_file(
+        full_path,
         as_attachment=True,
         download_name=attachment.filename
     )
@@ -361,38 +309,12 @@ def download_attachment(attachment_id):
 @login_required
 def view_certificate(course_id):
     """Rota para o usuário visualizar seu próprio certificado"""
-    course = Course.query.options(joinedload(Course.created_by)).get_or_404(course_id)
-    
-    # Buscar progresso do usuário atual
-    progress = UserCourseProgress.query.filter_by(
-        user_id=current_user.id,
-        course_id=course_id
-    ).first()
-    
-    # Verificar se o curso foi concluído
-    if not progress or not progress.completed_at:
+    course = Course.query.get_or_404(course_id)
+
+    # Certificado gerado na conclusão e reaproveitado enquanto a data de conclusão não mudar
+    html = get_certificate(course, current_user)
+    if html is None:
         flash("Você ainda não concluiu este treinamento.", "warning")
         return redirect(url_for('training.course_list_page'))
-    
-    # Buscar termo de inscrição
-    enrollment = CourseEnrollmentTerm.query.filter_by(
-        user_id=current_user.id,
-        course_id=course_id
-    ).first()
-    
-    # Buscar melhor tentativa do quiz (se houver)
-    attempt = None
-    if course.quiz:
-        attempt = UserQuizAttempt.query.filter_by(
-            user_id=current_user.id,
-            quiz_id=course.quiz.id
-        ).order_by(UserQuizAttempt.score.desc()).first()
-    
-    return render_template(
-        'training/course_certificate.html',
-        course=course,
-        user=current_user,
-        progress=progress,
-        enrollment=enrollment,
-        attempt=attempt
-    )
+
+    return Response(html, mimetype='text/html')
@@ -0,0 +1,76 @@
+from flask import Blueprint, jsonify, request
+from flask_login import login_required, current_user
+from app.models import db, UploadSession
+from app.utils.chunked_upload import append_chunk, chunk_size, complete_upload, init_upload
+
+uploads_bp = Blueprint('uploads', __name__, url_prefix='/uploads')
+
+
+def _upload_state(upload):
+    return {
+        'success': True,
+        'upload_id': upload.id,
+        'filename': upload.filename,
+        'offset': upload.received_size,
+        'size': upload.total_size,
+        'chunk_size': chunk_size(),
+        'complete': upload.is_complete
+    }
+
+
+def _get_user_upload(upload_id, lock=False):
+    query = UploadSession.query.filter_by(id=upload_id, user_id=current_user.id)
+    if lock:
+        # Serializa blocos concorrentes da mesma sessão (PostgreSQL)
+        query = query.with_for_update()
+    return query.first_or_404()
+
+
+#<!--- ABRIR SESSÃO DE UPLOAD --->
+@uploads_bp.route('/init', methods=['POST'])
+@login_required
+def init_chunked_upload():
+    data = request.get_json(silent=True) or {}
+    upload, error = init_upload(current_user.id, data.get('purpose'), data.get('filename'), data.get('size'))
+    if error:
+        return jsonify({'success': False, 'message': error}), 400
+    db.session.commit()
+    return jsonify(_upload_state(upload)), 201
+
+
+#<!--- ESTADO DA SESSÃO (RETOMADA) --->
+@uploads_bp.route('/<upload_id>', methods=['GET'])
+@login_required
+def chunked_upload_status(upload_id):
+    return jsonify(_upload_state(_get_user_upload(upload_id)))
+
+
+#<!--- ENVIAR BLOCO --->
+@uploads_bp.route('/<upload_id>/chunk', methods=['PUT'])
+@login_required
+def append_upload_chunk(upload_id):
+    upload = _get_user_upload(upload_id, lock=True)
+    offset = request.args.get('offset', type=int)
+    if offset != upload.received_size:
+        state = _upload_state(upload)
+        db.session.rollback()
+        return jsonify({**state, 'success': False, 'message': 'Offset fora de sequência.'}), 409
+
+    error = append_chunk(upload, request.stream)
+    db.session.commit()
+    if error:
+        return jsonify({'success': False, 'message': error}), 400
+    return jsonify(_upload_state(upload))
+
+
+#<!--- CONCLUIR UPLOAD --->
+@uploads_bp.route('/<upload_id>/complete', methods=['POST'])
+@login_required
+def complete_chunked_upload(upload_id):
+    upload = _get_user_upload(upload_id, lock=True)
+    error = complete_upload(upload)
+    if error:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': error}), 400
+    db.session.commit()
+    return jsonify(_upload_state(upload))
@@ -0,0 +1,136 @@
+(function (window, document) {
+    const MAX_RETRIES = 5;
+
+    const csrfToken = () => {
+        const meta = document.querySelector('meta[name="csrf_token"]');
+        return meta ? meta.content : '';
+    };
+
+    const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+    async function request(url, options = {}) {
+        const response = await fetch(url, {
+            credentials: 'same-origin',
+            ...options,
+            headers: { 'X-CSRFToken': csrfToken(), ...(options.headers || {}) }
+        });
+        const data = await response.json().catch(() => ({}));
+        return { response, data };
+    }
+
+    function uploadError(message) {
+        const error = new Error(message);
+        error.fatal = true;
+        return error;
+    }
+
+    // Envia o arquivo em blocos e devolve o id da sessão concluída.
+    // Falhas de rede retomam do último offset confirmado pelo servidor.
+    async function uploadFile(file, purpose, onProgress) {
+        const init = await request('/uploads/init', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ purpose, filename: file.name, size: file.size })
+        });
+        if (!init.response.ok) {
+            throw uploadError(init.data.message || 'Não foi possível iniciar o envio.');
+        }
+
+        const uploadId = init.data.upload_id;
+        const chunkSize = init.data.chunk_size;
+        let offset = init.data.offset;
+        let retries = 0;
+
+        while (offset < file.size) {
+            try {
+                const { response, data } = await request(`/uploads/${uploadId}/chunk?offset=${offset}`, {
+                    method: 'PUT',
+                    headers: { 'Content-Type': 'application/octet-stream' },
+                    body: file.slice(offset, offset + chunkSize)
+                });
+                if (response.ok || response.status === 409) {
+                    offset = data.offset;
+                    retries = 0;
+                    if (onProgress) onProgress(offset / file.size);
+                    continue;
+                }
+                if (response.status === 400 || response.status === 404) {
+                    throw uploadError(data.message || 'Arquivo recusado pelo servidor.');
+                }
+                throw new Error(data.message || `Erro ${response.status}`);
+            } catch (err) {
+                if (err.fatal || retries >= MAX_RETRIES) throw err;
+                retries += 1;
+                await sleep(1000 * retries);
+                const status = await request(`/uploads/${uploadId}`).catch(() => null);
+                if (status && status.response.ok) offset = status.data.offset;
+            }
+        }
+
+        const done = await request(`/uploads/${uploadId}/complete`, { method: 'POST' });
+        if (!done.response.ok) {
+            throw uploadError(done.data.message || 'Não foi possível concluir o envio.');
+        }
+        return uploadId;
+    }
+
+    function progressElement(form) {
+        let element = form.querySelector('[data-upload-progress]');
+        if (!element) {
+            element = document.createElement('div');
+            element.className = 'small text-muted mt-2';
+            element.setAttribute('data-upload-progress', '');
+            form.appendChild(element);
+        }
+        return element;
+    }
+
+    // Formulários com data-chunked-upload enviam os arquivos dos campos com data-upload-purpose
+    // pela API em partes e submetem apenas os ids (<campo>_upload_id).
+    function bindForm(form) {
+        form.addEventListener('submit', async (event) => {
+            const inputs = Array.from(form.querySelectorAll('input[type="file"][data-upload-purpose]'))
+                .filter(input => !input.disabled && input.files.length);
+            if (!inputs.length) return;
+            event.preventDefault();
+
+            const buttons = form.querySelectorAll('[type="submit"]');
+            const progress = progressElement(form);
+            const added = [];
+            buttons.forEach(button => { button.disabled = true; });
+
+            try {
+                for (const input of inputs) {
+                    for (const file of Array.from(input.files)) {
+                        const uploadId = await uploadFile(file, input.dataset.uploadPurpose, (ratio) => {
+                            progress.textContent = `Enviando ${file.name}: ${Math.round(ratio * 100)}%`;
+                        });
+                        const hidden = document.createElement('input');
+                        hidden.type = 'hidden';
+                        hidden.name = `${input.name}_upload_id`;
+                        hidden.value = uploadId;
+                        form.appendChild(hidden);
+                        added.push(hidden);
+                    }
+                }
+                progress.textContent = 'Finalizando...';
+                inputs.forEach(input => {
+                    input.required = false;
+                    input.disabled = true;
+                });
+                form.submit();
+            } catch (err) {
+                added.forEach(hidden => hidden.remove());
+                progress.textContent = '';
+                buttons.forEach(button => { button.disabled = false; });
+                alert(`Erro no envio: ${err.message}`);
+            }
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', () => {
+        document.querySelectorAll('form[data-chunked-upload]').forEach(bindForm);
+    });
+
+    window.ChunkedUpload = { uploadFile, bindForm };
+})(window, document);
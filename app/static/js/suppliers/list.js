@@ -9,7 +9,14 @@
         totalSuppliers: 0,
         endpoints: {},
         permissions: {},
-        elements: {}
+        elements: {},
+        evaluators: {
+            selected: new Map(),
+            term: '',
+            page: 1,
+            hasNext: false,
+            requestId: 0
+        }
     };
 
     function init(config = {}) {
@@ -56,6 +63,10 @@
         state.elements.selectAllEvaluators = document.getElementById('selectAllEvaluators');
         state.elements.clearAllEvaluators = document.getElementById('clearAllEvaluators');
         state.elements.selectedCount = document.getElementById('selectedCount');
+        state.elements.totalCount = document.getElementById('totalCount');
+        state.elements.evaluatorsList = document.getElementById('evaluatorsList');
+        state.elements.loadMoreEvaluators = document.getElementById('loadMoreEvaluators');
+        state.elements.selectedEvaluatorsInputs = document.getElementById('selectedEvaluatorsInputs');
 
         if (state.elements.tableBody) {
             state.rows = Array.from(state.elements.tableBody.querySelectorAll('.supplier-row'));
@@ -136,41 +147,141 @@
             return;
         }
 
-        state.elements.evaluatorSearch?.addEventListener('input', (event) => {
-            const term = (event.target.value || '').toLowerCase();
-            document.querySelectorAll('.evaluator-item-modern').forEach((item) => {
-                const name = item.dataset.name || '';
-                const username = item.dataset.username || '';
-                const jobTitle = item.dataset.jobtitle || '';
-                const matches = name.includes(term) || username.includes(term) || jobTitle.includes(term);
-                item.style.display = matches ? 'flex' : 'none';
-            });
+        state.elements.evaluatorSearch?.addEventListener('input', debounce((event) => {
+            searchEvaluators((event.target.value || '').trim(), 1);
+        }, 250));
+
+        state.elements.loadMoreEvaluators?.addEventListener('click', () => {
+            searchEvaluators(state.evaluators.term, state.evaluators.page + 1);
         });
 
         state.elements.selectAllEvaluators?.addEventListener('click', () => {
             document.querySelectorAll('.evaluator-item-modern').forEach((item) => {
-                if (item.style.display !== 'none') {
-                    const checkbox = item.querySelector('.evaluator-checkbox');
-                    if (checkbox) {
-                        checkbox.checked = true;
-                    }
+                const checkbox = item.querySelector('.evaluator-checkbox');
+                if (checkbox) {
+                    checkbox.checked = true;
+                    state.evaluators.selected.set(checkbox.value, JSON.parse(item.dataset.user || '{}'));
                 }
             });
-            updateEvaluatorCount();
+            syncSelectedEvaluators();
         });
 
         state.elements.clearAllEvaluators?.addEventListener('click', () => {
             document.querySelectorAll('.evaluator-checkbox').forEach((checkbox) => {
                 checkbox.checked = false;
             });
-            updateEvaluatorCount();
+            state.evaluators.selected.clear();
+            syncSelectedEvaluators();
         });
 
-        document.querySelectorAll('.evaluator-checkbox').forEach((checkbox) => {
-            checkbox.addEventListener('change', updateEvaluatorCount);
+        state.elements.evaluatorsList?.addEventListener('change', (event) => {
+            const checkbox = event.target.closest('.evaluator-checkbox');
+            if (!checkbox) {
+                return;
+            }
+            if (checkbox.checked) {
+                const item = checkbox.closest('.evaluator-item-modern');
+                state.evaluators.selected.set(checkbox.value, JSON.parse(item?.dataset.user || '{}'));
+            } else {
+                state.evaluators.selected.delete(checkbox.value);
+            }
+            syncSelectedEvaluators();
         });
     }
 
+    function searchEvaluators(term, page) {
+        const searchUrl = state.endpoints.searchUsers;
+        if (!searchUrl || !state.elements.evaluatorsList) {
+            return;
+        }
+
+        const requestId = ++state.evaluators.requestId;
+        const params = new URLSearchParams({ q: term, page: String(page) });
+        (utils.fetchJSON ? utils.fetchJSON(`${searchUrl}?${params}`) : fetch(`${searchUrl}?${params}`).then((res) => res.json()))
+            .then((data) => {
+                // Ignora respostas de buscas que já foram substituídas por outra digitação
+                if (requestId !== state.evaluators.requestId) {
+                    return;
+                }
+                state.evaluators.term = term;
+                state.evaluators.page = data.page;
+                state.evaluators.hasNext = data.has_next;
+                if (page === 1) {
+                    state.elements.evaluatorsList.innerHTML = '';
+                }
+                data.items.forEach((user) => {
+                    state.elements.evaluatorsList.appendChild(renderEvaluatorItem(user));
+                });
+                if (state.elements.totalCount) {
+                    state.elements.totalCount.textContent = data.total;
+                }
+                state.elements.loadMoreEvaluators?.classList.toggle('d-none', !data.has_next);
+            })
+            .catch(() => {
+                notify('Não foi possível carregar a lista de usuários.', 'warning');
+            });
+    }
+
+    function renderEvaluatorItem(user) {
+        const item = document.createElement('div');
+        item.className = 'evaluator-item-modern';
+        item.dataset.user = JSON.stringify(user);
+
+        const checkbox = document.createElement('input');
+        checkbox.type = 'checkbox';
+        checkbox.className = 'evaluator-checkbox';
+        checkbox.value = String(user.id);
+        checkbox.id = `evaluator_${user.id}`;
+        checkbox.checked = state.evaluators.selected.has(String(user.id));
+
+        const label = document.createElement('label');
+        label.htmlFor = checkbox.id;
+
+        const avatar = document.createElement('div');
+        avatar.className = 'evaluator-avatar-label';
+        avatar.textContent = (user.name || '?').charAt(0).toUpperCase();
+
+        const info = document.createElement('div');
+        info.className = 'evaluator-info';
+        const name = document.createElement('strong');
+        name.textContent = user.name || '';
+        const username = document.createElement('span');
+        username.className = 'username';
+        username.textContent = `@${user.username || ''}`;
+        info.append(name, username);
+        if (user.job_title) {
+            const jobTitle = document.createElement('span');
+            jobTitle.className = 'job-title';
+            jobTitle.textContent = user.job_title;
+            info.appendChild(jobTitle);
+        }
+
+        const check = document.createElement('div');
+        check.className = 'evaluator-check';
+        check.innerHTML = '<i class="bi bi-check-circle-fill"></i>';
+
+        label.append(avatar, info, check);
+        item.append(checkbox, label);
+        return item;
+    }
+
+    function syncSelectedEvaluators() {
+        // Os selecionados são enviados por campos ocultos para preservar
+        // responsáveis que não aparecem na página de busca atual
+        const container = state.elements.selectedEvaluatorsInputs;
+        if (container) {
+            container.innerHTML = '';
+            state.evaluators.selected.forEach((_, userId) => {
+                const input = document.createElement('input');
+                input.type = 'hidden';
+                input.name = 'evaluator_ids';
+                input.value = userId;
+                container.appendChild(input);
+            });
+        }
+        updateEvaluatorCount();
+    }
+
     function bindMasks() {
         attachMask('register_cnpj', utils.maskCNPJ);
         attachMask('edit_cnpj', utils.maskCNPJ);
@@ -451,6 +562,10 @@
                 }
 
                 if (state.permissions.manageEvaluators) {
+                    if (state.elements.evaluatorSearch) {
+                        state.elements.evaluatorSearch.value = '';
+                    }
+                    searchEvaluators('', 1);
                     loadAssignedEvaluators(supplierId);
                 }
 
@@ -469,10 +584,11 @@
 
         (utils.fetchJSON ? utils.fetchJSON(evaluatorsUrl) : fetch(evaluatorsUrl).then((res) => res.json()))
             .then((evaluators) => {
+                state.evaluators.selected = new Map(evaluators.map((ev) => [String(ev.id), ev]));
                 document.querySelectorAll('.evaluator-checkbox').forEach((checkbox) => {
-                    checkbox.checked = evaluators.some((ev) => String(ev.id) === checkbox.value);
+                    checkbox.checked = state.evaluators.selected.has(checkbox.value);
                 });
-                updateEvaluatorCount();
+                syncSelectedEvaluators();
             })
             .catch(() => {
                 notify('Não foi possível carregar os avaliadores atribuídos.', 'warning');
@@ -500,8 +616,7 @@
         if (!state.elements.selectedCount) {
             return;
         }
-        const selected = document.querySelectorAll('.evaluator-checkbox:checked').length;
-        state.elements.selectedCount.textContent = selected;
+        state.elements.selectedCount.textContent = state.evaluators.selected.size;
     }
 
     function buildUrl(template, supplierId) {
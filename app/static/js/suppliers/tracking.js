@@ -2,6 +2,8 @@
     const state = {
         modal: null,
         supplierId: null,
+        // Histórico já carregado por fornecedor: { etag, items, nextCursor }
+        historyCache: new Map(),
         selectors: {
             modalId: 'trackingModal',
             info: 'trackingSupplierInfo',
@@ -106,36 +108,48 @@
         });
     }
 
+    function fetchHistoryPage(supplierId, { cursor = null, etag = null } = {}) {
+        const url = new URL(state.endpoints.history(supplierId), window.location.origin);
+        if (cursor) url.searchParams.set('cursor', cursor);
+
+        const headers = etag ? { 'If-None-Match': etag } : {};
+        return fetch(url, { headers, credentials: 'same-origin' }).then((response) => {
+            if (response.status === 304) {
+                return { notModified: true };
+            }
+            if (!response.ok) {
+                throw new Error(`Erro ${response.status}`);
+            }
+            return response.json().then((data) => ({ data, etag: response.headers.get('ETag') }));
+        });
+    }
+
     function loadHistory() {
         const historyContainer = document.getElementById(state.selectors.history);
         if (!historyContainer || !state.supplierId) return;
 
-        historyContainer.innerHTML = '<div class="loading-state"><div class="spinner-border text-primary" role="status"></div></div>';
-
-        SuppliersUtils?.fetchJSON(state.endpoints.history(state.supplierId))
-            .then((data) => {
-                if (data.success && data.history?.length) {
-                    historyContainer.innerHTML = renderTimeline(data.history);
-                    
-                    // Adicionar event listeners para os lightbox triggers
-                    historyContainer.querySelectorAll('.lightbox-trigger').forEach(trigger => {
-                        trigger.addEventListener('click', (e) => {
-                            e.preventDefault();
-                            const imageUrl = trigger.getAttribute('data-image-url');
-                            const filename = trigger.getAttribute('data-filename');
-                            openImageLightbox(imageUrl, filename);
-                        });
-                    });
-                } else {
-                    historyContainer.innerHTML = `
-                        <div class="empty-state">
-                            <i class="bi bi-inbox"></i>
-                            <p class="mt-3 mb-2"><strong>Nenhum registro de acompanhamento ainda</strong></p>
-                            <p class="small">Adicione a primeira ação usando o formulário acima.</p>
-                        </div>`;
-                }
+        const supplierId = state.supplierId;
+        const cached = state.historyCache.get(supplierId);
+        if (cached) {
+            renderHistory(historyContainer, cached);
+        } else {
+            historyContainer.innerHTML = '<div class="loading-state"><div class="spinner-border text-primary" role="status"></div></div>';
+        }
+
+        // Revalida pelo ETag: sem ações novas o servidor responde 304 e o histórico em cache é mantido
+        fetchHistoryPage(supplierId, { etag: cached?.etag })
+            .then((result) => {
+                if (result.notModified || supplierId !== state.supplierId) return;
+                const entry = {
+                    etag: result.etag,
+                    items: result.data.history || [],
+                    nextCursor: result.data.next_cursor
+                };
+                state.historyCache.set(supplierId, entry);
+                renderHistory(historyContainer, entry);
             })
             .catch((error) => {
+                if (cached) return;
                 historyContainer.innerHTML = `
                     <div class="alert alert-danger">
                         <i class="bi bi-exclamation-triangle me-2"></i>
@@ -144,6 +158,61 @@
             });
     }
 
+    function loadMoreHistory(button) {
+        const historyContainer = document.getElementById(state.selectors.history);
+        const supplierId = state.supplierId;
+        const entry = state.historyCache.get(supplierId);
+        if (!historyContainer || !entry?.nextCursor) return;
+
+        button.disabled = true;
+        button.innerHTML = '<span class="spinner-border spinner-border-sm me-2"></span>Carregando...';
+
+        fetchHistoryPage(supplierId, { cursor: entry.nextCursor })
+            .then(({ data }) => {
+                entry.items = entry.items.concat(data.history || []);
+                entry.nextCursor = data.next_cursor;
+                if (supplierId === state.supplierId) {
+                    renderHistory(historyContainer, entry);
+                }
+            })
+            .catch((error) => {
+                SuppliersUtils?.showToast(`Erro ao carregar histórico: ${error.message}`, 'danger');
+                button.disabled = false;
+                button.textContent = 'Carregar mais';
+            });
+    }
+
+    function renderHistory(historyContainer, entry) {
+        if (!entry.items.length) {
+            historyContainer.innerHTML = `
+                <div class="empty-state">
+                    <i class="bi bi-inbox"></i>
+                    <p class="mt-3 mb-2"><strong>Nenhum registro de acompanhamento ainda</strong></p>
+                    <p class="small">Adicione a primeira ação usando o formulário acima.</p>
+                </div>`;
+            return;
+        }
+
+        historyContainer.innerHTML = renderTimeline(entry.items) + (entry.nextCursor ? `
+            <div class="text-center mt-3">
+                <button type="button" class="btn btn-sm btn-outline-secondary" data-history-more>Carregar mais</button>
+            </div>` : '');
+
+        historyContainer.querySelector('[data-history-more]')?.addEventListener('click', (e) => {
+            loadMoreHistory(e.currentTarget);
+        });
+
+        // Adicionar event listeners para os lightbox triggers
+        historyContainer.querySelectorAll('.lightbox-trigger').forEach(trigger => {
+            trigger.addEventListener('click', (e) => {
+                e.preventDefault();
+                const imageUrl = trigger.getAttribute('data-image-url');
+                const filename = trigger.getAttribute('data-filename');
+                openImageLightbox(imageUrl, filename);
+            });
+        });
+    }
+
     function renderTimeline(history = []) {
         return `
             <div class="timeline mt-4">
@@ -0,0 +1,280 @@
+"""
+Armazenamento de uploads endereçado por conteúdo (SHA-256) com contagem de referências
+
+Cada arquivo é gravado uma única vez em BLOB_STORAGE_FOLDER/ab/cd/<sha256>, não importa
+quantos registros o referenciem. Os modelos donos declaram a coluna que guarda o hash com
+`register_blob_references`; inserções, alterações e exclusões desses registros ajustam
+`stored_blobs.ref_count` na mesma transação. `collect_garbage()` remove os blobs sem referência.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.models import (db, StoredBlob, File, Course, CourseCertificate, CourseVideoRendition, QuizAttachment,
+                        SupplierAttachment, SupplierIssueTracking, UploadSession)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOB_FOLDER = '/app/uploads/blobs'
+_COPY_CHUNK = 1024 * 1024
+_TEMP_FOLDER = '.tmp'
+
+# [(modelo, atributo, extract)] — `extract` converte o valor do atributo em hashes (ex.: listas JSON)
+_owners = []
+
+
+def blob_root():
+    return current_app.config.get('BLOB_STORAGE_FOLDER', DEFAULT_BLOB_FOLDER)
+
+
+def blob_path(sha256):
+    return os.path.join(blob_root(), sha256[:2], sha256[2:4], sha256)
+
+
+def resolve_path(sha256, legacy_path=None):
+    """Caminho do blob quando o registro já usa o armazenamento por hash; senão o caminho antigo."""
+    if sha256:
+        path = blob_path(sha256)
+        if os.path.exists(path):
+            return path
+    return legacy_path
+
+
+def temp_folder():
+    """Pasta de arquivos parciais, no mesmo sistema de arquivos dos blobs (permite os.replace)."""
+    path = os.path.join(blob_root(), _TEMP_FOLDER)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def store_blob(stream, max_size=None):
+    """Grava o conteúdo de `stream` calculando o SHA-256 durante a cópia.
+
+    Retorna (sha256, size), ou (None, size) se o conteúdo exceder `max_size`. O registro em
+    stored_blobs é criado com ref_count 0; a referência passa a contar quando o registro
+    dono é gravado com o hash.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=temp_folder())
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            for chunk in iter(lambda: stream.read(_COPY_CHUNK), b''):
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    os.remove(temp_path)
+                    return None, size
+                digest.update(chunk)
+                temp_file.write(chunk)
+
+        sha256 = digest.hexdigest()
+        _move_into_place(temp_path, sha256)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    _ensure_blob_row(sha256, size)
+    return sha256, size
+
+
+def adopt_temp_file(temp_path):
+    """Move para o armazenamento um arquivo já gravado sob `blob_root()`. Retorna (sha256, size)."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(temp_path, 'rb') as temp_file:
+        for chunk in iter(lambda: temp_file.read(_COPY_CHUNK), b''):
+            size += len(chunk)
+            digest.update(chunk)
+
+    sha256 = digest.hexdigest()
+    _move_into_place(temp_path, sha256)
+    _ensure_blob_row(sha256, size)
+    return sha256, size
+
+
+def _move_into_place(temp_path, sha256):
+    final_path = blob_path(sha256)
+    if os.path.exists(final_path):
+        # Conteúdo já armazenado: renova o mtime para a coleta não removê-lo agora
+        os.remove(temp_path)
+        os.utime(final_path)
+    else:
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(temp_path, final_path)
+
+
+def _ensure_blob_row(sha256, size):
+    if db.session.get(StoredBlob, sha256) is not None:
+        return
+    try:
+        # SAVEPOINT: outro processo pode ter registrado o mesmo conteúdo em paralelo
+        with db.session.begin_nested():
+            db.session.add(StoredBlob(sha256=sha256, size=size, ref_count=0))
+    except IntegrityError:
+        pass
+
+
+def _hashes(value, extract):
+    if value is None:
+        return []
+    values = extract(value) if extract else [value]
+    return [sha256 for sha256 in values if sha256]
+
+
+def _apply_deltas(connection, deltas):
+    table = StoredBlob.__table__
+    for sha256, delta in deltas.items():
+        if delta:
+            connection.execute(
+                update(table).where(table.c.sha256 == sha256).values(ref_count=table.c.ref_count + delta)
+            )
+
+
+def register_blob_references(model, attribute, extract=None):
+    """Mantém ref_count dos blobs referenciados por `model.attribute`."""
+    _owners.append((model, attribute, extract))
+
+    def after_insert(mapper, connection, target):
+        _apply_deltas(connection, Counter(_hashes(getattr(target, attribute), extract)))
+
+    def after_update(mapper, connection, target):
+        history = db.inspect(target).attrs[attribute].history
+        if not history.has_changes():
+            return
+        deltas = Counter()
+        for old_value in history.deleted:
+            deltas.subtract(_hashes(old_value, extract))
+        for new_value in history.added:
+            deltas.update(_hashes(new_value, extract))
+        _apply_deltas(connection, deltas)
+
+    def before_delete(mapper, connection, target):
+        deltas = Counter()
+        deltas.subtract(_hashes(getattr(target, attribute), extract))
+        _apply_deltas(connection, deltas)
+
+    event.listen(model, 'after_insert', after_insert)
+    event.listen(model, 'after_update', after_update)
+    event.listen(model, 'before_delete', before_delete)
+
+
+def recount_references():
+    """Recalcula ref_count a partir dos registros donos (corrige divergências de exclusões em massa)."""
+    counts = Counter()
+    for model, attribute, extract in _owners:
+        column = getattr(model, attribute)
+        if extract is None:
+            rows = db.session.query(column, db.func.count()).filter(column.isnot(None)).group_by(column)
+            for sha256, total in rows:
+                counts[sha256] += total
+        else:
+            for (value,) in db.session.query(column).filter(column.isnot(None)):
+                counts.update(_hashes(value, extract))
+
+    table = StoredBlob.__table__
+    existing = set(db.session.execute(select(table.c.sha256)).scalars())
+    for sha256 in set(counts) - existing:
+        # Registro perdido com o arquivo ainda no disco: recria para a contagem voltar a valer
+        try:
+            size = os.path.getsize(blob_path(sha256))
+        except OSError:
+            logger.warning(f"Blob {sha256} referenciado, mas ausente do armazenamento")
+            continue
+        _ensure_blob_row(sha256, size)
+
+    db.session.execute(update(table).values(ref_count=0))
+    for sha256, total in counts.items():
+        db.session.execute(update(table).where(table.c.sha256 == sha256).values(ref_count=total))
+    db.session.commit()
+
+
+def collect_garbage(grace_seconds=None, recount=True):
+    """Remove blobs sem referência criados há mais de `grace_seconds` e temporários abandonados.
+
+    Retorna (blobs removidos, bytes liberados).
+    """
+    if grace_seconds is None:
+        grace_seconds = current_app.config.get('BLOB_GC_GRACE_SECONDS', 3600)
+    if recount:
+        recount_references()
+
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    orphans = db.session.query(StoredBlob.sha256, StoredBlob.size).filter(
+        StoredBlob.ref_count <= 0, StoredBlob.created_at < cutoff
+    ).all()
+    oldest_allowed = time.time() - grace_seconds
+
+    def recently_stored(sha256):
+        try:
+            return os.path.getmtime(blob_path(sha256)) >= oldest_allowed
+        except OSError:
+            return False
+
+    # O mtime é conferido antes de excluir o registro: um arquivo reenviado mantém arquivo e registro
+    table = StoredBlob.__table__
+    candidates = []
+    for sha256, size in orphans:
+        if recently_stored(sha256):
+            continue
+        result = db.session.execute(
+            delete(table).where(table.c.sha256 == sha256, table.c.ref_count <= 0)
+        )
+        if result.rowcount:
+            candidates.append((sha256, size))
+    db.session.commit()
+
+    removed = freed = 0
+    for sha256, size in candidates:
+        if recently_stored(sha256):
+            # Reenviado entre a exclusão do registro e a do arquivo: devolve o registro
+            _ensure_blob_row(sha256, size)
+            db.session.commit()
+            continue
+        try:
+            os.remove(blob_path(sha256))
+            freed += size
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Não foi possível remover o blob {sha256}: {str(e)}")
+            continue
+        removed += 1
+
+    partial_folder = os.path.join(blob_root(), _TEMP_FOLDER)
+    if os.path.isdir(partial_folder):
+        for name in os.listdir(partial_folder):
+            path = os.path.join(partial_folder, name)
+            try:
+                if os.path.getmtime(path) < oldest_allowed:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    if removed:
+        logger.info(f"Coleta de blobs: {removed} removido(s), {freed} bytes liberados")
+    return removed, freed
+
+
+def _tracking_attachment_hashes(attachments):
+    return [attachment.get('sha256') for attachment in attachments]
+
+
+register_blob_references(File, 'blob_sha256')
+register_blob_references(Course, 'video_sha256')
+register_blob_references(Course, 'image_sha256')
+register_blob_references(CourseVideoRendition, 'sha256')
+register_blob_references(CourseCertificate, 'sha256')
+register_blob_references(QuizAttachment, 'blob_sha256')
+register_blob_references(SupplierAttachment, 'sha256')
+register_blob_references(SupplierIssueTracking, 'attachments', extract=_tracking_attachment_hashes)
+# Upload concluído e ainda não vinculado: o blob vive enquanto a sessão existir (UPLOAD_SESSION_TTL)
+register_blob_references(UploadSession, 'sha256')
@@ -0,0 +1,88 @@
+"""
+Cache em memória com expiração (TTL) compartilhado entre as requisições do processo
+"""
+import threading
+import time
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class TTLCache:
+    """Cache chave/valor com expiração por tempo e contadores de acerto/erro."""
+
+    def __init__(self, name, ttl=60):
+        self.name = name
+        self.ttl = ttl
+        self._data = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        now = time.monotonic()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            expired = [k for k, (exp, _) in self._data.items() if exp <= now]
+            for k in expired:
+                del self._data[k]
+            self._data[key] = (expires_at, value)
+
+    def get_or_set(self, key, factory, ttl=None):
+        """Retorna o valor em cache ou calcula com `factory()` e armazena."""
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, key=None):
+        """Remove uma chave específica ou todo o conteúdo do cache."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'name': self.name,
+                'ttl': self.ttl,
+                'entries': len(self._data),
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0
+            }
+
+
+def get_cache(name, ttl=60):
+    """Retorna (criando se necessário) o cache registrado com este nome."""
+    with _registry_lock:
+        cache = _registry.get(name)
+        if cache is None:
+            cache = TTLCache(name, ttl=ttl)
+            _registry[name] = cache
+        return cache
+
+
+def all_cache_stats():
+    with _registry_lock:
+        caches = list(_registry.values())
+    return [cache.stats() for cache in caches]
@@ -0,0 +1,216 @@
+"""
+Certificados dos cursos renderizados uma vez e guardados no armazenamento por hash
+
+O HTML é gerado na conclusão do curso (ou na primeira visualização) e registrado em
+course_certificates com a data de conclusão usada; enquanto o progresso mantiver essa data, as
+visualizações apenas leem o arquivo. Um novo término (após reset) gera outro certificado.
+`start_certificate_batch` gera, em uma thread, os certificados de todos os concluintes de um curso;
+`iter_certificates_zip` transmite os certificados prontos em um ZIP sem montá-lo em memória.
+"""
+import io
+import logging
+import threading
+import uuid
+import zipfile
+from datetime import datetime
+
+from flask import current_app, render_template, request
+from sqlalchemy import and_
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import secure_filename
+
+from app.models import (
+    db, CertificateBatch, Course, CourseCertificate, CourseEnrollmentTerm, User, UserCourseProgress,
+    UserQuizAttempt
+)
+from app.utils.blob_storage import blob_path, store_blob
+
+logger = logging.getLogger(__name__)
+
+
+def _render(course, user, progress):
+    enrollment = CourseEnrollmentTerm.query.filter_by(user_id=user.id, course_id=course.id).first()
+    attempt = None
+    if course.quiz:
+        attempt = UserQuizAttempt.query.filter_by(
+            user_id=user.id,
+            quiz_id=course.quiz.id
+        ).order_by(UserQuizAttempt.score.desc()).first()
+
+    # <base> mantém CSS e imagens funcionando quando o arquivo é aberto fora do sistema (ZIP)
+    return render_template(
+        'training/course_certificate.html',
+        course=course,
+        user=user,
+        progress=progress,
+        enrollment=enrollment,
+        attempt=attempt,
+        base_url=request.host_url
+    )
+
+
+def _store(course, user, progress, certificate):
+    html = _render(course, user, progress)
+    sha256, _ = store_blob(io.BytesIO(html.encode('utf-8')))
+    if certificate is None:
+        try:
+            # SAVEPOINT: a visualização e o lote podem gerar o mesmo certificado ao mesmo tempo
+            with db.session.begin_nested():
+                certificate = CourseCertificate(
+                    user_id=user.id, course_id=course.id, completed_at=progress.completed_at, sha256=sha256
+                )
+                db.session.add(certificate)
+        except IntegrityError:
+            certificate = CourseCertificate.query.filter_by(user_id=user.id, course_id=course.id).one()
+    certificate.completed_at = progress.completed_at
+    certificate.sha256 = sha256
+    certificate.created_at = datetime.utcnow()
+    db.session.commit()
+    return html
+
+
+def _read(certificate):
+    try:
+        with open(blob_path(certificate.sha256), 'rb') as certificate_file:
+            return certificate_file.read().decode('utf-8')
+    except OSError:
+        return None
+
+
+def get_certificate(course, user):
+    """HTML do certificado do usuário no curso, ou None se o curso não foi concluído."""
+    progress, certificate = db.session.query(UserCourseProgress, CourseCertificate).outerjoin(
+        CourseCertificate, and_(
+            CourseCertificate.user_id == UserCourseProgress.user_id,
+            CourseCertificate.course_id == UserCourseProgress.course_id
+        )
+    ).filter(
+        UserCourseProgress.user_id == user.id,
+        UserCourseProgress.course_id == course.id
+    ).first() or (None, None)
+
+    if not progress or not progress.completed_at:
+        return None
+    if certificate is not None and certificate.completed_at == progress.completed_at:
+        html = _read(certificate)
+        if html is not None:
+            return html
+    return _store(course, user, progress, certificate)
+
+
+def issue_certificate(user_id, course_id):
+    """Gera o certificado logo após a conclusão; falhas só são registradas (a visualização refaz)."""
+    try:
+        course = db.session.get(Course, course_id)
+        user = db.session.get(User, user_id)
+        if course and user:
+            get_certificate(course, user)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Erro ao gerar certificado do usuário {user_id} no curso {course_id}: {str(e)}")
+
+
+def discard_certificates(course_id, user_id=None):
+    """Remove os certificados gerados do curso (ou de um usuário) para que sejam refeitos.
+
+    Usado quando muda algo impresso no certificado sem mudar a data de conclusão: título ou
+    carga horária do curso, nova tentativa no quiz após a conclusão.
+    """
+    query = CourseCertificate.query.filter_by(course_id=course_id)
+    if user_id is not None:
+        query = query.filter_by(user_id=user_id)
+    # Exclusão pelo ORM para manter a contagem de referências dos blobs
+    for certificate in query:
+        db.session.delete(certificate)
+    db.session.commit()
+
+
+def _completers_query(course_id):
+    return db.session.query(User, UserCourseProgress).join(
+        UserCourseProgress, UserCourseProgress.user_id == User.id
+    ).filter(
+        UserCourseProgress.course_id == course_id,
+        UserCourseProgress.completed_at.isnot(None)
+    )
+
+
+def _run_batch(app, batch_id, base_url):
+    with app.test_request_context(base_url=base_url):
+        batch = db.session.get(CertificateBatch, batch_id)
+        try:
+            course = db.session.get(Course, batch.course_id)
+            completers = _completers_query(course.id).all()
+            batch.status = 'running'
+            batch.total = len(completers)
+            db.session.commit()
+
+            for user, _ in completers:
+                get_certificate(course, user)
+                batch.generated += 1
+                db.session.commit()
+
+            batch.status = 'done'
+        except Exception as e:
+            db.session.rollback()
+            batch.status = 'failed'
+            batch.error = str(e)
+            logger.error(f"Erro na geração em lote de certificados ({batch_id}): {str(e)}")
+        finally:
+            batch.finished_at = datetime.utcnow()
+            db.session.commit()
+            db.session.remove()
+
+
+def start_certificate_batch(course, requested_by_id=None):
+    """Cria o lote e inicia a thread que gera os certificados que faltam."""
+    batch = CertificateBatch(id=uuid.uuid4().hex, course_id=course.id, requested_by_id=requested_by_id)
+    db.session.add(batch)
+    db.session.commit()
+
+    threading.Thread(
+        target=_run_batch,
+        args=(current_app._get_current_object(), batch.id, request.host_url),
+        name=f'certificate-batch-{batch.id[:8]}',
+        daemon=True
+    ).start()
+    return batch
+
+
+class _ZipStream(io.RawIOBase):
+    """Destino não pesquisável do ZipFile: acumula os bytes escritos até serem enviados."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_certificates_zip(course_id):
+    """Transmite um ZIP com os certificados já gerados dos concluintes do curso."""
+    rows = db.session.query(User.id, User.name, CourseCertificate.sha256).join(
+        CourseCertificate, CourseCertificate.user_id == User.id
+    ).join(UserCourseProgress, and_(
+        UserCourseProgress.user_id == CourseCertificate.user_id,
+        UserCourseProgress.course_id == CourseCertificate.course_id,
+        UserCourseProgress.completed_at == CourseCertificate.completed_at
+    )).filter(CourseCertificate.course_id == course_id).order_by(User.name).all()
+
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for user_id, name, sha256 in rows:
+            arcname = f"{secure_filename(name) or 'usuario'}_{user_id}.html"
+            with archive.open(arcname, 'w') as entry, open(blob_path(sha256), 'rb') as source:
+                for chunk in iter(lambda: source.read(64 * 1024), b''):
+                    entry.write(chunk)
+                    yield stream.drain()
+    yield stream.drain()
@@ -0,0 +1,186 @@
+"""
+Upload em partes com retomada (init/append/complete)
+
+O cliente abre uma sessão informando finalidade, nome e tamanho, envia o conteúdo em blocos
+sequenciais e conclui a sessão. Tipo e tamanho são validados na abertura e no primeiro bloco,
+antes de o restante ser transferido. Os blocos são gravados direto no disco do armazenamento por
+hash e, ao concluir, o arquivo é movido para o lugar definitivo sem nova cópia. As rotas de
+cadastro recebem o identificador da sessão no lugar do arquivo (`claim_uploads`).
+"""
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+from werkzeug.utils import secure_filename
+
+from app.models import db, UploadSession
+from app.utils.blob_storage import adopt_temp_file, blob_root
+from app.utils.supplier_attachments import MAX_DOCUMENT_SIZE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+DEFAULT_MAX_SIZE = 4 * 1024 * 1024 * 1024
+_READ_BLOCK = 1024 * 1024
+_PARTIAL_FOLDER = '.uploads'
+_SIGNATURE_BYTES = 16
+
+# Assinaturas verificadas nos primeiros bytes do arquivo
+_SIGNATURES = {
+    '.pdf': lambda head: head.startswith(b'%PDF'),
+    '.mp4': lambda head: head[4:8] == b'ftyp',
+    '.png': lambda head: head.startswith(b'\x89PNG\r\n\x1a\n'),
+    '.jpg': lambda head: head.startswith(b'\xff\xd8\xff'),
+    '.jpeg': lambda head: head.startswith(b'\xff\xd8\xff'),
+}
+
+# max_size None = CHUNKED_UPLOAD_MAX_SIZE; extensions None = qualquer tipo
+UPLOAD_PURPOSES = {
+    'course_content': {'extensions': {'.mp4', '.pdf'}, 'max_size': None},
+    'course_image': {'extensions': {'.jpg', '.jpeg', '.png'}, 'max_size': 20 * 1024 * 1024},
+    'repository': {'extensions': None, 'max_size': None},
+    'supplier_document': {'extensions': {'.pdf'}, 'max_size': MAX_DOCUMENT_SIZE},
+}
+
+
+def chunk_size():
+    return current_app.config.get('CHUNKED_UPLOAD_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+
+
+def _max_size(purpose):
+    return UPLOAD_PURPOSES[purpose]['max_size'] or current_app.config.get('CHUNKED_UPLOAD_MAX_SIZE', DEFAULT_MAX_SIZE)
+
+
+def partial_path(upload):
+    return os.path.join(blob_root(), _PARTIAL_FOLDER, upload.id)
+
+
+def _extension(filename):
+    return os.path.splitext(filename)[1].lower()
+
+
+def init_upload(user_id, purpose, filename, total_size):
+    """Abre uma sessão de upload. Retorna (sessão, None) ou (None, mensagem de erro)."""
+    if purpose not in UPLOAD_PURPOSES:
+        return None, 'Finalidade de upload inválida.'
+    filename = secure_filename(filename or '')
+    if not filename:
+        return None, 'Nome de arquivo inválido.'
+    if not isinstance(total_size, int) or total_size <= 0:
+        return None, 'Tamanho de arquivo inválido.'
+
+    allowed = UPLOAD_PURPOSES[purpose]['extensions']
+    if allowed is not None and _extension(filename) not in allowed:
+        return None, f"Formato de arquivo inválido. Permitidos: {', '.join(sorted(allowed))}."
+    max_size = _max_size(purpose)
+    if total_size > max_size:
+        return None, f'Arquivo excede o limite de {max_size // (1024 * 1024)}MB.'
+
+    upload = UploadSession(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        purpose=purpose,
+        filename=filename,
+        total_size=total_size,
+        received_size=0
+    )
+    db.session.add(upload)
+    return upload, None
+
+
+def append_chunk(upload, stream):
+    """Grava o próximo bloco a partir de `upload.received_size`. Retorna None ou mensagem de erro.
+
+    Um bloco interrompido é descartado por inteiro: a gravação recomeça do último offset confirmado.
+    Se o primeiro bloco não tiver a assinatura do formato declarado, a sessão é descartada.
+    """
+    if upload.is_complete:
+        return 'Upload já concluído.'
+    limit = min(chunk_size(), upload.total_size - upload.received_size)
+    path = partial_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    head = b'' if upload.received_size == 0 else None
+    written = 0
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as partial:
+        partial.seek(upload.received_size)
+        partial.truncate()
+        for block in iter(lambda: stream.read(_READ_BLOCK), b''):
+            written += len(block)
+            if written > limit:
+                partial.truncate(upload.received_size)
+                return 'Bloco maior que o permitido.'
+            if head is not None and len(head) < _SIGNATURE_BYTES:
+                head += block[:_SIGNATURE_BYTES]
+            partial.write(block)
+
+    if head is not None and not _valid_signature(upload.filename, head):
+        discard_upload(upload)
+        return 'O conteúdo do arquivo não corresponde ao formato informado.'
+    if written == 0:
+        return 'Bloco vazio.'
+    upload.received_size += written
+    return None
+
+
+def _valid_signature(filename, head):
+    check = _SIGNATURES.get(_extension(filename))
+    return check is None or check(head)
+
+
+def complete_upload(upload):
+    """Move o arquivo recebido para o armazenamento por hash. Retorna None ou mensagem de erro."""
+    if upload.is_complete:
+        return None
+    if upload.received_size != upload.total_size:
+        return f'Upload incompleto: {upload.received_size} de {upload.total_size} bytes recebidos.'
+    sha256, _ = adopt_temp_file(partial_path(upload))
+    upload.sha256 = sha256
+    return None
+
+
+def discard_upload(upload):
+    try:
+        os.remove(partial_path(upload))
+    except OSError:
+        pass
+    db.session.delete(upload)
+
+
+def claim_uploads(upload_ids, purpose, user_id):
+    """Retorna as sessões concluídas informadas (na ordem recebida) e as remove da sessão do banco.
+
+    Ids de outro usuário, de outra finalidade ou ainda não concluídos são ignorados; o commit fica
+    a cargo de quem chama, junto com os registros que passam a referenciar os blobs.
+    """
+    upload_ids = [upload_id for upload_id in upload_ids if upload_id]
+    if not upload_ids:
+        return []
+    uploads = {
+        upload.id: upload for upload in UploadSession.query.filter(
+            UploadSession.id.in_(upload_ids),
+            UploadSession.user_id == user_id,
+            UploadSession.purpose == purpose,
+            UploadSession.sha256.isnot(None)
+        )
+    }
+    claimed = [uploads[upload_id] for upload_id in dict.fromkeys(upload_ids) if upload_id in uploads]
+    for upload in claimed:
+        db.session.delete(upload)
+    return claimed
+
+
+def expire_upload_sessions(max_age_seconds=None):
+    """Remove sessões sem atividade há mais de UPLOAD_SESSION_TTL e seus arquivos parciais."""
+    if max_age_seconds is None:
+        max_age_seconds = current_app.config.get('UPLOAD_SESSION_TTL', 86400)
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age_seconds)
+    expired = UploadSession.query.filter(UploadSession.updated_at < cutoff).all()
+    for upload in expired:
+        discard_upload(upload)
+    db.session.commit()
+    if expired:
+        logger.info(f"{len(expired)} sessão(ões) de upload expirada(s) removida(s)")
+    return len(expired)
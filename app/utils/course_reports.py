@@ -0,0 +1,147 @@
+"""
+Relatórios administrativos de participação nos cursos calculados no banco
+
+- melhor tentativa de cada usuário no quiz: ROW_NUMBER() particionado por usuário;
+- totais (ativos, concluídos, em andamento, não iniciados): agregação com CASE em uma consulta;
+- distribuição de notas: uma linha com SUM(CASE ...) por faixa sobre as melhores tentativas;
+- listagens: uma consulta com usuário, progresso, termo de inscrição e melhor nota, paginável.
+"""
+from sqlalchemy import and_, case, func, select
+
+from app.models import db, CourseEnrollmentTerm, User, UserCourseProgress, UserQuizAttempt
+
+# (rótulo, nota máxima da faixa)
+SCORE_BUCKETS = [
+    ('0-20%', 20),
+    ('21-40%', 40),
+    ('41-60%', 60),
+    ('61-80%', 80),
+    ('81-100%', None),
+]
+
+STATUS_COMPLETED = 'completed'
+STATUS_IN_PROGRESS = 'in_progress'
+STATUS_NOT_STARTED = 'not_started'
+
+
+def best_attempts_subquery(quiz_id):
+    """Melhor tentativa (maior nota, depois a mais recente) de cada usuário no quiz."""
+    ranked = select(
+        UserQuizAttempt.user_id,
+        UserQuizAttempt.score,
+        UserQuizAttempt.submitted_at,
+        func.row_number().over(
+            partition_by=UserQuizAttempt.user_id,
+            order_by=(UserQuizAttempt.score.desc().nullslast(), UserQuizAttempt.submitted_at.desc())
+        ).label('position')
+    ).where(UserQuizAttempt.quiz_id == quiz_id).subquery()
+
+    return select(ranked.c.user_id, ranked.c.score, ranked.c.submitted_at).where(ranked.c.position == 1).subquery()
+
+
+def _status_expression():
+    return case(
+        (UserCourseProgress.completed_at.isnot(None), STATUS_COMPLETED),
+        (UserCourseProgress.last_watched_timestamp > 0, STATUS_IN_PROGRESS),
+        else_=STATUS_NOT_STARTED
+    )
+
+
+def attendance_query(course_id, quiz_id=None, statuses=None, search=None, active_only=True):
+    """Linhas (User, UserCourseProgress, CourseEnrollmentTerm, melhor nota, status) do curso.
+
+    Ordenadas por situação (concluídos, em andamento, não iniciados) e nome; use `.all()` ou
+    `.paginate()`.
+    """
+    best = best_attempts_subquery(quiz_id)
+    status = _status_expression()
+    full_name = func.coalesce(CourseEnrollmentTerm.full_name, User.name)
+
+    query = db.session.query(
+        User, UserCourseProgress, CourseEnrollmentTerm, best.c.score.label('best_score'), status.label('status')
+    ).outerjoin(UserCourseProgress, and_(
+        UserCourseProgress.user_id == User.id,
+        UserCourseProgress.course_id == course_id
+    )).outerjoin(CourseEnrollmentTerm, and_(
+        CourseEnrollmentTerm.user_id == User.id,
+        CourseEnrollmentTerm.course_id == course_id
+    )).outerjoin(best, best.c.user_id == User.id)
+
+    if active_only:
+        query = query.filter(User.is_active.is_(True))
+    if statuses:
+        query = query.filter(status.in_(statuses))
+    if search:
+        pattern = f'%{search}%'
+        query = query.filter(db.or_(User.name.ilike(pattern), CourseEnrollmentTerm.full_name.ilike(pattern)))
+
+    order = case(
+        (status == STATUS_COMPLETED, 0),
+        (status == STATUS_IN_PROGRESS, 1),
+        else_=2
+    )
+    return query.order_by(order, func.lower(full_name), User.id)
+
+
+def attendance_entries(rows):
+    """Converte as linhas de `attendance_query` no formato da folha de presença."""
+    entries = []
+    for user, progress, enrollment, best_score, status in rows:
+        entries.append({
+            'user': user,
+            'full_name': enrollment.full_name if enrollment else user.name,
+            'email': enrollment.email if enrollment else user.email,
+            'accepted_at': enrollment.accepted_at if enrollment else None,
+            'score': best_score if status == STATUS_COMPLETED else None,
+            'progress': progress
+        })
+    return entries
+
+
+def course_summary(course_id, quiz_id=None):
+    """Totais de usuários ativos por situação, nota média e distribuição das melhores notas."""
+    total, with_progress, completed = db.session.query(
+        func.count(User.id),
+        func.count(UserCourseProgress.id),
+        func.coalesce(func.sum(case((UserCourseProgress.completed_at.isnot(None), 1), else_=0)), 0)
+    ).outerjoin(UserCourseProgress, and_(
+        UserCourseProgress.user_id == User.id,
+        UserCourseProgress.course_id == course_id
+    )).filter(User.is_active.is_(True)).one()
+
+    summary = {
+        'total_users': total,
+        'users_completed': completed,
+        'users_not_completed': with_progress - completed,
+        'users_not_started': total - with_progress,
+        'average_score': 0,
+        'chart_data': {'labels': [], 'data': []}
+    }
+    if quiz_id is None:
+        return summary
+
+    average, attempts = db.session.query(
+        func.avg(UserQuizAttempt.score), func.count(UserQuizAttempt.score)
+    ).filter(UserQuizAttempt.quiz_id == quiz_id).one()
+    if not attempts:
+        return summary
+    summary['average_score'] = average
+
+    best = best_attempts_subquery(quiz_id)
+    bucket_sums = []
+    lower = None
+    for _, upper in SCORE_BUCKETS:
+        conditions = [best.c.score.isnot(None)]
+        if lower is not None:
+            conditions.append(best.c.score > lower)
+        if upper is not None:
+            conditions.append(best.c.score <= upper)
+        bucket_sums.append(func.coalesce(func.sum(case((and_(*conditions), 1), else_=0)), 0))
+        lower = upper
+
+    counts = db.session.query(*bucket_sums).select_from(best).one()
+    summary['chart_data'] = {
+        'labels': [label for label, _ in SCORE_BUCKETS],
+        'data': list(counts)
+    }
+    return summary
@@ -0,0 +1,79 @@
+"""
+Situação de cada curso ativo para um usuário (catálogo em /courses)
+
+Uma única consulta traz os cursos ativos com o progresso do usuário e a melhor nota
+(subconsulta agrupada por curso). O resultado fica no cache do processo por usuário e é
+invalidado quando o progresso é gravado, o curso é concluído ou uma avaliação é enviada;
+alterações administrativas nos cursos limpam o cache de todos.
+"""
+from flask import current_app
+from sqlalchemy import and_, func, select
+
+from app.models import db, Course, Quiz, UserCourseProgress, UserQuizAttempt
+from app.utils.cache import get_cache
+
+DEFAULT_COURSE_STATUS_TTL = 300
+
+course_status_cache = get_cache('course_status', ttl=DEFAULT_COURSE_STATUS_TTL)
+
+
+def course_status_query(user_id):
+    """Cursos ativos com o progresso e a melhor nota do usuário (uma linha por curso)."""
+    best_scores = select(
+        Quiz.course_id,
+        func.max(UserQuizAttempt.score).label('best_score')
+    ).join(UserQuizAttempt, UserQuizAttempt.quiz_id == Quiz.id).where(
+        UserQuizAttempt.user_id == user_id
+    ).group_by(Quiz.course_id).subquery()
+
+    return select(
+        Course.id, Course.title, Course.description, Course.duration_seconds, Course.image_sha256,
+        UserCourseProgress.id.label('progress_id'),
+        UserCourseProgress.last_watched_timestamp,
+        UserCourseProgress.completed_at,
+        best_scores.c.best_score
+    ).outerjoin(UserCourseProgress, and_(
+        UserCourseProgress.course_id == Course.id,
+        UserCourseProgress.user_id == user_id
+    )).outerjoin(
+        best_scores, best_scores.c.course_id == Course.id
+    ).where(Course.is_active.is_(True)).order_by(Course.title)
+
+
+def _load_course_status(user_id):
+    rows = db.session.execute(course_status_query(user_id)).all()
+
+    statuses = []
+    for row in rows:
+        if row.progress_id is None:
+            status, percent = 'available', 0
+        elif row.completed_at:
+            status, percent = 'completed', 100
+        else:
+            percent = 0
+            if row.duration_seconds and row.duration_seconds > 0:
+                percent = min(round((row.last_watched_timestamp / row.duration_seconds) * 100), 99)
+            status = 'in_progress'
+        statuses.append({
+            'id': row.id,
+            'title': row.title,
+            'description': row.description,
+            'duration_seconds': row.duration_seconds or 0,
+            'image_sha256': row.image_sha256,
+            'status': status,
+            'percent_complete': percent,
+            'completed_at': row.completed_at,
+            'score': row.best_score
+        })
+    return statuses
+
+
+def get_course_status(user_id):
+    """Lista de dicts (id, title, description, duration_seconds, image_sha256, status, percent_complete, score)."""
+    ttl = current_app.config.get('COURSE_STATUS_CACHE_TTL', DEFAULT_COURSE_STATUS_TTL)
+    return course_status_cache.get_or_set(user_id, lambda: _load_course_status(user_id), ttl=ttl)
+
+
+def invalidate_course_status(user_id=None):
+    """Remove o catálogo em cache de um usuário (ou de todos)."""
+    course_status_cache.invalidate(user_id)
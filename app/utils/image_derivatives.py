@@ -0,0 +1,159 @@
+"""
+Versões reduzidas (WebP/JPEG) das imagens de cursos e avisos
+
+As rotas de imagem aceitam `?w=<largura>`: a largura é arredondada para a menor de
+IMAGE_DERIVATIVE_WIDTHS que a cubra e a imagem é entregue em WebP (se o navegador aceitar) ou
+JPEG, gerada com Pillow na primeira requisição (ou no upload) e guardada em
+IMAGE_DERIVATIVE_FOLDER. O nome do arquivo derivado vem do hash do original (ou do caminho,
+data e tamanho), então as URLs versionadas (`v=`) podem ser guardadas pelo navegador por um ano.
+Sem `w` a rota entrega o original, como antes; GIFs animados e falhas do Pillow também.
+"""
+import glob
+import hashlib
+import logging
+import os
+import tempfile
+
+from flask import current_app, request, url_for
+from PIL import Image, ImageOps
+
+from app.utils.media import send_media
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DERIVATIVE_FOLDER = '/app/uploads/derivatives'
+DEFAULT_DERIVATIVE_WIDTHS = (320, 640, 1280)
+DEFAULT_DERIVATIVE_QUALITY = 80
+LONG_CACHE_SECONDS = 365 * 24 * 3600
+
+FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+
+
+def derivative_widths():
+    return sorted(current_app.config.get('IMAGE_DERIVATIVE_WIDTHS') or DEFAULT_DERIVATIVE_WIDTHS)
+
+
+def _pick_width(requested):
+    widths = derivative_widths()
+    for width in widths:
+        if requested <= width:
+            return width
+    return widths[-1]
+
+
+def _source_key(source_path, etag=None):
+    if etag:
+        return etag
+    stat = os.stat(source_path)
+    return hashlib.sha256(f'{source_path}:{stat.st_mtime_ns}:{stat.st_size}'.encode()).hexdigest()
+
+
+def derivative_path(key, width, fmt):
+    folder = current_app.config.get('IMAGE_DERIVATIVE_FOLDER', DEFAULT_DERIVATIVE_FOLDER)
+    return os.path.join(folder, key[:2], f'{key}_{width}.{fmt}')
+
+
+def _render(source_path, target_path, width, fmt):
+    """Grava a versão reduzida; retorna False quando a imagem deve ser servida como está."""
+    pil_format, _ = FORMATS[fmt]
+    with Image.open(source_path) as image:
+        if getattr(image, 'is_animated', False):
+            return False
+        image = ImageOps.exif_transpose(image)
+        if image.width > width:
+            image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        if fmt == 'jpeg' and has_alpha:
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.convert('RGBA').getchannel('A'))
+            image = background
+        elif image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target_path), suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                quality = current_app.config.get('IMAGE_DERIVATIVE_QUALITY', DEFAULT_DERIVATIVE_QUALITY)
+                image.save(temp_file, pil_format, quality=quality, optimize=fmt == 'jpeg')
+            os.replace(temp_path, target_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    return True
+
+
+def get_derivative(source_path, width, fmt, etag=None):
+    """Caminho da versão `width`/`fmt` da imagem, gerando-a se preciso; None para usar o original."""
+    try:
+        target_path = derivative_path(_source_key(source_path, etag), width, fmt)
+        if os.path.isfile(target_path) or _render(source_path, target_path, width, fmt):
+            return target_path
+    except Exception as e:
+        logger.warning(f"Não foi possível gerar miniatura de {source_path}: {str(e)}")
+    return None
+
+
+def prepare_derivatives(source_path, etag=None):
+    """Gera no upload todas as larguras e formatos, para a primeira visualização não esperar."""
+    for width in derivative_widths():
+        for fmt in FORMATS:
+            if get_derivative(source_path, width, fmt, etag) is None:
+                return
+
+
+def discard_derivatives(source_path, etag=None):
+    """Remove as versões reduzidas de uma imagem que será excluída."""
+    try:
+        key = _source_key(source_path, etag)
+    except OSError:
+        return
+    for path in glob.glob(derivative_path(key, '*', '*')):
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Não foi possível remover miniatura {path}: {str(e)}")
+
+
+def _accepts_webp():
+    # Só a menção explícita conta: image/* e */* também aparecem em navegadores sem WebP
+    return any(value == 'image/webp' for value, _ in request.accept_mimetypes)
+
+
+def send_image(source_path, download_name=None, etag=None):
+    """Responde com a versão pedida em `?w=` ou, sem o parâmetro, com o original."""
+    requested = request.args.get('w', type=int)
+    if not requested or requested <= 0:
+        return send_media(source_path, download_name=download_name, etag=etag)
+
+    width = _pick_width(requested)
+    fmt = 'webp' if _accepts_webp() else 'jpeg'
+    path = get_derivative(source_path, width, fmt, etag)
+    if path is None:
+        return send_media(source_path, download_name=download_name, etag=etag)
+
+    name = os.path.splitext(download_name or os.path.basename(source_path))[0]
+    response = send_media(
+        path,
+        download_name=f'{name}_{width}.{fmt}',
+        etag=os.path.basename(path),
+        mimetype=FORMATS[fmt][1]
+    )
+    # O arquivo derivado nunca muda para a mesma URL versionada; o formato depende do Accept
+    response.cache_control.no_cache = None
+    response.cache_control.max_age = LONG_CACHE_SECONDS
+    response.cache_control.immutable = True
+    response.vary.add('Accept')
+    return response
+
+
+def image_srcset(endpoint, **values):
+    """Valor de `srcset` com as larguras configuradas (função global dos templates)."""
+    return ', '.join(
+        f"{url_for(endpoint, w=width, **values)} {width}w" for width in derivative_widths()
+    )
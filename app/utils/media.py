@@ -0,0 +1,69 @@
+"""
+Entrega de arquivos protegidos (vídeos e imagens de cursos, arquivos do repositório)
+
+A rota faz a autorização e chama `send_media`. A transferência segue MEDIA_OFFLOAD:
+- vazio: o próprio Flask transmite o arquivo, respondendo Range/If-Range (206) e
+  If-None-Match/If-Modified-Since (304) com ETag forte e Last-Modified;
+- 'x-accel-redirect' (nginx): a resposta leva só o cabeçalho X-Accel-Redirect com a location
+  interna correspondente ao caminho (MEDIA_ACCEL_LOCATIONS) e o nginx serve o arquivo;
+- 'x-sendfile' (Apache/lighttpd): cabeçalho X-Sendfile com o caminho no disco.
+Nos modos delegados, Range e requisições condicionais ficam a cargo do proxy.
+"""
+import logging
+import os
+from urllib.parse import quote
+
+from flask import current_app, request
+from werkzeug.utils import send_file
+
+logger = logging.getLogger(__name__)
+
+
+def _accel_locations():
+    """Lê MEDIA_ACCEL_LOCATIONS ("/app/uploads=/protected/uploads,...") do maior prefixo ao menor."""
+    locations = []
+    for item in (current_app.config.get('MEDIA_ACCEL_LOCATIONS') or '').split(','):
+        if '=' in item:
+            prefix, location = item.split('=', 1)
+            locations.append((prefix.strip().rstrip('/'), location.strip().rstrip('/')))
+    return sorted(locations, key=lambda pair: len(pair[0]), reverse=True)
+
+
+def _accel_path(path):
+    real_path = os.path.realpath(path)
+    for prefix, location in _accel_locations():
+        if real_path.startswith(prefix + os.sep):
+            return location + quote(real_path[len(prefix):])
+    return None
+
+
+def send_media(path, download_name=None, as_attachment=False, etag=None, mimetype=None):
+    """Responde com o arquivo em `path`; `etag` (ex.: SHA-256 do conteúdo) substitui o ETag padrão."""
+    offload = (current_app.config.get('MEDIA_OFFLOAD') or '').lower()
+    accel_path = _accel_path(path) if offload == 'x-accel-redirect' else None
+    if offload == 'x-accel-redirect' and accel_path is None:
+        logger.warning(f"Sem location interna para {path}; arquivo servido pelo Flask")
+    delegated = accel_path is not None or offload == 'x-sendfile'
+
+    response = send_file(
+        path,
+        request.environ,
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        download_name=download_name or os.path.basename(path),
+        conditional=not delegated,
+        etag=etag or True,
+        use_x_sendfile=delegated,
+        response_class=current_app.response_class
+    )
+
+    if delegated:
+        # O proxy calcula tamanho, intervalos e validadores ao servir o arquivo
+        response.headers.pop('Content-Length', None)
+        if accel_path is not None:
+            response.headers.pop('X-Sendfile', None)
+            response.headers['X-Accel-Redirect'] = accel_path
+
+    # Conteúdo autenticado: só o navegador guarda, sempre revalidando pelo ETag
+    response.cache_control.private = True
+    return response
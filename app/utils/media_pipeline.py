@@ -0,0 +1,228 @@
+"""
+Preparação offline dos vídeos de cursos com ffprobe/ffmpeg
+
+Ao salvar um curso com vídeo, `queue_course_video` o marca como pendente. Um worker local
+(thread periódica de app.utils.workers) ou `flask media-process` processa a fila:
+- ffprobe lê duração, bitrate e resolução (a duração preenche duration_seconds se estiver 0);
+- o MP4 é remuxado com faststart (moov no início, reprodução sem baixar o arquivo inteiro);
+- com MEDIA_RENDITIONS, gera versões de menor resolução/bitrate da escada RENDITION_LADDER.
+Um curso que ficou em processing além de MEDIA_STALE_CLAIM_SECONDS (worker interrompido) volta
+para a fila na execução seguinte.
+Os resultados vão para o armazenamento por hash (tabela course_video_renditions). Sem ffmpeg
+instalado a fila não é processada e o vídeo continua sendo servido como foi enviado.
+"""
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import or_
+from werkzeug.utils import secure_filename
+
+from app.models import db, Course, CourseVideoRendition
+from app.utils.blob_storage import adopt_temp_file, resolve_path, temp_folder
+from app.utils.workers import start_periodic_worker
+
+logger = logging.getLogger(__name__)
+
+ORIGINAL_LABEL = 'original'
+# (rótulo, altura, bitrate de vídeo em bps)
+RENDITION_LADDER = [
+    ('720p', 720, 2500000),
+    ('480p', 480, 1000000),
+    ('360p', 360, 600000),
+]
+AUDIO_BITRATE = 96000
+
+def media_tools():
+    """Retorna (ffmpeg, ffprobe) encontrados no PATH ou configurados, ou None se faltar algum."""
+    ffmpeg = shutil.which(current_app.config.get('FFMPEG_BINARY', 'ffmpeg'))
+    ffprobe = shutil.which(current_app.config.get('FFPROBE_BINARY', 'ffprobe'))
+    if not ffmpeg or not ffprobe:
+        return None
+    return ffmpeg, ffprobe
+
+
+def course_source_path(course):
+    legacy = os.path.join('/app/uploads/courses', secure_filename(course.title), course.video_filename)
+    return resolve_path(course.video_sha256, legacy)
+
+
+def queue_course_video(course):
+    """Marca o vídeo do curso para preparação e descarta as versões do vídeo anterior."""
+    course.video_renditions = []
+    course.video_bitrate = course.video_height = None
+    course.media_status = 'pending' if course.is_video else None
+    course.media_claimed_at = None
+
+
+def probe_video(ffprobe, path):
+    """Duração (s), bitrate (bps), largura e altura do primeiro stream de vídeo."""
+    result = subprocess.run(
+        [ffprobe, '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path],
+        capture_output=True, check=True, timeout=120
+    )
+    data = json.loads(result.stdout)
+    video = next((s for s in data.get('streams', []) if s.get('codec_type') == 'video'), {})
+    fmt = data.get('format', {})
+    return {
+        'duration': float(fmt.get('duration') or video.get('duration') or 0),
+        'bitrate': int(fmt.get('bit_rate') or video.get('bit_rate') or 0),
+        'width': int(video.get('width') or 0),
+        'height': int(video.get('height') or 0),
+    }
+
+
+def _encode_to_blob(ffmpeg, source, output_args):
+    """Executa o ffmpeg gravando em um temporário do armazenamento e o adota. Retorna (sha256, size)."""
+    fd, output = tempfile.mkstemp(dir=temp_folder(), suffix='.mp4')
+    os.close(fd)
+    try:
+        subprocess.run(
+            [ffmpeg, '-v', 'error', '-y', '-i', source, *output_args, '-movflags', '+faststart', '-f', 'mp4', output],
+            capture_output=True, check=True,
+            timeout=current_app.config.get('MEDIA_FFMPEG_TIMEOUT', 6 * 3600)
+        )
+        return adopt_temp_file(output)
+    finally:
+        if os.path.exists(output):
+            os.remove(output)
+
+
+def _ladder_for(info):
+    if not current_app.config.get('MEDIA_RENDITIONS', True):
+        return []
+    return [
+        (label, height, bitrate) for label, height, bitrate in RENDITION_LADDER
+        if height < info['height'] and (not info['bitrate'] or bitrate < info['bitrate'] * 0.8)
+    ]
+
+
+def prepare_course_video(course, tools):
+    """Probe, remux faststart e versões menores de um curso. Levanta exceção em caso de falha."""
+    ffmpeg, ffprobe = tools
+    source_sha256 = course.video_sha256
+    source = course_source_path(course)
+    info = probe_video(ffprobe, source)
+
+    renditions = []
+    sha256, size = _encode_to_blob(ffmpeg, source, ['-map', '0', '-c', 'copy'])
+    renditions.append(CourseVideoRendition(
+        label=ORIGINAL_LABEL, height=info['height'] or None, bitrate=info['bitrate'] or None, size=size, sha256=sha256
+    ))
+    for label, height, bitrate in _ladder_for(info):
+        sha256, size = _encode_to_blob(ffmpeg, source, [
+            '-vf', f'scale=-2:{height}', '-c:v', 'libx264', '-preset', 'veryfast',
+            '-b:v', str(bitrate), '-maxrate', str(int(bitrate * 1.5)), '-bufsize', str(bitrate * 2),
+            '-c:a', 'aac', '-b:a', str(AUDIO_BITRATE), '-ac', '2'
+        ])
+        renditions.append(CourseVideoRendition(
+            label=label, height=height, bitrate=bitrate + AUDIO_BITRATE, size=size, sha256=sha256
+        ))
+
+    db.session.refresh(course)
+    if course.video_sha256 != source_sha256 or course.media_status != 'processing':
+        # O vídeo foi trocado durante o processamento: o novo envio já está na fila
+        return False
+
+    course.video_renditions = renditions
+    course.video_bitrate = info['bitrate'] or None
+    course.video_height = info['height'] or None
+    if not course.duration_seconds and info['duration']:
+        course.duration_seconds = int(round(info['duration']))
+    course.media_status = 'ready'
+    db.session.commit()
+    return True
+
+
+def _claim(course_id):
+    """Passa o curso de pending para processing; False se outro processo já o pegou."""
+    claimed = Course.query.filter_by(id=course_id, media_status='pending').update(
+        {Course.media_status: 'processing', Course.media_claimed_at: datetime.utcnow()}, synchronize_session=False
+    )
+    db.session.commit()
+    return claimed == 1
+
+
+def _stale_claim_seconds():
+    configured = current_app.config.get('MEDIA_STALE_CLAIM_SECONDS')
+    if configured:
+        return configured
+    # Pior caso de um processamento: remux e todas as versões no limite do ffmpeg
+    timeout = current_app.config.get('MEDIA_FFMPEG_TIMEOUT', 6 * 3600)
+    return timeout * (len(RENDITION_LADDER) + 1) + 600
+
+
+def requeue_stale_videos():
+    """Devolve à fila os cursos em processing cujo worker parou (processo encerrado no meio)."""
+    cutoff = datetime.utcnow() - timedelta(seconds=_stale_claim_seconds())
+    requeued = Course.query.filter(
+        Course.media_status == 'processing',
+        or_(Course.media_claimed_at.is_(None), Course.media_claimed_at < cutoff)
+    ).update({Course.media_status: 'pending', Course.media_claimed_at: None}, synchronize_session=False)
+    db.session.commit()
+    if requeued:
+        logger.warning(f"{requeued} vídeo(s) parado(s) em processamento recolocado(s) na fila")
+    return requeued
+
+
+def process_pending_videos(limit=None):
+    """Processa os cursos pendentes. Retorna (preparados, falhas); (0, 0) sem ffmpeg/ffprobe."""
+    tools = media_tools()
+    if tools is None:
+        return 0, 0
+
+    requeue_stale_videos()
+    query = db.session.query(Course.id).filter(Course.media_status == 'pending').order_by(Course.id)
+    if limit:
+        query = query.limit(limit)
+
+    prepared = failed = 0
+    for (course_id,) in query.all():
+        if not _claim(course_id):
+            continue
+        course = db.session.get(Course, course_id)
+        try:
+            if prepare_course_video(course, tools):
+                prepared += 1
+                logger.info(f"Vídeo do curso {course_id} preparado")
+        except Exception as e:
+            db.session.rollback()
+            Course.query.filter_by(id=course_id, media_status='processing').update(
+                {Course.media_status: 'failed'}, synchronize_session=False
+            )
+            db.session.commit()
+            failed += 1
+            detail = e.stderr.decode(errors='replace')[-500:] if isinstance(e, subprocess.CalledProcessError) else str(e)
+            logger.error(f"Erro ao preparar vídeo do curso {course_id}: {detail}")
+    return prepared, failed
+
+
+def start_media_worker(app):
+    """Inicia (uma vez por processo) a thread que processa a fila de vídeos.
+
+    O intervalo vem de `MEDIA_WORKER_INTERVAL` (segundos); 0 desativa a thread, caso a fila
+    seja processada externamente com `flask media-process`.
+    """
+    interval = app.config.get('MEDIA_WORKER_INTERVAL', 30)
+    if not interval or interval <= 0 or app.testing:
+        return None
+    with app.app_context():
+        if media_tools() is None:
+            logger.info("ffmpeg/ffprobe não encontrados; vídeos de cursos serão servidos sem preparação")
+            return None
+    return start_periodic_worker(app, 'course-media-worker', interval, process_pending_videos)
+
+
+def select_rendition(course, quality=None, save_data=False):
+    """Escolhe a versão a servir: a pedida em `quality`, a menor com Save-Data, senão a 'original'."""
+    renditions = {rendition.label: rendition for rendition in course.video_renditions}
+    if quality in renditions:
+        return renditions[quality]
+    if save_data and renditions:
+        return min(renditions.values(), key=lambda rendition: rendition.bitrate or float('inf'))
+    return renditions.get(ORIGINAL_LABEL)
@@ -0,0 +1,78 @@
+"""
+Cache compartilhado das consultas agregadas do módulo NIR
+"""
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event, func
+
+from app.models import db, Nir
+from app.utils.cache import get_cache
+
+DEFAULT_ALERT_TTL = 60
+DEFAULT_FACET_TTL = 300
+
+NIR_FACET_FIELDS = ('entry_type', 'admission_type', 'discharge_type')
+
+nir_cache = get_cache('nir', ttl=DEFAULT_ALERT_TTL)
+
+
+def _invalidate_nir_cache(mapper, connection, target):
+    nir_cache.invalidate()
+
+
+for _event_name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Nir, _event_name, _invalidate_nir_cache)
+
+
+def _compute_observation_alert_counts():
+    now = datetime.now()
+    time_24h_ago = now - timedelta(hours=24)
+    time_22h_ago = now - timedelta(hours=22)
+
+    pending_decision = Nir.query.filter(
+        Nir.status == 'AGUARDANDO_DECISAO',
+        Nir.fa_datetime <= time_24h_ago
+    ).count()
+
+    observation_critical = Nir.query.filter(
+        Nir.status == 'EM_OBSERVACAO',
+        Nir.fa_datetime <= time_22h_ago,
+        Nir.fa_datetime > time_24h_ago
+    ).count()
+
+    return {
+        'pending_decision': pending_decision,
+        'observation_critical': observation_critical
+    }
+
+
+def get_observation_alert_counts():
+    """Contagens de observações próximas/acima de 24h, iguais para todos os usuários.
+
+    A chave é agrupada em janelas de `NIR_ALERT_CACHE_TTL` segundos, de modo que os
+    limites de 22h/24h avançam no máximo uma janela atrasados; qualquer escrita em
+    `nir` invalida o cache imediatamente.
+    """
+    ttl = current_app.config.get('NIR_ALERT_CACHE_TTL', DEFAULT_ALERT_TTL)
+    bucket = int(time.time() // ttl) if ttl > 0 else time.time()
+    return nir_cache.get_or_set(('observation_alerts', bucket), _compute_observation_alert_counts, ttl=ttl)
+
+
+def _compute_filter_facets():
+    facets = {}
+    for field in NIR_FACET_FIELDS:
+        column = getattr(Nir, field)
+        rows = db.session.query(column, func.count(Nir.id)).filter(
+            column.isnot(None),
+            column != ''
+        ).group_by(column).order_by(column).all()
+        facets[field] = [(value, count) for value, count in rows]
+    return facets
+
+
+def get_filter_facets():
+    """Valores distintos (com contagem) dos filtros da listagem NIR, via GROUP BY em cache."""
+    ttl = current_app.config.get('NIR_FACET_CACHE_TTL', DEFAULT_FACET_TTL)
+    return nir_cache.get_or_set(('filter_facets',), _compute_filter_facets, ttl=ttl)
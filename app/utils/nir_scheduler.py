@@ -0,0 +1,47 @@
+"""
+Transição periódica das observações NIR que excederam 24h para AGUARDANDO_DECISAO
+"""
+import logging
+from datetime import datetime, timedelta
+
+from app.models import db, Nir
+from app.utils.nir_cache import nir_cache
+from app.utils.workers import start_periodic_worker
+
+logger = logging.getLogger(__name__)
+
+OBSERVATION_LIMIT_HOURS = 24
+
+
+def transition_overdue_observations(now=None):
+    """Move em um único UPDATE todas as observações com Horário FA há mais de 24h.
+
+    Retorna a quantidade de registros alterados.
+    """
+    now = now or datetime.now()
+    limit = now - timedelta(hours=OBSERVATION_LIMIT_HOURS)
+
+    updated = Nir.query.filter(
+        Nir.status == 'EM_OBSERVACAO',
+        Nir.fa_datetime.isnot(None),
+        Nir.fa_datetime < limit
+    ).update(
+        {Nir.status: 'AGUARDANDO_DECISAO', Nir.last_modified: datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.session.commit()
+
+    if updated:
+        nir_cache.invalidate()
+        logger.info(f"{updated} observação(ões) NIR movida(s) para AGUARDANDO_DECISAO")
+    return updated
+
+
+def start_observation_scheduler(app):
+    """Inicia (uma vez por processo) a thread que executa a transição a cada intervalo.
+
+    O intervalo vem de `NIR_OBSERVATION_SWEEP_INTERVAL` (segundos); 0 desativa a thread,
+    caso a transição seja agendada externamente com `flask nir-transition-observations`.
+    """
+    interval = app.config.get('NIR_OBSERVATION_SWEEP_INTERVAL', 60)
+    return start_periodic_worker(app, 'nir-observation-scheduler', interval, transition_overdue_observations)
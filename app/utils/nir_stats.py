@@ -0,0 +1,200 @@
+"""
+Consolidado diário de estatísticas do NIR (tabela nir_daily_stats)
+
+Cada registro NIR contribui para até três dias:
+- admissões: dia de `admission_date` (registros não cancelados);
+- altas: dia de `discharge_date`, somando `total_days_admitted` para a média de permanência;
+- cancelamentos: dia de `admission_date`, ou `fa_datetime`/`creation_date` quando ausente.
+
+Os dias afetados por cada flush que altera registros NIR são recalculados na mesma
+transação, com os dias bloqueados até o commit (`lock_rollup_keys`); `rebuild_nir_daily_stats()`
+refaz a tabela inteira (carga inicial no deploy com `flask nir-rebuild-stats` e job noturno).
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import and_, delete, event, insert, or_, select
+
+from app.models import db, Nir, NirDailyStats
+from app.utils.rollups import lock_rollup_keys, track_previous_values
+
+logger = logging.getLogger(__name__)
+
+STATS_DIMENSIONS = ('entry_type', 'admission_type', 'recurso')
+STATS_METRICS = ('admissions', 'discharges', 'cancellations', 'total_days_sum', 'total_days_count')
+
+_DATE_ATTRIBUTES = ('admission_date', 'discharge_date', 'fa_datetime', 'creation_date')
+_SOURCE_COLUMNS = (
+    Nir.admission_date, Nir.discharge_date, Nir.fa_datetime, Nir.creation_date,
+    Nir.entry_type, Nir.admission_type, Nir.recurso,
+    Nir.total_days_admitted, Nir.cancelled, Nir.status
+)
+_PENDING_DAYS_KEY = 'nir_stats_pending_days'
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return None
+
+
+def _is_cancelled(row):
+    return (row.cancelled or '').upper() == 'SIM' or row.status == 'CANCELADO'
+
+
+def _contributions(row):
+    """Gera (dia, métrica, valor) para um registro NIR."""
+    cancelled = _is_cancelled(row)
+    admission_day = _as_date(row.admission_date)
+
+    if admission_day and not cancelled:
+        yield admission_day, 'admissions', 1
+
+    discharge_day = _as_date(row.discharge_date)
+    if discharge_day and not cancelled:
+        yield discharge_day, 'discharges', 1
+        if row.total_days_admitted is not None:
+            yield discharge_day, 'total_days_sum', row.total_days_admitted
+            yield discharge_day, 'total_days_count', 1
+
+    if cancelled:
+        reference_day = admission_day or _as_date(row.fa_datetime) or _as_date(row.creation_date)
+        if reference_day:
+            yield reference_day, 'cancellations', 1
+
+
+def _aggregate(rows, only_days=None):
+    buckets = defaultdict(lambda: dict.fromkeys(STATS_METRICS, 0))
+    for row in rows:
+        key_dims = tuple(getattr(row, dim) or '' for dim in STATS_DIMENSIONS)
+        for day, metric, value in _contributions(row):
+            if only_days is not None and day not in only_days:
+                continue
+            buckets[(day,) + key_dims][metric] += value
+    return [
+        dict(zip(('stat_date',) + STATS_DIMENSIONS, key), **metrics)
+        for key, metrics in buckets.items()
+    ]
+
+
+def refresh_nir_daily_stats(connection, days):
+    """Recalcula o consolidado apenas para os dias informados."""
+    days = {d for d in days if d}
+    if not days:
+        return
+
+    lock_rollup_keys(connection, 'nir_daily_stats', days)
+    day_filters = []
+    for day in days:
+        start = datetime.combine(day, time.min)
+        end = start + timedelta(days=1)
+        for column in (Nir.admission_date, Nir.discharge_date, Nir.fa_datetime, Nir.creation_date):
+            day_filters.append(and_(column >= start, column < end))
+
+    rows = connection.execute(select(*_SOURCE_COLUMNS).where(or_(*day_filters))).all()
+
+    connection.execute(delete(NirDailyStats.__table__).where(NirDailyStats.stat_date.in_(days)))
+    values = _aggregate(rows, only_days=days)
+    if values:
+        connection.execute(insert(NirDailyStats.__table__), values)
+
+
+def rebuild_nir_daily_stats():
+    """Refaz toda a tabela de consolidado a partir dos registros NIR."""
+    rows = db.session.execute(select(*_SOURCE_COLUMNS).execution_options(yield_per=1000))
+    values = _aggregate(rows)
+
+    db.session.execute(delete(NirDailyStats.__table__))
+    if values:
+        db.session.execute(insert(NirDailyStats.__table__), values)
+    db.session.commit()
+    return len(values)
+
+
+def _record_days(obj, include_history):
+    days = set()
+    for attr in _DATE_ATTRIBUTES:
+        days.add(_as_date(getattr(obj, attr, None)))
+        if include_history:
+            history = db.inspect(obj).attrs[attr].history
+            for old_value in history.deleted or ():
+                days.add(_as_date(old_value))
+    days.discard(None)
+    return days
+
+
+track_previous_values(Nir, _DATE_ATTRIBUTES)
+
+
+@event.listens_for(db.session, 'before_flush')
+def _collect_nir_stats_days(session, flush_context, instances):
+    pending = session.info.setdefault(_PENDING_DAYS_KEY, set())
+    for obj in session.new:
+        if isinstance(obj, Nir):
+            pending |= _record_days(obj, include_history=False)
+    for obj in session.dirty:
+        if isinstance(obj, Nir) and session.is_modified(obj, include_collections=False):
+            pending |= _record_days(obj, include_history=True)
+    for obj in session.deleted:
+        if isinstance(obj, Nir):
+            pending |= _record_days(obj, include_history=True)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _refresh_nir_stats_days(session, flush_context):
+    pending = session.info.pop(_PENDING_DAYS_KEY, None)
+    if pending:
+        refresh_nir_daily_stats(session.connection(), pending)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_nir_stats_days(session):
+    session.info.pop(_PENDING_DAYS_KEY, None)
+
+
+def query_nir_stats(start, end, group_by='day', dimension=None):
+    """Agrega o consolidado entre `start` e `end` (inclusive) por dia ou mês e, opcionalmente, por dimensão."""
+    group_columns = [NirDailyStats.stat_date]
+    if dimension:
+        group_columns.append(getattr(NirDailyStats, dimension))
+
+    rows = db.session.query(
+        *group_columns,
+        *[db.func.sum(getattr(NirDailyStats, metric)).label(metric) for metric in STATS_METRICS]
+    ).filter(
+        NirDailyStats.stat_date >= start,
+        NirDailyStats.stat_date <= end
+    ).group_by(*group_columns).all()
+
+    series = defaultdict(lambda: dict.fromkeys(STATS_METRICS, 0))
+    totals = dict.fromkeys(STATS_METRICS, 0)
+    for row in rows:
+        stat_date = _as_date(row.stat_date)
+        period = stat_date.strftime('%Y-%m') if group_by == 'month' else stat_date.isoformat()
+        key = (period, getattr(row, dimension) if dimension else None)
+        for metric in STATS_METRICS:
+            value = getattr(row, metric) or 0
+            series[key][metric] += value
+            totals[metric] += value
+
+    def _serialize(metrics):
+        days_count = metrics['total_days_count']
+        return {
+            'admissions': metrics['admissions'],
+            'discharges': metrics['discharges'],
+            'cancellations': metrics['cancellations'],
+            'avg_days_admitted': round(metrics['total_days_sum'] / days_count, 2) if days_count else None
+        }
+
+    result = []
+    for (period, key), metrics in sorted(series.items(), key=lambda item: (item[0][0], item[0][1] or '')):
+        entry = {'period': period}
+        if dimension:
+            entry[dimension] = key
+        entry.update(_serialize(metrics))
+        result.append(entry)
+
+    return {'series': result, 'totals': _serialize(totals)}
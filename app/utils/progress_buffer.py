@@ -0,0 +1,231 @@
+"""
+Buffer de escrita dos heartbeats de progresso dos cursos (POST /course/<id>/progress)
+
+O player envia a posição do vídeo a cada poucos segundos. Em vez de um SELECT + UPDATE + commit
+por chamada, cada processo mantém em memória a última posição de cada (usuário, curso):
+- a verificação de avanço (anti-skip) é feita contra a posição em memória;
+- as posições alteradas são gravadas em lote (um executemany) a cada PROGRESS_FLUSH_INTERVAL
+  segundos por uma thread, e na conclusão do curso;
+- o UPDATE é feito pelo id do registro e só avança a posição, então buffers de outros processos
+  ou registros resetados pelo administrador não são sobrescritos.
+O reset do administrador só limpa o buffer do processo que o atendeu. Nos demais, a entrada é
+relida do banco por (usuário, curso) quando o UPDATE não encontra o registro, na conclusão e
+quando o player volta para antes da posição em memória (recomeço após o reset).
+Com o intervalo 0 (ou em testes) não há thread e cada heartbeat é gravado na hora.
+"""
+import logging
+import threading
+import time
+
+from sqlalchemy import bindparam, select, update
+
+from app.models import db, UserCourseProgress
+from app.utils.course_status import invalidate_course_status
+from app.utils.training_compliance import refresh_training_compliance
+from app.utils.workers import start_periodic_worker, worker_running
+
+logger = logging.getLogger(__name__)
+
+# Avanço máximo (s) aceito entre a posição registrada e a informada pelo player
+MAX_SKIP_SECONDS = 15
+# Entradas sem heartbeat há mais tempo que isso saem da memória após serem gravadas
+IDLE_EVICT_SECONDS = 600
+# Intervalo mínimo (s) entre releituras de uma entrada quando o player volta no vídeo
+RECHECK_SECONDS = 60
+
+FLUSHER_NAME = 'course-progress-flusher'
+
+_entries = {}
+_entries_lock = threading.Lock()
+
+
+class _Entry:
+    __slots__ = ('progress_id', 'timestamp', 'flushed_timestamp', 'completed', 'touched_at', 'loaded_at')
+
+    def __init__(self, progress):
+        self.progress_id = progress.id
+        self.timestamp = progress.last_watched_timestamp or 0.0
+        self.flushed_timestamp = self.timestamp
+        self.completed = progress.completed_at is not None
+        self.touched_at = self.loaded_at = time.monotonic()
+
+    @property
+    def dirty(self):
+        return self.timestamp > self.flushed_timestamp
+
+
+def buffering_enabled():
+    return worker_running(FLUSHER_NAME)
+
+
+def _load_entry(user_id, course_id):
+    progress = UserCourseProgress.query.filter_by(user_id=user_id, course_id=course_id).first()
+    return _Entry(progress) if progress else None
+
+
+def _reload_entry(key, entry):
+    """Relê o registro por (usuário, curso); mantém a posição em memória se ainda for o mesmo registro."""
+    fresh = _load_entry(*key)
+    if fresh is not None and entry is not None and fresh.progress_id == entry.progress_id:
+        fresh.timestamp = max(fresh.timestamp, entry.timestamp)
+        fresh.flushed_timestamp = min(fresh.flushed_timestamp, entry.flushed_timestamp)
+    with _entries_lock:
+        if fresh is None:
+            _entries.pop(key, None)
+        else:
+            _entries[key] = fresh
+    return fresh
+
+
+def record_heartbeat(user_id, course_id, timestamp):
+    """Registra a posição informada pelo player.
+
+    Retorna (entry, erro); entry None indica que o usuário não tem progresso no curso.
+    """
+    key = (user_id, course_id)
+    with _entries_lock:
+        entry = _entries.get(key)
+    if entry is None:
+        entry = _load_entry(user_id, course_id)
+        if entry is None:
+            return None, None
+    elif timestamp + MAX_SKIP_SECONDS < entry.timestamp and time.monotonic() - entry.loaded_at > RECHECK_SECONDS:
+        # Player bem antes da posição em memória: o progresso pode ter sido resetado em outro processo
+        entry = _reload_entry(key, entry)
+        if entry is None:
+            return None, None
+
+    if timestamp > entry.timestamp + MAX_SKIP_SECONDS and entry.timestamp > 0:
+        # Outro processo pode ter recebido heartbeats mais recentes: confere no banco antes de recusar
+        entry = _reload_entry(key, entry)
+        if entry is None:
+            return None, None
+        if timestamp > entry.timestamp + MAX_SKIP_SECONDS and entry.timestamp > 0:
+            return entry, 'Avanco de vídeo detectado.'
+
+    with _entries_lock:
+        entry.timestamp = max(entry.timestamp, timestamp)
+        entry.touched_at = time.monotonic()
+        _entries[key] = entry
+
+    if not buffering_enabled():
+        flush_progress([key])
+    return entry, None
+
+
+def mark_completed(user_id, course_id, completed_at):
+    """Grava a posição pendente e a conclusão na hora. Retorna True se o curso acabou de ser concluído."""
+    key = (user_id, course_id)
+    flush_progress([key], commit=False)
+    with _entries_lock:
+        entry = _entries.get(key)
+    # A entrada em memória pode ser de um registro já resetado: vale o que está no banco
+    entry = _reload_entry(key, entry)
+    if entry is None or entry.completed:
+        db.session.commit()
+        return False
+
+    completed = UserCourseProgress.query.filter_by(id=entry.progress_id, completed_at=None).update(
+        {UserCourseProgress.completed_at: completed_at}, synchronize_session=False
+    )
+    if completed:
+        refresh_training_compliance(db.session.connection(), [key])
+    db.session.commit()
+    entry.completed = True
+    invalidate_course_status(user_id)
+    return completed == 1
+
+
+def flush_progress(keys=None, commit=True):
+    """Grava em um único executemany as posições alteradas (todas ou só as de `keys`)."""
+    with _entries_lock:
+        selected = [
+            (key, entry, entry.timestamp) for key, entry in _entries.items()
+            if entry.dirty and (keys is None or key in keys)
+        ]
+    rows = [{'pid': entry.progress_id, 'ts': timestamp} for _, entry, timestamp in selected]
+
+    if rows:
+        table = UserCourseProgress.__table__
+        result = db.session.execute(
+            update(table)
+            .where(table.c.id == bindparam('pid'), table.c.last_watched_timestamp < bindparam('ts'))
+            .values(last_watched_timestamp=bindparam('ts')),
+            rows
+        )
+        if result.rowcount != len(rows):
+            selected = _sync_unmatched(selected)
+        # Primeira posição gravada: o curso passa de inscrito para em andamento na matriz
+        started = [key for key, entry, _ in selected if entry.flushed_timestamp <= 0]
+        if started:
+            refresh_training_compliance(db.session.connection(), started)
+    if commit:
+        db.session.commit()
+
+    with _entries_lock:
+        for _, entry, timestamp in selected:
+            entry.flushed_timestamp = max(entry.flushed_timestamp, timestamp)
+    # O catálogo mostra o percentual assistido
+    for user_id in {user_id for (user_id, _), _, _ in selected}:
+        invalidate_course_status(user_id)
+    return len(rows)
+
+
+def _sync_unmatched(selected):
+    """Confere no banco as entradas cujo UPDATE pode não ter encontrado o registro.
+
+    Registro removido (reset em outro processo): a entrada sai do buffer e o próximo heartbeat relê
+    por (usuário, curso). Registro à frente (outro processo gravou depois): a entrada acompanha.
+    Retorna as entradas cujo registro ainda existe.
+    """
+    table = UserCourseProgress.__table__
+    current = {
+        row.id: row for row in db.session.execute(
+            select(table.c.id, table.c.last_watched_timestamp, table.c.completed_at)
+            .where(table.c.id.in_([entry.progress_id for _, entry, _ in selected]))
+        )
+    }
+    kept = []
+    with _entries_lock:
+        for key, entry, timestamp in selected:
+            row = current.get(entry.progress_id)
+            if row is None:
+                if _entries.get(key) is entry:
+                    del _entries[key]
+                continue
+            stored = row.last_watched_timestamp or 0.0
+            entry.timestamp = max(entry.timestamp, stored)
+            entry.flushed_timestamp = max(entry.flushed_timestamp, stored)
+            entry.completed = entry.completed or row.completed_at is not None
+            kept.append((key, entry, timestamp))
+    return kept
+
+
+def discard_progress(course_id, user_id=None):
+    """Remove do buffer as entradas do curso (ou de um usuário no curso) após um reset."""
+    with _entries_lock:
+        for key in [key for key in _entries if key[1] == course_id and user_id in (None, key[0])]:
+            del _entries[key]
+
+
+def _evict_idle():
+    limit = time.monotonic() - IDLE_EVICT_SECONDS
+    with _entries_lock:
+        for key in [key for key, entry in _entries.items() if not entry.dirty and entry.touched_at < limit]:
+            del _entries[key]
+
+
+def _flush_pending():
+    flushed = flush_progress()
+    if flushed:
+        logger.debug(f"{flushed} posição(ões) de progresso gravada(s)")
+    _evict_idle()
+
+
+def start_progress_flusher(app):
+    """Inicia (uma vez por processo) a thread que grava o buffer a cada intervalo e ao encerrar o processo.
+
+    O intervalo vem de `PROGRESS_FLUSH_INTERVAL` (segundos); 0 grava cada heartbeat na hora.
+    """
+    interval = app.config.get('PROGRESS_FLUSH_INTERVAL', 10)
+    return start_periodic_worker(app, FLUSHER_NAME, interval, _flush_pending, run_on_stop=True)
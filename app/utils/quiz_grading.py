@@ -0,0 +1,61 @@
+"""
+Correção das avaliações a partir de um gabarito carregado em uma única consulta
+
+O gabarito é lido do banco a cada envio (uma consulta para o quiz inteiro, em vez de uma por
+questão). Não há cache: a edição do quiz em qualquer processo vale já no envio seguinte.
+"""
+from app.models import db, AnswerOption, Question, QuestionType
+
+
+def _normalize(text):
+    return (text or '').strip().lower()
+
+
+def _load_answer_key(quiz_id):
+    """{question_id: (tipo, id da opção correta, resposta de texto normalizada)}"""
+    rows = db.session.query(
+        Question.id, Question.question_type, AnswerOption.id, AnswerOption.text, AnswerOption.is_correct
+    ).outerjoin(AnswerOption, AnswerOption.question_id == Question.id).filter(
+        Question.quiz_id == quiz_id
+    ).order_by(Question.id, AnswerOption.id).all()
+
+    answer_key = {}
+    for question_id, question_type, option_id, option_text, is_correct in rows:
+        question_type, correct_id, correct_text = answer_key.get(question_id, (question_type, None, None))
+        if question_type == QuestionType.MULTIPLE_CHOICE and is_correct and correct_id is None:
+            correct_id = option_id
+        elif question_type == QuestionType.TEXT_INPUT and option_id is not None and correct_text is None:
+            # A primeira opção cadastrada é a resposta esperada
+            correct_text = _normalize(option_text)
+        answer_key[question_id] = (question_type, correct_id, correct_text)
+    return answer_key
+
+
+def grade_quiz(quiz_id, form):
+    """Corrige as respostas enviadas (`question_<id>`). Retorna (nota 0-100, respostas por questão)."""
+    answer_key = _load_answer_key(quiz_id)
+    answers = {}
+    correct_count = 0
+
+    for question_id, (question_type, correct_id, correct_text) in answer_key.items():
+        submitted = form.get(f'question_{question_id}')
+        is_correct = False
+
+        if not submitted:
+            answers[str(question_id)] = {'answer': None, 'is_correct': False}
+            continue
+
+        if question_type == QuestionType.MULTIPLE_CHOICE:
+            try:
+                submitted = int(submitted)
+                is_correct = correct_id is not None and correct_id == submitted
+            except (ValueError, TypeError):
+                pass
+        elif question_type == QuestionType.TEXT_INPUT:
+            is_correct = correct_text is not None and _normalize(submitted) == correct_text
+
+        correct_count += is_correct
+        answers[str(question_id)] = {'answer': submitted, 'is_correct': is_correct}
+
+    score = (correct_count / len(answer_key)) * 100 if answer_key else 0
+    return score, answers
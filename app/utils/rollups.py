@@ -0,0 +1,79 @@
+"""
+Apoio comum às tabelas consolidadas (NIR, fornecedores, matriz de treinamentos)
+
+Carga inicial: as tabelas nascem vazias com `flask migrate-upgrade` (as migrações são geradas
+automaticamente e não carregam dados). Cada módulo registra com `register_backfill` uma função
+que preenche sua tabela quando ela está vazia e já existem dados de origem; `migrate-upgrade` as
+executa depois do upgrade, em um único processo. Consolidados caros (NIR) ficam de fora e são
+carregados pelo próprio comando de rebuild no deploy.
+
+Concorrência: o recálculo incremental apaga e reinsere as linhas das chaves afetadas;
+`lock_rollup_keys` serializa, no PostgreSQL, as transações que recalculam as mesmas chaves.
+
+Histórico: `track_previous_values` garante o valor antigo das colunas que definem a chave do
+consolidado, para o recálculo alcançar também a chave de onde o registro saiu.
+"""
+import logging
+
+from sqlalchemy import event, func, select
+
+from app.models import db
+
+logger = logging.getLogger(__name__)
+
+_backfills = []
+
+
+def register_backfill(backfill):
+    _backfills.append(backfill)
+    return backfill
+
+
+def run_backfills():
+    """Executa as cargas iniciais registradas. Retorna [(nome, linhas ou None em caso de erro)]."""
+    results = []
+    for backfill in _backfills:
+        name = f"{backfill.__module__}.{backfill.__name__}"
+        try:
+            rows = backfill()
+            if rows:
+                logger.info(f"Carga inicial {name}: {rows} linha(s)")
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Erro na carga inicial {name}: {str(e)}")
+            rows = None
+        results.append((name, rows))
+    return results
+
+
+def lock_rollup_keys(connection, name, keys, shared=False):
+    """Bloqueia até o fim da transação as chaves `keys` do consolidado `name` (PostgreSQL).
+
+    Sem o bloqueio, duas transações que recalculam a mesma chave colidem na restrição única ao
+    reinserir as linhas, e a última a confirmar grava totais sem os registros da outra. Com ele, a
+    segunda espera o commit da primeira e, em READ COMMITTED, já lê seus registros. `shared` permite
+    recálculos simultâneos de chaves menores sob a mesma chave (ex.: pares de um curso). O SQLite
+    serializa as escritas por conta própria.
+    """
+    if connection.dialect.name != 'postgresql':
+        return
+    lock = func.pg_advisory_xact_lock_shared if shared else func.pg_advisory_xact_lock
+    # Mesma ordem em todas as transações: evita deadlock entre recálculos de várias chaves
+    for lock_key in sorted({f'{name}:{key}' for key in keys}):
+        connection.execute(select(lock(func.hashtext(lock_key))))
+
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    pass
+
+
+def track_previous_values(model, attributes):
+    """Carrega o valor gravado antes de uma alteração de `attributes` em instância expirada.
+
+    Os listeners de flush recalculam também a chave antiga (dia, mês...) a partir de
+    `history.deleted`, que fica vazio quando o atributo é alterado após um commit sem
+    `active_history` no evento 'set'.
+    """
+    for attribute in attributes:
+        event.listen(getattr(model, attribute), 'set', _load_previous_value, active_history=True)
+
@@ -0,0 +1,152 @@
+"""
+Documentos de fornecedores: conteúdo no armazenamento por hash, índice na tabela supplier_attachments
+"""
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+
+from werkzeug.utils import secure_filename
+
+from app.models import db, Supplier, SupplierAttachment
+from app.utils.blob_storage import resolve_path, store_blob
+
+logger = logging.getLogger(__name__)
+
+SUPPLIER_UPLOAD_ROOT = '/app/uploads/fornecedores'
+MAX_DOCUMENT_SIZE = 500 * 1024 * 1024
+_LEGACY_METADATA = 'attachments.json'
+
+
+def supplier_upload_folder(supplier_id):
+    return os.path.join(SUPPLIER_UPLOAD_ROOT, str(supplier_id))
+
+
+def legacy_attachment_path(attachment):
+    """Local dos documentos gravados antes do armazenamento por hash."""
+    return os.path.join(supplier_upload_folder(attachment.supplier_id), attachment.stored_filename)
+
+
+def attachment_path(attachment):
+    return resolve_path(attachment.sha256, legacy_attachment_path(attachment))
+
+
+def _is_pdf(file):
+    return file.mimetype == 'application/pdf' or file.filename.lower().endswith('.pdf')
+
+
+def save_supplier_documents(supplier, files, user_id=None, uploads=()):
+    """Armazena os PDFs válidos (até 500MB) e adiciona seus registros à sessão.
+
+    `uploads` são sessões concluídas do upload em partes, já validadas na abertura e no primeiro
+    bloco. Retorna a lista de anexos criados; o commit fica a cargo de quem chama.
+    """
+    created = [
+        _add_attachment(supplier, upload.filename, upload.sha256, upload.total_size, user_id)
+        for upload in uploads
+    ]
+    for file in files:
+        if not file or not file.filename or not _is_pdf(file):
+            continue
+        try:
+            sha256, size = store_blob(file.stream, max_size=MAX_DOCUMENT_SIZE)
+        except Exception as e:
+            logger.error(f"Erro ao gravar documento do fornecedor {supplier.id}: {str(e)}")
+            continue
+        if sha256 is None:
+            continue
+
+        created.append(_add_attachment(supplier, secure_filename(file.filename), sha256, size, user_id))
+    return created
+
+
+def _add_attachment(supplier, filename, sha256, size, user_id):
+    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+    attachment = SupplierAttachment(
+        supplier_id=supplier.id,
+        filename=filename,
+        stored_filename=f"{timestamp}_{uuid.uuid4().hex[:8]}_{filename}",
+        size=size,
+        sha256=sha256,
+        uploaded_by_id=user_id
+    )
+    db.session.add(attachment)
+    return attachment
+
+
+def remove_legacy_file(attachment):
+    """Apaga o arquivo antigo do anexo, se houver; blobs são removidos pela coleta de lixo."""
+    try:
+        os.remove(legacy_attachment_path(attachment))
+    except OSError:
+        pass
+
+
+def migrate_legacy_attachments():
+    """Importa os attachments.json existentes para supplier_attachments (execução única).
+
+    O conteúdo é copiado para o armazenamento por hash e o arquivo antigo removido após o commit.
+    Arquivos já importados são ignorados; cada JSON processado é renomeado para
+    attachments.json.migrated. Retorna (anexos importados, arquivos JSON processados).
+    """
+    if not os.path.isdir(SUPPLIER_UPLOAD_ROOT):
+        return 0, 0
+
+    imported = processed = 0
+    for entry in sorted(os.listdir(SUPPLIER_UPLOAD_ROOT)):
+        meta_path = os.path.join(SUPPLIER_UPLOAD_ROOT, entry, _LEGACY_METADATA)
+        if not entry.isdigit() or not os.path.exists(meta_path):
+            continue
+        supplier_id = int(entry)
+        if db.session.get(Supplier, supplier_id) is None:
+            logger.warning(f"attachments.json ignorado: fornecedor {supplier_id} não existe")
+            continue
+
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as mf:
+                legacy = json.load(mf)
+        except (OSError, ValueError) as e:
+            logger.error(f"Não foi possível ler {meta_path}: {str(e)}")
+            continue
+
+        existing = {
+            stored for (stored,) in db.session.query(SupplierAttachment.stored_filename)
+            .filter_by(supplier_id=supplier_id)
+        }
+        migrated_paths = []
+        for item in legacy:
+            stored_filename = item.get('stored_filename')
+            if not stored_filename or stored_filename in existing:
+                continue
+            file_path = os.path.join(SUPPLIER_UPLOAD_ROOT, entry, stored_filename)
+            if not os.path.exists(file_path):
+                logger.warning(f"Anexo {file_path} listado no JSON mas ausente no disco")
+                continue
+
+            try:
+                uploaded_at = datetime.fromisoformat(item['uploaded_at'])
+            except (KeyError, TypeError, ValueError):
+                uploaded_at = datetime.utcfromtimestamp(os.path.getmtime(file_path))
+
+            with open(file_path, 'rb') as f:
+                sha256, size = store_blob(f)
+            db.session.add(SupplierAttachment(
+                supplier_id=supplier_id,
+                filename=item.get('filename') or stored_filename,
+                stored_filename=stored_filename,
+                size=size,
+                sha256=sha256,
+                uploaded_at=uploaded_at
+            ))
+            existing.add(stored_filename)
+            migrated_paths.append(file_path)
+            imported += 1
+
+        db.session.commit()
+        os.replace(meta_path, meta_path + '.migrated')
+        for file_path in migrated_paths:
+            os.remove(file_path)
+        processed += 1
+
+    return imported, processed
@@ -0,0 +1,58 @@
+"""
+Avaliações de fornecedores duplicadas (mesmo fornecedor, mês e avaliador)
+
+A restrição uq_supplier_evaluation_month não pode ser criada enquanto houver duplicatas antigas.
+`find_duplicate_evaluations()` lista os grupos; `dedupe_supplier_evaluations()` mantém a avaliação
+mais recente de cada grupo, transfere para ela o histórico de acompanhamento das demais e as remove
+(o consolidado de pontuação é recalculado pelo listener de supplier_scores).
+"""
+import logging
+
+from sqlalchemy import func, inspect, select, update
+
+from app.models import db, SupplierEvaluation, SupplierIssueTracking
+
+logger = logging.getLogger(__name__)
+
+
+def find_duplicate_evaluations():
+    """[(supplier_id, month_reference, evaluator_id, id mantido, [ids removidos])]."""
+    if not inspect(db.engine).has_table(SupplierEvaluation.__tablename__):
+        return []
+
+    groups = db.session.execute(
+        select(SupplierEvaluation.supplier_id, SupplierEvaluation.month_reference, SupplierEvaluation.evaluator_id)
+        .group_by(SupplierEvaluation.supplier_id, SupplierEvaluation.month_reference, SupplierEvaluation.evaluator_id)
+        .having(func.count(SupplierEvaluation.id) > 1)
+    ).all()
+
+    duplicates = []
+    for supplier_id, month_reference, evaluator_id in groups:
+        ids = db.session.execute(
+            select(SupplierEvaluation.id).where(
+                SupplierEvaluation.supplier_id == supplier_id,
+                SupplierEvaluation.month_reference == month_reference,
+                SupplierEvaluation.evaluator_id == evaluator_id
+            ).order_by(SupplierEvaluation.evaluation_date.desc(), SupplierEvaluation.id.desc())
+        ).scalars().all()
+        duplicates.append((supplier_id, month_reference, evaluator_id, ids[0], ids[1:]))
+    return duplicates
+
+
+def dedupe_supplier_evaluations():
+    """Remove as duplicatas mantendo a avaliação mais recente. Retorna os grupos resolvidos."""
+    duplicates = find_duplicate_evaluations()
+    for supplier_id, month_reference, evaluator_id, kept_id, removed_ids in duplicates:
+        db.session.execute(
+            update(SupplierIssueTracking)
+            .where(SupplierIssueTracking.evaluation_id.in_(removed_ids))
+            .values(evaluation_id=kept_id)
+        )
+        for evaluation in SupplierEvaluation.query.filter(SupplierEvaluation.id.in_(removed_ids)):
+            db.session.delete(evaluation)
+        logger.info(
+            f"Avaliações duplicadas do fornecedor {supplier_id} em {month_reference} "
+            f"(avaliador {evaluator_id}): mantida {kept_id}, removidas {removed_ids}"
+        )
+    db.session.commit()
+    return duplicates
@@ -0,0 +1,83 @@
+"""
+Atribuição de avaliadores a fornecedores (tabela supplier_evaluators) por operações de conjunto
+
+Os ids recebidos são validados em uma única consulta IN, comparados com as atribuições atuais e
+apenas a diferença é gravada (um DELETE e um INSERT em lote). O commit fica a cargo de quem chama.
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, insert, select
+
+from app.models import db, Supplier, User, supplier_evaluators
+
+
+def parse_ids(values):
+    """Converte valores de formulário/JSON em um conjunto de inteiros, ignorando inválidos."""
+    ids = set()
+    for value in values or []:
+        try:
+            ids.add(int(value))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
+
+def _existing_ids(model, ids):
+    if not ids:
+        return set()
+    return set(db.session.scalars(select(model.id).where(model.id.in_(ids))))
+
+
+def _insert_assignments(pairs, assigned_by_id):
+    if pairs:
+        now = datetime.now(timezone.utc)
+        db.session.execute(insert(supplier_evaluators), [
+            {'supplier_id': supplier_id, 'user_id': user_id, 'assigned_at': now, 'assigned_by_id': assigned_by_id}
+            for supplier_id, user_id in pairs
+        ])
+
+
+def set_supplier_evaluators(supplier, user_ids, assigned_by_id=None):
+    """Define exatamente os avaliadores do fornecedor. Retorna (ids adicionados, ids removidos)."""
+    target = _existing_ids(User, parse_ids(user_ids))
+    current = set(db.session.scalars(
+        select(supplier_evaluators.c.user_id).where(supplier_evaluators.c.supplier_id == supplier.id)
+    ))
+
+    added, removed = target - current, current - target
+    if removed:
+        db.session.execute(delete(supplier_evaluators).where(
+            supplier_evaluators.c.supplier_id == supplier.id,
+            supplier_evaluators.c.user_id.in_(removed)
+        ))
+    _insert_assignments([(supplier.id, user_id) for user_id in added], assigned_by_id)
+
+    # A coleção carregada na sessão não enxerga as alterações feitas direto na tabela
+    db.session.expire(supplier, ['assigned_evaluators'])
+    return added, removed
+
+
+def assign_evaluator_to_suppliers(user, supplier_ids, assigned_by_id=None, replace=False):
+    """Atribui o avaliador a vários fornecedores de uma vez.
+
+    Com `replace`, remove as atribuições do avaliador a fornecedores fora da lista.
+    Retorna (ids de fornecedores adicionados, ids removidos).
+    """
+    target = _existing_ids(Supplier, parse_ids(supplier_ids))
+    current = set(db.session.scalars(
+        select(supplier_evaluators.c.supplier_id).where(supplier_evaluators.c.user_id == user.id)
+    ))
+
+    added = target - current
+    removed = current - target if replace else set()
+    if removed:
+        db.session.execute(delete(supplier_evaluators).where(
+            supplier_evaluators.c.user_id == user.id,
+            supplier_evaluators.c.supplier_id.in_(removed)
+        ))
+    _insert_assignments([(supplier_id, user.id) for supplier_id in added], assigned_by_id)
+
+    for supplier in db.session.identity_map.values():
+        if isinstance(supplier, Supplier) and supplier.id in added | removed:
+            db.session.expire(supplier, ['assigned_evaluators'])
+    return added, removed
@@ -0,0 +1,138 @@
+"""
+Consolidado de pontuação dos fornecedores (tabelas supplier_monthly_scores e supplier_score_summaries)
+
+Cada flush que cria, altera ou remove avaliações recalcula, na mesma transação, apenas os pares
+(fornecedor, mês) afetados e o consolidado geral desses fornecedores, com os fornecedores
+bloqueados até o commit (`lock_rollup_keys`).
+`rebuild_supplier_scores()` refaz as duas tabelas (correção manual); a carga inicial roda em
+`flask migrate-upgrade` quando o consolidado está vazio e já há avaliações.
+"""
+import logging
+
+from sqlalchemy import and_, case, delete, event, func, insert, or_, select
+
+from app.models import db, SupplierEvaluation, SupplierMonthlyScore, SupplierScoreSummary
+from app.utils.rollups import lock_rollup_keys, register_backfill, track_previous_values
+
+logger = logging.getLogger(__name__)
+
+_TRACKED_ATTRIBUTES = ('supplier_id', 'month_reference')
+
+_has_service = SupplierEvaluation.had_service_last_month.is_(True)
+
+_MONTHLY_AGGREGATE = select(
+    SupplierEvaluation.supplier_id,
+    SupplierEvaluation.month_reference,
+    func.count(SupplierEvaluation.id).label('evaluations_count'),
+    func.sum(case((_has_service, 1), else_=0)).label('scored_count'),
+    func.sum(case((_has_service, SupplierEvaluation.total_score), else_=0)).label('score_sum'),
+    func.sum(SupplierEvaluation.overall_rating).label('rating_sum'),
+    func.sum(case((SupplierEvaluation.is_compliant.is_(True), 1), else_=0)).label('compliant_count'),
+    func.sum(case((SupplierEvaluation.is_compliant.is_(True), 0), else_=1)).label('non_compliant_count'),
+    func.max(SupplierEvaluation.evaluation_date).label('last_evaluation_date'),
+    func.max(case((_has_service, SupplierEvaluation.evaluation_date))).label('last_scored_date')
+).group_by(SupplierEvaluation.supplier_id, SupplierEvaluation.month_reference)
+
+_monthly = SupplierMonthlyScore.__table__
+_SUMMARY_AGGREGATE = select(
+    _monthly.c.supplier_id,
+    func.sum(_monthly.c.evaluations_count).label('evaluations_count'),
+    func.sum(_monthly.c.scored_count).label('scored_count'),
+    func.sum(_monthly.c.score_sum).label('score_sum'),
+    func.sum(_monthly.c.rating_sum).label('rating_sum'),
+    func.sum(_monthly.c.compliant_count).label('compliant_count'),
+    func.sum(_monthly.c.non_compliant_count).label('non_compliant_count'),
+    func.max(_monthly.c.last_evaluation_date).label('last_evaluation_date'),
+    func.max(_monthly.c.last_scored_date).label('last_scored_date')
+).group_by(_monthly.c.supplier_id)
+
+
+def refresh_supplier_scores(connection, keys):
+    """Recalcula o consolidado dos pares (supplier_id, month_reference) informados."""
+    keys = {(supplier_id, month) for supplier_id, month in keys if supplier_id and month}
+    if not keys:
+        return
+
+    supplier_ids = {supplier_id for supplier_id, _ in keys}
+    # O consolidado geral soma todos os meses do fornecedor: o bloqueio é por fornecedor
+    lock_rollup_keys(connection, 'supplier_scores', supplier_ids)
+    key_filter = or_(*[
+        and_(SupplierEvaluation.supplier_id == supplier_id, SupplierEvaluation.month_reference == month)
+        for supplier_id, month in keys
+    ])
+    monthly_rows = connection.execute(_MONTHLY_AGGREGATE.where(key_filter)).mappings().all()
+
+    connection.execute(delete(_monthly).where(or_(*[
+        and_(_monthly.c.supplier_id == supplier_id, _monthly.c.month_reference == month)
+        for supplier_id, month in keys
+    ])))
+    if monthly_rows:
+        connection.execute(insert(_monthly), [dict(row) for row in monthly_rows])
+
+    summary_rows = connection.execute(
+        _SUMMARY_AGGREGATE.where(_monthly.c.supplier_id.in_(supplier_ids))
+    ).mappings().all()
+    connection.execute(delete(SupplierScoreSummary.__table__).where(
+        SupplierScoreSummary.supplier_id.in_(supplier_ids)
+    ))
+    if summary_rows:
+        connection.execute(insert(SupplierScoreSummary.__table__), [dict(row) for row in summary_rows])
+
+
+def rebuild_supplier_scores():
+    """Refaz os consolidados de todos os fornecedores a partir das avaliações."""
+    db.session.execute(delete(SupplierScoreSummary.__table__))
+    db.session.execute(delete(_monthly))
+
+    monthly_rows = db.session.execute(_MONTHLY_AGGREGATE).mappings().all()
+    if monthly_rows:
+        db.session.execute(insert(_monthly), [dict(row) for row in monthly_rows])
+        db.session.execute(insert(SupplierScoreSummary.__table__), [
+            dict(row) for row in db.session.execute(_SUMMARY_AGGREGATE).mappings().all()
+        ])
+    db.session.commit()
+    return len(monthly_rows)
+
+
+@register_backfill
+def backfill_supplier_scores():
+    """Preenche os consolidados após a criação das tabelas (avaliações já existentes)."""
+    if db.session.query(SupplierScoreSummary.supplier_id).limit(1).first() is not None:
+        return 0
+    if db.session.query(SupplierEvaluation.id).limit(1).first() is None:
+        return 0
+    return rebuild_supplier_scores()
+
+
+track_previous_values(SupplierEvaluation, _TRACKED_ATTRIBUTES)
+
+
+def _evaluation_keys(evaluation, include_history):
+    keys = {(evaluation.supplier_id, evaluation.month_reference)}
+    if include_history:
+        state = db.inspect(evaluation)
+        old_values = []
+        for attr in _TRACKED_ATTRIBUTES:
+            history = state.attrs[attr].history
+            old_values.append(history.deleted[0] if history.deleted else getattr(evaluation, attr))
+        keys.add(tuple(old_values))
+    return keys
+
+
+@event.listens_for(db.session, 'after_flush')
+def _refresh_supplier_scores(session, flush_context):
+    # Em after_flush as coleções new/dirty/deleted e o histórico dos atributos ainda refletem
+    # o estado anterior ao flush, mas as chaves estrangeiras já foram preenchidas.
+    keys = set()
+    for obj in session.new:
+        if isinstance(obj, SupplierEvaluation):
+            keys |= _evaluation_keys(obj, include_history=False)
+    for obj in session.dirty:
+        if isinstance(obj, SupplierEvaluation) and session.is_modified(obj, include_collections=False):
+            keys |= _evaluation_keys(obj, include_history=True)
+    for obj in session.deleted:
+        if isinstance(obj, SupplierEvaluation):
+            keys |= _evaluation_keys(obj, include_history=True)
+
+    if keys:
+        refresh_supplier_scores(session.connection(), keys)
@@ -0,0 +1,283 @@
+"""
+Matriz de conformidade dos treinamentos (tabela training_compliance)
+
+Uma linha por (usuário, curso) com inscrição, progresso ou conclusão; sem linha o usuário não
+iniciou o curso. Cada flush que cria, altera ou remove progresso, termo de inscrição ou tentativa
+de avaliação recalcula, na mesma transação, apenas os pares afetados. As escritas feitas fora do
+ORM (buffer de progresso, resets do administrador) chamam `refresh_training_compliance` ou
+`refresh_course_compliance`. Os pares e cursos recalculados ficam bloqueados até o commit
+(`lock_rollup_keys`), para o buffer de progresso e as requisições não colidirem no mesmo par.
+`rebuild_training_compliance()` refaz a tabela inteira; a carga inicial
+(`backfill_training_compliance`) a preenche em `flask migrate-upgrade`.
+"""
+import csv
+import io
+import logging
+from datetime import datetime
+
+from sqlalchemy import and_, delete, event, func, insert, or_, select, true
+from sqlalchemy.orm import joinedload
+
+from app.models import (
+    db, Course, CourseEnrollmentTerm, JobPosition, Quiz, TrainingComplianceEntry, User,
+    UserCourseProgress, UserQuizAttempt
+)
+from app.utils.rollups import lock_rollup_keys, register_backfill
+
+logger = logging.getLogger(__name__)
+
+STATUS_ENROLLED = 'enrolled'
+STATUS_IN_PROGRESS = 'in_progress'
+STATUS_COMPLETED = 'completed'
+STATUS_NOT_STARTED = 'not_started'
+
+STATUS_LABELS = {
+    STATUS_COMPLETED: 'Concluído',
+    STATUS_IN_PROGRESS: 'Em andamento',
+    STATUS_ENROLLED: 'Inscrito',
+    STATUS_NOT_STARTED: 'Não iniciado',
+}
+
+_table = TrainingComplianceEntry.__table__
+
+
+def _key_filter(user_column, course_column, keys):
+    return or_(*[and_(user_column == user_id, course_column == course_id) for user_id, course_id in keys])
+
+
+def _compute_entries(connection, progress_filter, enrollment_filter, attempt_filter):
+    """Monta as linhas da matriz a partir de progresso, inscrições e melhores notas."""
+    entries = {}
+
+    def entry_for(user_id, course_id):
+        return entries.setdefault((user_id, course_id), {
+            'user_id': user_id, 'course_id': course_id, 'enrolled_at': None, 'started_at': None,
+            'completed_at': None, 'best_score': None, 'watched': 0
+        })
+
+    for user_id, course_id, created_at, watched, completed_at in connection.execute(select(
+        UserCourseProgress.user_id, UserCourseProgress.course_id, UserCourseProgress.created_at,
+        UserCourseProgress.last_watched_timestamp, UserCourseProgress.completed_at
+    ).where(progress_filter)):
+        entry = entry_for(user_id, course_id)
+        entry.update(started_at=created_at, watched=watched or 0, completed_at=completed_at)
+
+    for user_id, course_id, accepted_at in connection.execute(select(
+        CourseEnrollmentTerm.user_id, CourseEnrollmentTerm.course_id, CourseEnrollmentTerm.accepted_at
+    ).where(enrollment_filter)):
+        entry_for(user_id, course_id)['enrolled_at'] = accepted_at
+
+    # Tentativas sem progresso nem inscrição não geram linha (o usuário não iniciou o curso)
+    for user_id, course_id, best_score in connection.execute(select(
+        UserQuizAttempt.user_id, Quiz.course_id, func.max(UserQuizAttempt.score)
+    ).join(Quiz, Quiz.id == UserQuizAttempt.quiz_id).where(attempt_filter).group_by(
+        UserQuizAttempt.user_id, Quiz.course_id
+    )):
+        if (user_id, course_id) in entries:
+            entries[(user_id, course_id)]['best_score'] = best_score
+
+    now = datetime.utcnow()
+    rows = []
+    for entry in entries.values():
+        if entry['completed_at']:
+            status = STATUS_COMPLETED
+        elif entry['watched'] > 0:
+            status = STATUS_IN_PROGRESS
+        else:
+            status = STATUS_ENROLLED
+        row = {key: value for key, value in entry.items() if key != 'watched'}
+        rows.append({**row, 'status': status, 'updated_at': now})
+    return rows
+
+
+def refresh_training_compliance(connection, keys):
+    """Recalcula as linhas dos pares (user_id, course_id) informados."""
+    keys = {(user_id, course_id) for user_id, course_id in keys if user_id and course_id}
+    if not keys:
+        return
+
+    # Curso em modo compartilhado (exclui só o recálculo do curso inteiro), depois cada par
+    lock_rollup_keys(connection, 'training_compliance_course', {course_id for _, course_id in keys}, shared=True)
+    lock_rollup_keys(connection, 'training_compliance', keys)
+    rows = _compute_entries(
+        connection,
+        _key_filter(UserCourseProgress.user_id, UserCourseProgress.course_id, keys),
+        _key_filter(CourseEnrollmentTerm.user_id, CourseEnrollmentTerm.course_id, keys),
+        _key_filter(UserQuizAttempt.user_id, Quiz.course_id, keys)
+    )
+    connection.execute(delete(_table).where(_key_filter(_table.c.user_id, _table.c.course_id, keys)))
+    if rows:
+        connection.execute(insert(_table), rows)
+
+
+def refresh_course_compliance(connection, course_ids):
+    """Recalcula todas as linhas dos cursos informados (resets em massa, exclusão de quiz)."""
+    course_ids = {course_id for course_id in course_ids if course_id}
+    if not course_ids:
+        return
+
+    lock_rollup_keys(connection, 'training_compliance_course', course_ids)
+    rows = _compute_entries(
+        connection,
+        UserCourseProgress.course_id.in_(course_ids),
+        CourseEnrollmentTerm.course_id.in_(course_ids),
+        Quiz.course_id.in_(course_ids)
+    )
+    connection.execute(delete(_table).where(_table.c.course_id.in_(course_ids)))
+    if rows:
+        connection.execute(insert(_table), rows)
+
+
+def rebuild_training_compliance():
+    """Refaz a matriz inteira a partir dos registros de progresso, inscrição e avaliação."""
+    connection = db.session.connection()
+    connection.execute(delete(_table))
+    rows = _compute_entries(connection, true(), true(), true())
+    if rows:
+        connection.execute(insert(_table), rows)
+    db.session.commit()
+    return len(rows)
+
+
+@register_backfill
+def backfill_training_compliance():
+    """Preenche a matriz após a criação da tabela (progresso e inscrições já existentes)."""
+    if db.session.query(TrainingComplianceEntry.user_id).limit(1).first() is not None:
+        return 0
+    if (db.session.query(UserCourseProgress.id).limit(1).first() is None
+            and db.session.query(CourseEnrollmentTerm.id).limit(1).first() is None):
+        return 0
+    return rebuild_training_compliance()
+
+
+@event.listens_for(db.session, 'after_flush')
+def _refresh_training_compliance(session, flush_context):
+    keys = set()
+    quiz_keys = set()
+    course_ids = set()
+    for collection in (session.new, session.dirty, session.deleted):
+        for obj in collection:
+            if isinstance(obj, (UserCourseProgress, CourseEnrollmentTerm)):
+                keys.add((obj.user_id, obj.course_id))
+            elif isinstance(obj, UserQuizAttempt):
+                quiz_keys.add((obj.user_id, obj.quiz_id))
+            elif isinstance(obj, Course) and obj in session.deleted:
+                course_ids.add(obj.id)
+
+    if quiz_keys:
+        quiz_courses = dict(session.connection().execute(
+            select(Quiz.id, Quiz.course_id).where(Quiz.id.in_({quiz_id for _, quiz_id in quiz_keys}))
+        ).all())
+        keys |= {(user_id, quiz_courses.get(quiz_id)) for user_id, quiz_id in quiz_keys}
+
+    if course_ids:
+        refresh_course_compliance(session.connection(), course_ids)
+    keys = {key for key in keys if key[1] not in course_ids}
+    if keys:
+        refresh_training_compliance(session.connection(), keys)
+
+
+def _filtered_users(sector=None, job_position_id=None, search=None):
+    query = User.query.outerjoin(JobPosition, JobPosition.id == User.job_position_id).filter(User.is_active.is_(True))
+    if sector:
+        query = query.filter(JobPosition.sector == sector)
+    if job_position_id:
+        query = query.filter(User.job_position_id == job_position_id)
+    if search:
+        query = query.filter(User.name.ilike(f'%{search}%'))
+    return query
+
+
+def _filtered_courses(scope=None):
+    query = Course.query.filter(Course.is_active.is_(True))
+    if scope:
+        query = query.filter(Course.scope == scope)
+    return query.order_by(Course.title)
+
+
+def compliance_matrix(sector=None, job_position_id=None, scope=None, search=None, page=1, per_page=50):
+    """Página da matriz: usuários filtrados × cursos ativos, células e totais de concluintes por curso."""
+    courses = _filtered_courses(scope).all()
+    users_query = _filtered_users(sector, job_position_id, search)
+    pagination = users_query.options(joinedload(User.job_position)).order_by(User.name, User.id).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+
+    course_ids = [course.id for course in courses]
+    user_ids = [user.id for user in pagination.items]
+    cells = {}
+    if course_ids and user_ids:
+        for entry in TrainingComplianceEntry.query.filter(
+            TrainingComplianceEntry.user_id.in_(user_ids),
+            TrainingComplianceEntry.course_id.in_(course_ids)
+        ):
+            cells[(entry.user_id, entry.course_id)] = entry
+
+    completed_counts = {}
+    if course_ids:
+        filtered_ids = users_query.with_entities(User.id).order_by(None).subquery()
+        completed_counts = dict(db.session.query(
+            TrainingComplianceEntry.course_id, func.count()
+        ).filter(
+            TrainingComplianceEntry.status == STATUS_COMPLETED,
+            TrainingComplianceEntry.course_id.in_(course_ids),
+            TrainingComplianceEntry.user_id.in_(select(filtered_ids.c.id))
+        ).group_by(TrainingComplianceEntry.course_id).all())
+
+    return {
+        'courses': courses,
+        'pagination': pagination,
+        'cells': cells,
+        'completed_counts': completed_counts,
+        'total_users': pagination.total
+    }
+
+
+def compliance_filter_options():
+    """Setores e cargos ativos para os filtros da matriz."""
+    positions = JobPosition.query.filter_by(is_active=True).order_by(JobPosition.name).all()
+    sectors = sorted({position.sector for position in positions if position.sector})
+    return sectors, positions
+
+
+def iter_compliance_csv(sector=None, job_position_id=None, scope=None, search=None):
+    """Gera o CSV (uma linha por usuário e curso) em blocos, sem montar o arquivo em memória."""
+    users = _filtered_users(sector, job_position_id, search).with_entities(
+        User.id, User.name, User.email, JobPosition.name.label('position'), JobPosition.sector
+    ).subquery()
+    courses = _filtered_courses(scope).with_entities(Course.id, Course.title).subquery()
+
+    statement = select(
+        users.c.name, users.c.email, users.c.position, users.c.sector, courses.c.title,
+        TrainingComplianceEntry.status, TrainingComplianceEntry.enrolled_at,
+        TrainingComplianceEntry.completed_at, TrainingComplianceEntry.best_score
+    ).select_from(users).join(courses, true()).outerjoin(TrainingComplianceEntry, and_(
+        TrainingComplianceEntry.user_id == users.c.id,
+        TrainingComplianceEntry.course_id == courses.c.id
+    )).order_by(users.c.name, users.c.id, courses.c.title).execution_options(yield_per=1000)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';')
+
+    def flush():
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return data
+
+    buffer.write('﻿')
+    writer.writerow(['Nome', 'E-mail', 'Cargo', 'Setor', 'Curso', 'Situação', 'Inscrição', 'Conclusão', 'Melhor nota'])
+    yield flush()
+
+    for count, row in enumerate(db.session.execute(statement), start=1):
+        name, email, position, sector_name, title, status, enrolled_at, completed_at, best_score = row
+        writer.writerow([
+            name, email, position or '', sector_name or '', title,
+            STATUS_LABELS[status or STATUS_NOT_STARTED],
+            enrolled_at.strftime('%d/%m/%Y %H:%M') if enrolled_at else '',
+            completed_at.strftime('%d/%m/%Y %H:%M') if completed_at else '',
+            f'{best_score:.1f}'.replace('.', ',') if best_score is not None else ''
+        ])
+        if count % 500 == 0:
+            yield flush()
+    yield flush()
@@ -0,0 +1,66 @@
+"""
+Busca paginada de usuários ativos para os seletores de responsáveis, com cache em memória
+"""
+from sqlalchemy import event, or_
+
+from app.models import db, User
+from app.utils.cache import get_cache
+
+USER_SEARCH_TTL = 120
+USER_SEARCH_MAX_PER_PAGE = 50
+
+_SEARCHED_ATTRIBUTES = ('name', 'username', 'job_title', 'is_active')
+
+user_search_cache = get_cache('user_search', ttl=USER_SEARCH_TTL)
+
+
+def _invalidate_user_search(mapper, connection, target):
+    user_search_cache.invalidate()
+
+
+def _invalidate_user_search_on_change(mapper, connection, target):
+    # Atualizações como last_login (a cada acesso) não afetam a busca
+    state = db.inspect(target)
+    if any(state.attrs[attr].history.has_changes() for attr in _SEARCHED_ATTRIBUTES):
+        user_search_cache.invalidate()
+
+
+event.listen(User, 'after_insert', _invalidate_user_search)
+event.listen(User, 'after_update', _invalidate_user_search_on_change)
+event.listen(User, 'after_delete', _invalidate_user_search)
+
+
+def _search_active_users(term, page, per_page):
+    query = User.query.filter(User.is_active.is_(True))
+    if term:
+        pattern = f'%{term}%'
+        query = query.filter(or_(
+            User.name.ilike(pattern),
+            User.username.ilike(pattern),
+            User.job_title.ilike(pattern)
+        ))
+
+    pagination = query.order_by(User.name).paginate(page=page, per_page=per_page, error_out=False)
+    return {
+        'items': [{
+            'id': user.id,
+            'name': user.name,
+            'username': user.username,
+            'job_title': user.job_title
+        } for user in pagination.items],
+        'page': pagination.page,
+        'per_page': pagination.per_page,
+        'total': pagination.total,
+        'has_next': pagination.has_next
+    }
+
+
+def search_active_users(term='', page=1, per_page=20):
+    """Retorna uma página de usuários ativos cujo nome, usuário ou cargo contém `term`."""
+    term = (term or '').strip().lower()
+    page = max(page, 1)
+    per_page = min(max(per_page, 1), USER_SEARCH_MAX_PER_PAGE)
+    return user_search_cache.get_or_set(
+        (term, page, per_page),
+        lambda: _search_active_users(term, page, per_page)
+    )
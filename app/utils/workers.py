@@ -0,0 +1,81 @@
+"""
+Threads de fundo periódicas (transição das observações NIR, fila de vídeos, buffer de progresso)
+
+`start_periodic_worker` inicia uma única thread por nome e processo, que executa a tarefa num
+contexto da aplicação a cada intervalo. Ao encerrar o processo a thread é parada (atexit) e,
+com `run_on_stop`, executa a tarefa uma última vez antes de terminar.
+"""
+import atexit
+import logging
+import threading
+
+from app.models import db
+
+logger = logging.getLogger(__name__)
+
+# Tempo máximo (s) que o encerramento do processo aguarda cada thread terminar
+STOP_TIMEOUT = 10
+
+_workers = {}
+_workers_lock = threading.Lock()
+
+
+def _run_task(app, name, task):
+    with app.app_context():
+        try:
+            task()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Erro na thread {name}: {str(e)}")
+        finally:
+            db.session.remove()
+
+
+def _run_worker(app, name, interval, task, run_on_stop, stop_event):
+    while not stop_event.wait(interval):
+        _run_task(app, name, task)
+    if run_on_stop:
+        _run_task(app, name, task)
+
+
+def start_periodic_worker(app, name, interval, task, run_on_stop=False):
+    """Inicia (uma vez por processo) a thread `name`, que executa `task()` a cada `interval` segundos.
+
+    Intervalo 0 (ou negativo) e o modo de testes não iniciam a thread; retorna None nesses casos.
+    """
+    if not interval or interval <= 0 or app.testing:
+        return None
+
+    with _workers_lock:
+        worker = _workers.get(name)
+        if worker is not None and worker.is_alive():
+            return worker
+
+        stop_event = threading.Event()
+        worker = threading.Thread(
+            target=_run_worker,
+            args=(app, name, interval, task, run_on_stop, stop_event),
+            name=name,
+            daemon=True
+        )
+        worker.stop_event = stop_event
+        _workers[name] = worker
+        worker.start()
+        atexit.register(stop_worker, name)
+        return worker
+
+
+def stop_worker(name, timeout=STOP_TIMEOUT):
+    """Sinaliza a parada da thread `name` e aguarda até `timeout` segundos pelo seu término."""
+    with _workers_lock:
+        worker = _workers.get(name)
+    if worker is None:
+        return
+    worker.stop_event.set()
+    if worker is not threading.current_thread():
+        worker.join(timeout)
+
+
+def worker_running(name):
+    worker = _workers.get(name)
+    return worker is not None and worker.is_alive()
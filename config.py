@@ -21,6 +21,29 @@ class Config:
     # Configurações de upload
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or 'app/uploads'
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 500 * 1024 * 1024))  # 500MB
+    BLOB_STORAGE_FOLDER = os.environ.get('BLOB_STORAGE_FOLDER') or '/app/uploads/blobs'  # arquivos por SHA-256
+    BLOB_GC_GRACE_SECONDS = int(os.environ.get('BLOB_GC_GRACE_SECONDS', 3600))  # idade mínima para coleta
+    CHUNKED_UPLOAD_CHUNK_SIZE = int(os.environ.get('CHUNKED_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))  # 8MB por bloco
+    CHUNKED_UPLOAD_MAX_SIZE = int(os.environ.get('CHUNKED_UPLOAD_MAX_SIZE', 4 * 1024 * 1024 * 1024))  # 4GB
+    UPLOAD_SESSION_TTL = int(os.environ.get('UPLOAD_SESSION_TTL', 86400))  # sessões de upload inativas
+    
+    # Entrega de mídia: '' (Flask), 'x-accel-redirect' (nginx) ou 'x-sendfile' (Apache/lighttpd)
+    MEDIA_OFFLOAD = os.environ.get('MEDIA_OFFLOAD', '')
+    MEDIA_ACCEL_LOCATIONS = os.environ.get('MEDIA_ACCEL_LOCATIONS', '/app/uploads=/protected-uploads')
+    
+    # Preparação de vídeos de cursos (faststart e versões de menor bitrate via ffmpeg)
+    FFMPEG_BINARY = os.environ.get('FFMPEG_BINARY', 'ffmpeg')
+    FFPROBE_BINARY = os.environ.get('FFPROBE_BINARY', 'ffprobe')
+    MEDIA_RENDITIONS = os.environ.get('MEDIA_RENDITIONS', 'True').lower() == 'true'
+    MEDIA_WORKER_INTERVAL = int(os.environ.get('MEDIA_WORKER_INTERVAL', 30))  # segundos, 0 desativa
+    MEDIA_FFMPEG_TIMEOUT = int(os.environ.get('MEDIA_FFMPEG_TIMEOUT', 6 * 3600))  # segundos por conversão
+    # Vídeo em processing há mais que isso volta para a fila; 0 = uma conversão por versão mais margem
+    MEDIA_STALE_CLAIM_SECONDS = int(os.environ.get('MEDIA_STALE_CLAIM_SECONDS', 0))
+    
+    # Miniaturas (WebP/JPEG) das imagens de cursos e avisos, geradas com Pillow
+    IMAGE_DERIVATIVE_FOLDER = os.environ.get('IMAGE_DERIVATIVE_FOLDER') or '/app/uploads/derivatives'
+    IMAGE_DERIVATIVE_WIDTHS = [int(width) for width in os.environ.get('IMAGE_DERIVATIVE_WIDTHS', '320,640,1280').split(',')]
+    IMAGE_DERIVATIVE_QUALITY = int(os.environ.get('IMAGE_DERIVATIVE_QUALITY', 80))
     
     # Configurações de sessão
     PERMANENT_SESSION_LIFETIME = timedelta(hours=1)
@@ -38,6 +61,17 @@ class Config:
     # Configurações de timezone
     TIMEZONE = os.environ.get('TIMEZONE', 'America/Sao_Paulo')
     
+    # Configurações de cache
+    NIR_ALERT_CACHE_TTL = int(os.environ.get('NIR_ALERT_CACHE_TTL', 60))  # segundos
+    NIR_FACET_CACHE_TTL = int(os.environ.get('NIR_FACET_CACHE_TTL', 300))  # segundos
+    COURSE_STATUS_CACHE_TTL = int(os.environ.get('COURSE_STATUS_CACHE_TTL', 300))  # segundos
+    
+    # Transição automática de observações NIR (>24h) para AGUARDANDO_DECISAO
+    NIR_OBSERVATION_SWEEP_INTERVAL = int(os.environ.get('NIR_OBSERVATION_SWEEP_INTERVAL', 60))  # segundos, 0 desativa
+    
+    # Gravação em lote dos heartbeats de progresso dos cursos
+    PROGRESS_FLUSH_INTERVAL = int(os.environ.get('PROGRESS_FLUSH_INTERVAL', 10))  # segundos, 0 grava na hora
+    
     # Configurações de rate limiting
     RATELIMIT_ENABLED = True
     RATELIMIT_STORAGE_URL = 'memory://'
@@ -66,6 +100,7 @@ class TestingConfig(Config):
     """Configuração para testes."""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_BINDS = {'procedures': 'sqlite://'}
     WTF_CSRF_ENABLED = False
 
 # Dicionário de configurações
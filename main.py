@@ -1,7 +1,11 @@
+import os
+
 from app import create_app
 from app.utils.rbac_permissions import initialize_rbac
 
-app = create_app()
+# Com `python main.py` (debug) o processo pai do reloader não inicia as threads de fundo; só o filho
+running_reloader_parent = __name__ == "__main__" and os.environ.get("WERKZEUG_RUN_MAIN") != "true"
+app = create_app(start_workers=not running_reloader_parent)
 
 with app.app_context():
     initialize_rbac()
@@ -0,0 +1,50 @@
+import os
+import tempfile
+
+import pytest
+
+_TEST_DIR = tempfile.mkdtemp(prefix='sispla-tests-')
+os.environ['FLASK_CONFIG'] = 'testing'
+os.environ.pop('POSTGRES_URL', None)
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_TEST_DIR, 'test.db')
+
+from app import create_app  # noqa: E402
+from app.models import db, User  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app()
+    app.config.update(
+        BLOB_STORAGE_FOLDER=os.path.join(_TEST_DIR, 'blobs'),
+        IMAGE_DERIVATIVE_FOLDER=os.path.join(_TEST_DIR, 'derivatives'),
+    )
+    return app
+
+
+@pytest.fixture
+def session(app):
+    """Banco vazio por teste, dentro de um contexto de aplicação."""
+    with app.app_context():
+        db.create_all()
+        yield db.session
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user(session):
+    user = User(name='Usuário Teste', username='teste', email='teste@example.com', password='-', profile='')
+    session.add(user)
+    session.commit()
+    return user
+
+
+@pytest.fixture
+def client(app, user):
+    """Cliente de teste autenticado como `user`."""
+    client = app.test_client()
+    with client.session_transaction() as flask_session:
+        flask_session['_user_id'] = str(user.id)
+        flask_session['_fresh'] = True
+    return client
@@ -0,0 +1,55 @@
+import io
+import os
+import time
+from datetime import datetime, timedelta
+
+from app.models import Course, StoredBlob
+from app.utils.blob_storage import blob_path, collect_garbage, recount_references, store_blob
+
+
+def _age(session, sha256, seconds=7200):
+    """Envelhece registro e arquivo além do prazo de carência da coleta."""
+    session.get(StoredBlob, sha256).created_at = datetime.utcnow() - timedelta(seconds=seconds)
+    session.commit()
+    old = time.time() - seconds
+    os.utime(blob_path(sha256), (old, old))
+
+
+def test_collect_garbage_removes_old_orphan(session):
+    sha256, size = store_blob(io.BytesIO(b'orfao'))
+    session.commit()
+    _age(session, sha256)
+
+    assert collect_garbage(grace_seconds=3600) == (1, size)
+    assert session.get(StoredBlob, sha256) is None
+    assert not os.path.exists(blob_path(sha256))
+
+
+def test_collect_garbage_keeps_row_of_restored_file(session):
+    sha256, _ = store_blob(io.BytesIO(b'reenviado'))
+    session.commit()
+    _age(session, sha256)
+    os.utime(blob_path(sha256))  # reenviado: store_blob renova o mtime do arquivo existente
+
+    assert collect_garbage(grace_seconds=3600) == (0, 0)
+    assert session.get(StoredBlob, sha256) is not None
+    assert os.path.exists(blob_path(sha256))
+
+    # A referência criada em seguida volta a ser contada
+    session.add(Course(title='Curso', video_filename='video.mp4', video_sha256=sha256))
+    session.commit()
+    session.expire_all()
+    assert session.get(StoredBlob, sha256).ref_count == 1
+
+
+def test_recount_recreates_missing_row(session):
+    sha256, size = store_blob(io.BytesIO(b'sem registro'))
+    session.add(Course(title='Curso', video_filename='video.mp4', video_sha256=sha256))
+    session.commit()
+    session.delete(session.get(StoredBlob, sha256))
+    session.commit()
+
+    recount_references()
+
+    blob = session.get(StoredBlob, sha256)
+    assert (blob.size, blob.ref_count) == (size, 1)
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from app.models import Course, CourseCertificate, StoredBlob, UserCourseProgress
+from app.utils.certificates import _store
+
+
+def test_concurrent_certificate_updates_existing_row(app, session, user):
+    course = Course(title='Curso', video_filename='aula.mp4', duration_seconds=600)
+    session.add(course)
+    session.flush()
+    progress = UserCourseProgress(user_id=user.id, course_id=course.id, completed_at=datetime(2025, 3, 1))
+    session.add(progress)
+    session.commit()
+    # Registro gravado por outra requisição depois da consulta de get_certificate
+    session.add(CourseCertificate(
+        user_id=user.id, course_id=course.id, completed_at=datetime(2025, 1, 1), sha256='0' * 64
+    ))
+    session.commit()
+
+    with app.test_request_context():
+        html = _store(course, user, progress, None)
+
+    certificate = CourseCertificate.query.filter_by(user_id=user.id, course_id=course.id).one()
+    assert certificate.completed_at == progress.completed_at
+    assert certificate.sha256 != '0' * 64
+    assert session.get(StoredBlob, certificate.sha256).ref_count == 1
+    assert 'Curso' in html
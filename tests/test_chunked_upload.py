@@ -0,0 +1,51 @@
+import io
+import os
+import time
+from datetime import datetime, timedelta
+
+from app.models import Course, StoredBlob
+from app.utils.blob_storage import blob_path, collect_garbage
+from app.utils.chunked_upload import append_chunk, claim_uploads, complete_upload, expire_upload_sessions, init_upload
+
+_CONTENT = b'%PDF-1.4 conteudo do documento'
+
+
+def _completed_upload(session, user):
+    upload, error = init_upload(user.id, 'course_content', 'material.pdf', len(_CONTENT))
+    assert error is None
+    assert append_chunk(upload, io.BytesIO(_CONTENT)) is None
+    assert complete_upload(upload) is None
+    session.commit()
+    return upload
+
+
+def _age_blob(session, sha256, seconds=7200):
+    session.get(StoredBlob, sha256).created_at = datetime.utcnow() - timedelta(seconds=seconds)
+    session.commit()
+    old = time.time() - seconds
+    os.utime(blob_path(sha256), (old, old))
+
+
+def test_completed_upload_survives_garbage_collection(session, user):
+    upload = _completed_upload(session, user)
+    sha256 = upload.sha256
+    assert session.get(StoredBlob, sha256).ref_count == 1
+
+    _age_blob(session, sha256)
+    assert collect_garbage(grace_seconds=3600) == (0, 0)
+    assert os.path.exists(blob_path(sha256))
+
+    # Vinculado ao cadastro, a referência passa da sessão para o registro dono
+    claimed = claim_uploads([upload.id], 'course_content', user.id)
+    session.add(Course(title='Curso', video_filename=claimed[0].filename, video_sha256=sha256))
+    session.commit()
+    session.expire_all()
+    assert session.get(StoredBlob, sha256).ref_count == 1
+
+
+def test_expired_upload_releases_blob(session, user):
+    sha256 = _completed_upload(session, user).sha256
+
+    assert expire_upload_sessions(max_age_seconds=-1) == 1
+    session.expire_all()
+    assert session.get(StoredBlob, sha256).ref_count == 0
@@ -0,0 +1,39 @@
+import io
+from datetime import datetime, timedelta
+
+from app.models import Course, CourseVideoRendition
+from app.utils.blob_storage import store_blob
+from app.utils.media_pipeline import ORIGINAL_LABEL, _claim, requeue_stale_videos
+
+
+def _course(session, **values):
+    course = Course(title='Curso', video_filename='aula.mov', **values)
+    session.add(course)
+    session.commit()
+    return course
+
+
+def test_requeue_stale_processing(app, session):
+    stale = _course(session, media_status='pending')
+    running = _course(session, media_status='pending')
+    orphan = _course(session, media_status='processing')  # processing anterior à coluna media_claimed_at
+    assert _claim(stale.id) and _claim(running.id)
+    stale.media_claimed_at = datetime.utcnow() - timedelta(days=2)
+    session.commit()
+
+    assert requeue_stale_videos() == 2
+    session.expire_all()
+    assert (stale.media_status, stale.media_claimed_at) == ('pending', None)
+    assert orphan.media_status == 'pending'
+    assert running.media_status == 'processing'
+
+
+def test_rendition_served_as_mp4(session, client):
+    sha256, size = store_blob(io.BytesIO(b'\x00\x00\x00\x18ftypmp42 remux'))
+    course = _course(session, media_status='ready')
+    session.add(CourseVideoRendition(course_id=course.id, label=ORIGINAL_LABEL, size=size, sha256=sha256))
+    session.commit()
+
+    response = client.get(f'/course/{course.id}/video')
+    assert response.status_code == 200
+    assert response.mimetype == 'video/mp4'
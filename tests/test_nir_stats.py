@@ -0,0 +1,57 @@
+from datetime import date, datetime
+
+from app.models import Nir, NirDailyStats
+from app.utils.nir_stats import rebuild_nir_daily_stats
+
+
+def _nir(user, **values):
+    return Nir(
+        patient_name='Paciente', birth_date=date(1980, 1, 1), gender='F', sus_number='123',
+        operator_id=user.id, creation_date=datetime(2025, 10, 1, 8), **values
+    )
+
+
+def _metric(session, day, metric):
+    return sum(getattr(row, metric) for row in session.query(NirDailyStats).filter_by(stat_date=day))
+
+
+def _snapshot(session):
+    return sorted(
+        (row.stat_date, row.entry_type, row.admission_type, row.recurso, row.admissions, row.discharges,
+         row.cancellations, row.total_days_sum, row.total_days_count)
+        for row in session.query(NirDailyStats)
+    )
+
+
+def test_moving_discharge_date_of_expired_record_recomputes_previous_day(session, user):
+    nir = _nir(user, admission_date=datetime(2025, 10, 1, 9), discharge_date=datetime(2025, 10, 5, 10),
+               total_days_admitted=4)
+    session.add(nir)
+    session.commit()
+    assert _metric(session, date(2025, 10, 5), 'discharges') == 1
+
+    # Após o commit a instância está expirada: o valor antigo não foi carregado antes da alteração
+    nir.discharge_date = datetime(2025, 10, 6, 10)
+    session.commit()
+
+    assert _metric(session, date(2025, 10, 5), 'discharges') == 0
+    assert _metric(session, date(2025, 10, 6), 'discharges') == 1
+
+
+def test_incremental_rollup_matches_rebuild(session, user):
+    kept = _nir(user, admission_date=datetime(2025, 10, 2, 9), entry_type='URGENCIA')
+    moved = _nir(user, admission_date=datetime(2025, 10, 3, 9), discharge_date=datetime(2025, 10, 7, 9),
+                 total_days_admitted=4)
+    removed = _nir(user, admission_date=datetime(2025, 10, 4, 9))
+    session.add_all([kept, moved, removed])
+    session.commit()
+
+    moved.admission_date = datetime(2025, 10, 2, 15)
+    kept.cancelled = 'SIM'
+    session.delete(removed)
+    session.commit()
+
+    incremental = _snapshot(session)
+    rebuild_nir_daily_stats()
+    assert _snapshot(session) == incremental
+
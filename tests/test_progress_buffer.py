@@ -0,0 +1,86 @@
+from datetime import datetime
+
+import pytest
+
+from app.models import Course, UserCourseProgress
+from app.utils import progress_buffer
+from app.utils.progress_buffer import mark_completed, record_heartbeat
+
+
+@pytest.fixture(autouse=True)
+def empty_buffer():
+    progress_buffer._entries.clear()
+    yield
+    progress_buffer._entries.clear()
+
+
+@pytest.fixture
+def course(session):
+    course = Course(title='Curso', video_filename='aula.mp4', duration_seconds=600)
+    session.add(course)
+    session.commit()
+    return course
+
+
+def _progress(session, user, course, timestamp=0.0, completed_at=None):
+    progress = UserCourseProgress(
+        user_id=user.id, course_id=course.id, last_watched_timestamp=timestamp, completed_at=completed_at
+    )
+    session.add(progress)
+    session.commit()
+    return progress
+
+
+def _reset_elsewhere(session, user, course):
+    """Reset feito por outro processo: o registro é recriado sem limpar o buffer deste."""
+    # Outro registro com id maior impede o SQLite de reaproveitar o id do registro removido
+    other = Course(title='Outro curso', video_filename='outro.mp4')
+    session.add(other)
+    session.commit()
+    _progress(session, user, other)
+    UserCourseProgress.query.filter_by(user_id=user.id, course_id=course.id).delete()
+    session.commit()
+    return _progress(session, user, course)
+
+
+def _stored(session, user, course):
+    session.expire_all()
+    return UserCourseProgress.query.filter_by(user_id=user.id, course_id=course.id).one()
+
+
+def test_heartbeat_after_reset_elsewhere_reaches_new_row(session, user, course):
+    _progress(session, user, course, timestamp=100.0)
+    record_heartbeat(user.id, course.id, 100.0)
+    new_progress = _reset_elsewhere(session, user, course)
+
+    # O UPDATE não encontra o registro antigo: a entrada sai do buffer e é relida no próximo heartbeat
+    record_heartbeat(user.id, course.id, 105.0)
+    entry, error = record_heartbeat(user.id, course.id, 5.0)
+
+    assert error is None
+    assert entry.progress_id == new_progress.id
+    assert _stored(session, user, course).last_watched_timestamp == 5.0
+
+
+def test_rewind_after_reset_elsewhere_rereads_entry(session, user, course, monkeypatch):
+    _progress(session, user, course, timestamp=600.0, completed_at=datetime(2025, 1, 1))
+    record_heartbeat(user.id, course.id, 600.0)
+    new_progress = _reset_elsewhere(session, user, course)
+    monkeypatch.setattr(progress_buffer, 'RECHECK_SECONDS', -1)
+
+    entry, error = record_heartbeat(user.id, course.id, 10.0)
+
+    assert error is None
+    assert (entry.progress_id, entry.completed) == (new_progress.id, False)
+    assert _stored(session, user, course).last_watched_timestamp == 10.0
+
+
+def test_mark_completed_ignores_stale_completed_entry(session, user, course):
+    _progress(session, user, course, timestamp=600.0, completed_at=datetime(2025, 1, 1))
+    record_heartbeat(user.id, course.id, 600.0)
+    _reset_elsewhere(session, user, course)
+
+    completed_at = datetime(2025, 6, 1)
+    assert mark_completed(user.id, course.id, completed_at) is True
+    assert _stored(session, user, course).completed_at == completed_at
+    assert mark_completed(user.id, course.id, datetime(2025, 7, 1)) is False
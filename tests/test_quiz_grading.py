@@ -0,0 +1,50 @@
+from app.models import AnswerOption, Course, Question, QuestionType, Quiz
+from app.utils.quiz_grading import grade_quiz
+
+
+def _quiz(session, question_type):
+    course = Course(title='Curso', video_filename='aula.mp4')
+    session.add(course)
+    session.flush()
+    quiz = Quiz(title='Avaliação', course_id=course.id)
+    session.add(quiz)
+    session.flush()
+    question = Question(quiz_id=quiz.id, text='Pergunta', question_type=question_type)
+    session.add(question)
+    session.flush()
+    return quiz, question
+
+
+def _set_options(session, question, texts, correct):
+    """Recria as opções como o editor de quizzes faz."""
+    for option in list(question.options):
+        session.delete(option)
+    session.flush()
+    options = [AnswerOption(question_id=question.id, text=text, is_correct=text == correct) for text in texts]
+    session.add_all(options)
+    session.commit()
+    return {option.text: option.id for option in options}
+
+
+def test_grading_follows_changed_correct_option(session):
+    quiz, question = _quiz(session, QuestionType.MULTIPLE_CHOICE)
+
+    options = _set_options(session, question, ['A', 'B'], correct='A')
+    assert grade_quiz(quiz.id, {f'question_{question.id}': str(options['A'])})[0] == 100
+
+    options = _set_options(session, question, ['A', 'B'], correct='B')
+    assert grade_quiz(quiz.id, {f'question_{question.id}': str(options['A'])})[0] == 0
+    assert grade_quiz(quiz.id, {f'question_{question.id}': str(options['B'])})[0] == 100
+
+
+def test_grading_follows_text_answer_edited_in_place(session):
+    quiz, question = _quiz(session, QuestionType.TEXT_INPUT)
+    answer = AnswerOption(question_id=question.id, text='Lavar as mãos', is_correct=True)
+    session.add(answer)
+    session.commit()
+    assert grade_quiz(quiz.id, {f'question_{question.id}': ' lavar as MÃOS '})[0] == 100
+
+    answer.text = 'Usar álcool gel'
+    session.commit()
+    assert grade_quiz(quiz.id, {f'question_{question.id}': 'lavar as mãos'})[0] == 0
+    assert grade_quiz(quiz.id, {f'question_{question.id}': 'usar álcool gel'})[0] == 100
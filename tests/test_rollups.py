@@ -0,0 +1,53 @@
+from datetime import date
+
+from sqlalchemy.dialects import postgresql
+
+from app.utils import training_compliance
+from app.utils.rollups import lock_rollup_keys
+
+
+class _RecordingConnection:
+    """Conexão que só registra as instruções, compiladas para o PostgreSQL."""
+
+    def __init__(self):
+        self.dialect = postgresql.dialect()
+        self.statements = []
+
+    def execute(self, statement):
+        self.statements.append(str(statement.compile(dialect=self.dialect, compile_kwargs={'literal_binds': True})))
+
+
+def test_lock_rollup_keys_locks_each_key_in_fixed_order():
+    connection = _RecordingConnection()
+    lock_rollup_keys(connection, 'nir_daily_stats', [date(2025, 10, 2), date(2025, 10, 1), date(2025, 10, 2)])
+
+    assert len(connection.statements) == 2
+    assert "pg_advisory_xact_lock(hashtext('nir_daily_stats:2025-10-01'))" in connection.statements[0]
+    assert "pg_advisory_xact_lock(hashtext('nir_daily_stats:2025-10-02'))" in connection.statements[1]
+
+
+def test_lock_rollup_keys_shared():
+    connection = _RecordingConnection()
+    lock_rollup_keys(connection, 'training_compliance_course', [7], shared=True)
+    assert 'pg_advisory_xact_lock_shared' in connection.statements[0]
+
+
+
+def test_compliance_refresh_locks_course_then_pairs(monkeypatch):
+    calls = []
+    monkeypatch.setattr(training_compliance, 'lock_rollup_keys',
+                        lambda connection, name, keys, shared=False: calls.append((name, set(keys), shared)))
+    monkeypatch.setattr(training_compliance, '_compute_entries', lambda *filters: [])
+
+    class _Connection:
+        def execute(self, statement):
+            pass
+
+    training_compliance.refresh_training_compliance(_Connection(), [(1, 7), (2, 7)])
+    training_compliance.refresh_course_compliance(_Connection(), [7])
+
+    assert calls == [
+        ('training_compliance_course', {7}, True),
+        ('training_compliance', {(1, 7), (2, 7)}, False),
+        ('training_compliance_course', {7}, False),
+    ]
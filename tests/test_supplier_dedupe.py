@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from sqlalchemy import MetaData, text
+
+from app.models import Supplier, User, SupplierEvaluation, SupplierIssueTracking, SupplierScoreSummary
+from app.utils.supplier_dedupe import dedupe_supplier_evaluations, find_duplicate_evaluations
+
+
+def test_dedupe_keeps_latest_evaluation_and_moves_tracking(session, user):
+    supplier = Supplier(company_name='Fornecedor')
+    session.add(supplier)
+    session.commit()
+    # Banco anterior à restrição única: recria a tabela sem uq_supplier_evaluation_month
+    session.execute(text('DROP TABLE supplier_evaluations'))
+    metadata = MetaData()
+    for model in (Supplier, User):
+        model.__table__.to_metadata(metadata)
+    table = SupplierEvaluation.__table__.to_metadata(metadata)
+    table.constraints = {c for c in table.constraints if c.name != 'uq_supplier_evaluation_month'}
+    table.create(session.connection())
+    session.commit()
+    columns = dict(supplier_id=supplier.id, evaluator_id=user.id, month_reference='2025-10',
+                   had_service_last_month=True, overall_rating=4, is_compliant=True)
+    older = SupplierEvaluation(evaluation_date=datetime(2025, 10, 1), total_score=40, **columns)
+    newer = SupplierEvaluation(evaluation_date=datetime(2025, 10, 20), total_score=90, **columns)
+    session.add_all([older, newer])
+    session.commit()
+    tracking = SupplierIssueTracking(supplier_id=supplier.id, evaluation_id=older.id, action_type='comment',
+                                     description='-', user_id=user.id)
+    session.add(tracking)
+    session.commit()
+
+    assert find_duplicate_evaluations() == [(supplier.id, '2025-10', user.id, newer.id, [older.id])]
+    dedupe_supplier_evaluations()
+
+    assert [evaluation.id for evaluation in SupplierEvaluation.query] == [newer.id]
+    assert session.get(SupplierIssueTracking, tracking.id).evaluation_id == newer.id
+    summary = session.get(SupplierScoreSummary, supplier.id)
+    assert summary.evaluations_count == 1 and summary.average_score == 90
+    assert find_duplicate_evaluations() == []
@@ -0,0 +1,23 @@
+from app.models import Supplier, SupplierIssueTracking
+
+
+def test_issue_history_etag_identifies_page(session, user, client):
+    supplier = Supplier(company_name='Fornecedor')
+    session.add(supplier)
+    session.flush()
+    session.add_all([SupplierIssueTracking(
+        supplier_id=supplier.id, user_id=user.id, action_type='note', description=f'Ação {i}'
+    ) for i in range(3)])
+    session.commit()
+
+    url = f'/feedback/suppliers/api/issue-history/{supplier.id}'
+    first = client.get(url, query_string={'limit': 2})
+    assert first.status_code == 200
+    cursor = first.get_json()['next_cursor']
+    assert cursor
+
+    # Mesmo ETag, outra página: o conteúdo é diferente e não pode responder 304
+    headers = {'If-None-Match': first.headers['ETag']}
+    assert client.get(url, query_string={'limit': 2, 'cursor': cursor}, headers=headers).status_code == 200
+    assert client.get(url, query_string={'limit': 1}, headers=headers).status_code == 200
+    assert client.get(url, query_string={'limit': 2}, headers=headers).status_code == 304
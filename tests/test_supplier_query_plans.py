@@ -0,0 +1,115 @@
+"""
+Planos de execução das consultas de avaliações de fornecedores
+
+Cria em um banco SQLite em memória as tabelas de fornecedores, avaliações e consolidados com os
+índices declarados nos modelos, popula com dados sintéticos, roda ANALYZE e confere, pelo
+EXPLAIN QUERY PLAN, que o dashboard e a tela de avaliação usam o índice esperado.
+"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select
+
+from app.models import db, Supplier, SupplierEvaluation, SupplierMonthlyScore, SupplierScoreSummary, User
+from app.routes.feedback.suppliers import (
+    _dashboard_aggregates_query, _dashboard_reference_query, _existing_evaluation_query
+)
+
+_SUPPLIERS = 300
+_EVALUATORS = 3
+_MONTHS = 24
+_INSERT_CHUNK = 10000
+
+_TABLES = [model.__table__ for model in (User, Supplier, SupplierEvaluation, SupplierMonthlyScore, SupplierScoreSummary)]
+
+
+def _insert(connection, table, rows):
+    for start in range(0, len(rows), _INSERT_CHUNK):
+        connection.execute(insert(table), rows[start:start + _INSERT_CHUNK])
+
+
+def _month(offset):
+    year, month = divmod(2024 * 12 + offset, 12)
+    return f'{year:04d}-{month + 1:02d}'
+
+
+def _seed(connection):
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+    _insert(connection, User.__table__, [{
+        'id': user_id, 'name': f'Usuário {user_id}', 'username': f'usuario{user_id}',
+        'email': f'usuario{user_id}@example.com', 'password': '-', 'profile': ''
+    } for user_id in range(1, _EVALUATORS + 1)])
+    _insert(connection, Supplier.__table__, [{
+        'id': supplier_id, 'company_name': f'Fornecedor {supplier_id}', 'is_active': supplier_id % 10 != 0
+    } for supplier_id in range(1, _SUPPLIERS + 1)])
+
+    evaluations, monthly = [], []
+    for month_offset in range(_MONTHS):
+        for supplier_id in range(1, _SUPPLIERS + 1):
+            scores = []
+            for evaluator_id in range(1, _EVALUATORS + 1):
+                had_service = rng.random() > 0.1
+                score = round(rng.uniform(20, 100), 2) if had_service else 0
+                scores.append(score)
+                evaluations.append({
+                    'supplier_id': supplier_id, 'evaluator_id': evaluator_id,
+                    'month_reference': _month(month_offset),
+                    'evaluation_date': start + timedelta(days=30 * month_offset, minutes=rng.randrange(1440)),
+                    'had_service_last_month': had_service, 'overall_rating': rng.randint(1, 5),
+                    'total_score': score, 'is_compliant': score >= 60
+                })
+            monthly.append({
+                'supplier_id': supplier_id, 'month_reference': _month(month_offset),
+                'evaluations_count': _EVALUATORS, 'scored_count': _EVALUATORS, 'score_sum': sum(scores)
+            })
+    _insert(connection, SupplierEvaluation.__table__, evaluations)
+    _insert(connection, SupplierMonthlyScore.__table__, monthly)
+
+
+# Fornecedor, avaliador e mês das consultas conferidas (existem nos dados sintéticos)
+_SUPPLIER_ID = _EVALUATOR_ID = 1
+_MONTH = _month(_MONTHS - 1)
+# As restrições únicas viram no SQLite o índice automático de cada tabela; o dashboard percorre os
+# fornecedores ativos e busca cada um pelo prefixo (supplier_id, month_reference)
+_UNIQUE_EVALUATION_INDEX = 'sqlite_autoindex_supplier_evaluations_1'
+_UNIQUE_MONTHLY_SCORE_INDEX = 'sqlite_autoindex_supplier_monthly_scores_1'
+
+# (consulta, instrução, índice esperado); a instrução é montada dentro do contexto da aplicação
+_CHECKS = [
+    ('Dashboard: último mês avaliado', lambda: select(func.max(SupplierEvaluation.month_reference)),
+     'ix_supplier_evaluations_month'),
+    ('Dashboard: total de avaliações do mês', lambda: select(func.count(SupplierEvaluation.id)).where(
+        SupplierEvaluation.month_reference == _MONTH
+    ), 'ix_supplier_evaluations_month'),
+    ('Dashboard: consolidado do mês', lambda: _dashboard_aggregates_query(_MONTH).statement,
+     _UNIQUE_MONTHLY_SCORE_INDEX),
+    ('Dashboard: avaliações de referência do mês', lambda: _dashboard_reference_query(_MONTH).statement,
+     _UNIQUE_EVALUATION_INDEX),
+    ('Avaliação: verificação de duplicata', lambda: _existing_evaluation_query(
+        _SUPPLIER_ID, _EVALUATOR_ID, _MONTH
+    ).statement, _UNIQUE_EVALUATION_INDEX),
+    ('Avaliação: fornecedores já avaliados no mês', lambda: SupplierEvaluation.query.filter_by(
+        evaluator_id=_EVALUATOR_ID, month_reference=_MONTH
+    ).statement, 'ix_supplier_evaluations_evaluator_month'),
+]
+
+
+@pytest.fixture(scope='module')
+def plan_connection():
+    engine = create_engine('sqlite://')
+    with engine.begin() as connection:
+        db.metadata.create_all(connection, tables=_TABLES)
+        _seed(connection)
+        connection.exec_driver_sql('ANALYZE')
+        yield connection
+    engine.dispose()
+
+
+@pytest.mark.parametrize('label, statement, index_name', _CHECKS, ids=[check[0] for check in _CHECKS])
+def test_supplier_query_uses_index(app, plan_connection, label, statement, index_name):
+    with app.app_context():
+        sql = str(statement().compile(dialect=plan_connection.dialect, compile_kwargs={'literal_binds': True}))
+    plan = [row[-1] for row in plan_connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}')]
+    assert any(index_name in line for line in plan), f"{label}: {index_name} não usado\n" + '\n'.join(plan)
@@ -0,0 +1,123 @@
+from datetime import datetime
+
+from flask import message_flashed
+from sqlalchemy.exc import IntegrityError
+
+from app.models import Permission, Supplier, User, SupplierEvaluation, SupplierMonthlyScore, SupplierScoreSummary
+from app.utils.rollups import run_backfills
+from app.utils import supplier_scores
+from app.utils.supplier_scores import backfill_supplier_scores, rebuild_supplier_scores
+
+
+def _evaluation(supplier, user, month, score, service=True, compliant=True):
+    return SupplierEvaluation(
+        supplier_id=supplier.id, evaluator_id=user.id, month_reference=month,
+        evaluation_date=datetime(int(month[:4]), int(month[5:]), 10), had_service_last_month=service,
+        overall_rating=4, total_score=score, is_compliant=compliant
+    )
+
+
+def _snapshot(session):
+    monthly = sorted(
+        (row.supplier_id, row.month_reference, row.evaluations_count, row.scored_count, row.score_sum,
+         row.rating_sum, row.compliant_count, row.non_compliant_count)
+        for row in session.query(SupplierMonthlyScore)
+    )
+    summaries = sorted(
+        (row.supplier_id, row.evaluations_count, row.scored_count, row.score_sum, row.last_evaluation_date)
+        for row in session.query(SupplierScoreSummary)
+    )
+    return monthly, summaries
+
+
+def _suppliers(session, count=2):
+    suppliers = [Supplier(company_name=f'Fornecedor {i}') for i in range(count)]
+    session.add_all(suppliers)
+    session.commit()
+    return suppliers
+
+
+def test_incremental_scores_match_rebuild(session, user):
+    first, second = _suppliers(session)
+    other = User(name='Outro Avaliador', username='outro', email='outro@example.com', password='-', profile='')
+    session.add(other)
+    session.commit()
+    moved = _evaluation(first, other, '2025-09', 80)
+    removed = _evaluation(second, user, '2025-09', 50, compliant=False)
+    session.add_all([moved, removed, _evaluation(first, user, '2025-10', 90),
+                     _evaluation(second, user, '2025-10', 0, service=False)])
+    session.commit()
+
+    # Instâncias expiradas pelo commit: o par antigo também precisa ser recalculado
+    moved.month_reference = '2025-10'
+    moved.supplier_id = second.id
+    session.delete(removed)
+    session.commit()
+
+    incremental = _snapshot(session)
+    assert not [row for row in incremental[0] if row[1] == '2025-09']
+    rebuild_supplier_scores()
+    assert _snapshot(session) == incremental
+
+
+def test_supplier_methods_read_summary(session, user):
+    supplier, = _suppliers(session, count=1)
+    session.add_all([_evaluation(supplier, user, '2025-09', 80), _evaluation(supplier, user, '2025-10', 60)])
+    session.commit()
+
+    assert supplier.get_evaluations_count() == 2
+    assert supplier.get_average_score() == 70
+    assert supplier.get_last_evaluation_date() == datetime(2025, 10, 10)
+
+
+def test_backfill_fills_empty_summaries_once(session, user):
+    supplier, = _suppliers(session, count=1)
+    session.add(_evaluation(supplier, user, '2025-10', 75))
+    session.commit()
+    # Simula o banco logo após a criação das tabelas: avaliações sem consolidado
+    session.query(SupplierScoreSummary).delete()
+    session.query(SupplierMonthlyScore).delete()
+    session.commit()
+    session.expire_all()
+    assert supplier.get_evaluations_count() == 0
+
+    run_backfills()
+    session.expire_all()
+    assert supplier.get_evaluations_count() == 1
+    assert supplier.get_average_score() == 75
+    assert backfill_supplier_scores() == 0
+
+
+def _evaluation_form(supplier):
+    form = {
+        field: 'conforme' for field in (
+            'contract_compliance', 'equipment_adequacy', 'invoice_validation', 'service_timeliness',
+            'quantity_description_compliance', 'support_quality'
+        )
+    }
+    form.update({
+        f'{field}_justification': 'ok' for field in (
+            'contract_compliance', 'equipment_adequacy', 'invoice_validation', 'service_timeliness', 'support_quality'
+        )
+    })
+    form.update(
+        supplier_id=supplier.id, month_reference='2025-09', had_service_last_month='true',
+        quantity_description_justification='ok', overall_rating='9', rating_justification='ok'
+    )
+    return form
+
+
+def test_rollup_error_is_not_reported_as_duplicate(session, user, client, monkeypatch):
+    user.permissions.append(Permission(name='admin-total', module='admin'))
+    (supplier,) = _suppliers(session, count=1)
+
+    def conflict(connection, keys):
+        raise IntegrityError('INSERT INTO supplier_monthly_scores', {}, Exception('uq_supplier_monthly_score'))
+    monkeypatch.setattr(supplier_scores, 'refresh_supplier_scores', conflict)
+
+    flashed = []
+    with message_flashed.connected_to(lambda app, message, category: flashed.append(message)):
+        client.post('/feedback/suppliers/evaluate', data=_evaluation_form(supplier))
+
+    assert len(flashed) == 1 and flashed[0].startswith('Erro ao registrar avaliação')
+    assert session.query(SupplierEvaluation).count() == 0
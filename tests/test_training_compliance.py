@@ -0,0 +1,75 @@
+from datetime import datetime
+
+from sqlalchemy import delete
+
+from app.models import (
+    Course, CourseEnrollmentTerm, Quiz, TrainingComplianceEntry, User, UserCourseProgress, UserQuizAttempt
+)
+from app.utils import progress_buffer
+from app.utils.rollups import run_backfills
+from app.utils.training_compliance import (
+    STATUS_COMPLETED, STATUS_ENROLLED, STATUS_IN_PROGRESS, backfill_training_compliance,
+    rebuild_training_compliance, refresh_course_compliance
+)
+
+
+def _snapshot(session):
+    return sorted(
+        (row.user_id, row.course_id, row.status, row.enrolled_at, row.started_at, row.completed_at, row.best_score)
+        for row in session.query(TrainingComplianceEntry)
+    )
+
+
+def _seed(session, user):
+    other = User(name='Outro Usuário', username='outro', email='outro@example.com', password='-', profile='')
+    courses = [Course(title=f'Curso {i}', video_filename='aula.mp4', duration_seconds=600) for i in range(2)]
+    session.add_all([other, *courses])
+    session.flush()
+    quiz = Quiz(title='Avaliação', course_id=courses[0].id)
+    session.add(quiz)
+    session.flush()
+    for person in (user, other):
+        for course in courses:
+            session.add(CourseEnrollmentTerm(
+                user_id=person.id, course_id=course.id, full_name=person.name, email=person.email,
+                accepted_terms=True, accepted_at=datetime(2025, 1, 1)
+            ))
+            session.add(UserCourseProgress(user_id=person.id, course_id=course.id, created_at=datetime(2025, 1, 1)))
+    session.commit()
+    return other, courses, quiz
+
+
+def test_incremental_compliance_matches_rebuild(session, user):
+    progress_buffer._entries.clear()
+    other, (first, second), quiz = _seed(session, user)
+
+    # Posição gravada pelo buffer (fora do ORM), conclusão, tentativas e reset de um curso
+    progress_buffer.record_heartbeat(user.id, first.id, 10.0)
+    progress_buffer.mark_completed(other.id, first.id, datetime(2025, 2, 1))
+    session.add_all([UserQuizAttempt(user_id=other.id, quiz_id=quiz.id, score=score) for score in (40.0, 90.0)])
+    session.commit()
+    session.execute(delete(UserCourseProgress).where(UserCourseProgress.course_id == second.id))
+    refresh_course_compliance(session.connection(), {second.id})
+    session.commit()
+    progress_buffer._entries.clear()
+
+    incremental = _snapshot(session)
+    statuses = {(row[0], row[1]): (row[2], row[6]) for row in incremental}
+    assert statuses[(user.id, first.id)] == (STATUS_IN_PROGRESS, None)
+    assert statuses[(other.id, first.id)] == (STATUS_COMPLETED, 90.0)
+    assert statuses[(user.id, second.id)] == (STATUS_ENROLLED, None)
+
+    rebuild_training_compliance()
+    assert _snapshot(session) == incremental
+
+
+def test_backfill_fills_empty_matrix_once(session, user):
+    _seed(session, user)
+    expected = _snapshot(session)
+    session.execute(delete(TrainingComplianceEntry))
+    session.commit()
+
+    run_backfills()
+
+    assert _snapshot(session) == expected
+    assert backfill_training_compliance() == 0
@@ -0,0 +1,106 @@
+"""
+Planos de execução das consultas dos treinamentos
+
+Cria em um banco SQLite em memória as tabelas de cursos, progresso, inscrições e tentativas com os
+índices declarados nos modelos, popula com dados sintéticos, roda ANALYZE e confere, pelo
+EXPLAIN QUERY PLAN, que o catálogo de cursos e os relatórios de progresso usam o índice esperado.
+"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select
+
+from app.models import db, Course, CourseEnrollmentTerm, Quiz, User, UserCourseProgress, UserQuizAttempt
+from app.utils.course_reports import attendance_query
+from app.utils.course_status import course_status_query
+
+_USERS = 2000
+_COURSES = 40
+_INSERT_CHUNK = 10000
+
+_TABLES = [model.__table__ for model in (User, Course, Quiz, UserCourseProgress, CourseEnrollmentTerm, UserQuizAttempt)]
+
+
+def _insert(connection, table, rows):
+    for start in range(0, len(rows), _INSERT_CHUNK):
+        connection.execute(insert(table), rows[start:start + _INSERT_CHUNK])
+
+
+def _seed(connection):
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+    _insert(connection, User.__table__, [{
+        'id': user_id, 'name': f'Usuário {user_id}', 'username': f'usuario{user_id}',
+        'email': f'usuario{user_id}@example.com', 'password': '-', 'profile': ''
+    } for user_id in range(1, _USERS + 1)])
+    _insert(connection, Course.__table__, [{
+        'id': course_id, 'title': f'Curso {course_id}', 'video_filename': 'video.mp4', 'duration_seconds': 600
+    } for course_id in range(1, _COURSES + 1)])
+    _insert(connection, Quiz.__table__, [{
+        'id': course_id, 'title': f'Avaliação {course_id}', 'course_id': course_id
+    } for course_id in range(1, _COURSES + 1)])
+
+    progress, enrollments, attempts = [], [], []
+    for user_id in range(1, _USERS + 1):
+        for course_id in rng.sample(range(1, _COURSES + 1), _COURSES // 3):
+            accepted_at = start + timedelta(minutes=rng.randrange(525600))
+            completed = rng.random() > 0.4
+            enrollments.append({
+                'user_id': user_id, 'course_id': course_id, 'full_name': f'Usuário {user_id}',
+                'email': f'usuario{user_id}@example.com', 'accepted_terms': True, 'accepted_at': accepted_at
+            })
+            progress.append({
+                'user_id': user_id, 'course_id': course_id, 'last_watched_timestamp': 600 if completed else 120,
+                'completed_at': accepted_at + timedelta(days=1) if completed else None, 'created_at': accepted_at
+            })
+            for attempt in range(rng.randint(1, 3) if completed else 0):
+                attempts.append({
+                    'user_id': user_id, 'quiz_id': course_id, 'score': round(rng.uniform(0, 100), 1),
+                    'submitted_at': accepted_at + timedelta(days=1, hours=attempt)
+                })
+    _insert(connection, UserCourseProgress.__table__, progress)
+    _insert(connection, CourseEnrollmentTerm.__table__, enrollments)
+    _insert(connection, UserQuizAttempt.__table__, attempts)
+
+
+# Usuário, curso e quiz das consultas conferidas (existem nos dados sintéticos)
+_USER_ID = _COURSE_ID = _QUIZ_ID = 1
+
+# (consulta, instrução, índice esperado); a instrução é montada dentro do contexto da aplicação
+_CHECKS = [
+    ('Catálogo de cursos (/courses)', lambda: course_status_query(_USER_ID), 'ix_user_quiz_attempts_user_quiz'),
+    ('Progresso do curso: lista com melhores notas', lambda: attendance_query(_COURSE_ID, _QUIZ_ID).statement,
+     'ix_user_quiz_attempts_quiz_score'),
+    ('Progresso do curso: nota média', lambda: select(
+        func.avg(UserQuizAttempt.score), func.count(UserQuizAttempt.score)
+    ).where(UserQuizAttempt.quiz_id == _QUIZ_ID), 'ix_user_quiz_attempts_quiz_score'),
+    ('Melhor tentativa do usuário (certificado)', lambda: select(UserQuizAttempt.id).where(
+        UserQuizAttempt.user_id == _USER_ID, UserQuizAttempt.quiz_id == _QUIZ_ID
+    ).order_by(UserQuizAttempt.score.desc()).limit(1), 'ix_user_quiz_attempts_user_quiz'),
+    ('Concluintes do curso', lambda: select(UserCourseProgress.user_id).where(
+        UserCourseProgress.course_id == _COURSE_ID, UserCourseProgress.completed_at.isnot(None)
+    ), 'ix_user_course_progress_course_completed'),
+    ('Inscrições do curso', lambda: select(CourseEnrollmentTerm.user_id, CourseEnrollmentTerm.accepted_at).where(
+        CourseEnrollmentTerm.course_id == _COURSE_ID
+    ), 'ix_course_enrollment_terms_course'),
+]
+
+
+@pytest.fixture(scope='module')
+def plan_connection():
+    engine = create_engine('sqlite://')
+    with engine.begin() as connection:
+        db.metadata.create_all(connection, tables=_TABLES)
+        _seed(connection)
+        connection.exec_driver_sql('ANALYZE')
+        yield connection
+    engine.dispose()
+
+
+@pytest.mark.parametrize('label, statement, index_name', _CHECKS, ids=[check[0] for check in _CHECKS])
+def test_training_query_uses_index(app, plan_connection, label, statement, index_name):
+    with app.app_context():
+        sql = str(statement().compile(dialect=plan_connection.dialect, compile_kwargs={'literal_binds': True}))
+    plan = [row[-1] for row in plan_connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}')]
+    assert any(index_name in line for line in plan), f"{label}: {index_name} não usado\n" + '\n'.join(plan)
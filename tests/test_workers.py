@@ -0,0 +1,22 @@
+from app.utils.workers import start_periodic_worker, stop_worker, worker_running
+
+
+def test_stop_runs_task_once_more_and_ends_thread(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'TESTING', False)
+    calls = []
+
+    worker = start_periodic_worker(app, 'test-worker', 60, lambda: calls.append(1), run_on_stop=True)
+    assert worker_running('test-worker')
+    assert start_periodic_worker(app, 'test-worker', 60, lambda: None) is worker
+
+    stop_worker('test-worker')
+    assert not worker.is_alive()
+    assert not worker_running('test-worker')
+    assert calls == [1]
+
+
+def test_worker_not_started_in_testing_or_without_interval(app, monkeypatch):
+    assert start_periodic_worker(app, 'test-worker-disabled', 1, lambda: None) is None
+    monkeypatch.setitem(app.config, 'TESTING', False)
+    assert start_periodic_worker(app, 'test-worker-disabled', 0, lambda: None) is None
+    assert not worker_running('test-worker-disabled')